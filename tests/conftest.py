@@ -0,0 +1,29 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from tivo.commands.emulator import Fleet
+
+
+@pytest.fixture(autouse=True)
+def _state_dir(
+    tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> Path:
+    """Keep the state files of each test, such as learned lineups, out of the user's."""
+
+    path = tmp_path_factory.mktemp("state")
+    monkeypatch.setenv("XDG_STATE_HOME", str(path))
+    return path
+
+
+@pytest.fixture
+def fleet(request: pytest.FixtureRequest) -> Iterator[Fleet]:
+    """Start emulated devices on ports of their own, and stop them after the test.
+
+    Parametrize indirectly for more devices, or beacons; e.g.,
+    `@pytest.mark.parametrize("fleet", [{"count": 3, "interval": 0.1}], indirect=True)`.
+    """
+
+    with Fleet(**getattr(request, "param", {})) as fleet:
+        yield fleet
@@ -0,0 +1,199 @@
+"""Benchmarks against an in-process emulator.
+
+Each benchmark also runs, briefly, as part of the test suite. For numbers
+worth comparing, `make bench` runs more iterations and writes the results,
+in JSON, to `$TIVO_BENCH_OUTPUT`.
+"""
+
+import json
+import os
+import platform
+import socket
+import statistics
+import time
+from argparse import Namespace
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from threading import Thread
+from typing import Any
+
+import pytest
+from loguru import logger
+
+from tivo.cli import main
+from tivo.commands.emulator import Device
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.remote import TivoRemote
+from tivo.transport import PipeTransport
+
+pytestmark = pytest.mark.bench
+
+# Multiply iteration counts by `$TIVO_BENCH_SCALE`.
+SCALE = float(os.environ.get("TIVO_BENCH_SCALE", "1"))
+
+RESULTS: dict[str, dict[str, Any]] = {}
+
+
+def _n(count: int) -> int:
+    return max(int(count * SCALE), 1)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _results() -> Iterator[None]:
+    logger.disable("tivo")
+    yield
+    logger.enable("tivo")
+
+    if output := os.environ.get("TIVO_BENCH_OUTPUT"):
+        data = {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "scale": SCALE,
+            "results": RESULTS,
+        }
+        Path(output).write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+@pytest.fixture(scope="module")
+def emulated() -> Device:
+    device = Device(1, port=0)
+    Thread(name="listener-1", target=device.tcp_listener, daemon=True).start()
+    assert device.listening.wait(5)
+    return device
+
+
+@pytest.fixture
+def client(emulated: Device) -> Iterator[TivoDevice]:
+    device = TivoDevice(
+        emulated.identity, address="127.0.0.1", host="bench", port=emulated.tcp_port
+    )
+    yield device
+    device.close()
+
+
+def _latency(name: str, func: Callable[[], object], count: int) -> dict[str, Any]:
+    """Time `count` calls to `func`, and record percentiles, in milliseconds."""
+
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    RESULTS[name] = result = {
+        "unit": "ms",
+        "n": count,
+        "mean": statistics.fmean(samples),
+        "p50": cuts[49],
+        "p90": cuts[89],
+        "p99": cuts[98],
+        "max": max(samples),
+    }
+    return result
+
+
+def _rate(name: str, count: int, seconds: float, unit: str) -> dict[str, Any]:
+    """Record throughput of `count` operations in `seconds`."""
+
+    RESULTS[name] = result = {"unit": unit, "n": count, "rate": count / seconds}
+    return result
+
+
+def test_connect(emulated: Device) -> None:
+    def _connect() -> None:
+        socket.create_connection(("127.0.0.1", emulated.tcp_port)).close()
+
+    assert _latency("connect", _connect, _n(100))["p50"] > 0
+
+
+def test_getch(client: TivoDevice) -> None:
+    _latency("getch", client.getch, _n(100))
+    assert client.status == "CH_STATUS"
+
+
+def test_setch(client: TivoDevice) -> None:
+    channels = iter(["105", "106"] * _n(200))
+    _latency("setch", lambda: client.send_setch(next(channels)), _n(200))
+    assert client.status == "CH_STATUS"
+
+
+def test_setch_pipe(emulated: Device) -> None:
+    # Without the network stack; mostly the cost of the client, and the emulator.
+    device = TivoDevice(emulated.identity, host="bench")
+    device.transport = PipeTransport(emulated.serve)
+    channels = iter(["105", "106"] * _n(200))
+    cpu = time.process_time()
+    _latency("setch_pipe", lambda: device.send_setch(next(channels)), _n(200))
+    RESULTS["setch_pipe"]["cpu_ms"] = (time.process_time() - cpu) * 1000 / _n(200)
+    assert device.status == "CH_STATUS"
+    device.close()
+
+
+def test_ircode(client: TivoDevice) -> None:
+    codes = iter(["CHANNELUP", "CHANNELDOWN"] * _n(200))
+    _latency("ircode", lambda: client.send_ircode(next(codes)), _n(200))
+    assert client.status == "CH_STATUS"
+
+
+def test_keystroke_throughput(client: TivoDevice) -> None:
+    count = _n(1000)
+    client.getch()
+    start = time.perf_counter()
+    for _ in range(count):
+        client.send_key("A")
+    client.send_setch("105")  # round trip; all keystrokes have been processed.
+    _rate("keystrokes", count, time.perf_counter() - start, "keys/s")
+    assert client.channel == "0105"
+
+
+def test_type_throughput(client: TivoDevice) -> None:
+    count = _n(1000)
+    text = ("tivo search 123 " * count)[:count]
+    client.getch()
+    start = time.perf_counter()
+    client.type_text(text)
+    client.send_setch("106")  # round trip; all keystrokes have been processed.
+    _rate("type", count, time.perf_counter() - start, "keys/s")
+    assert client.channel == "0106"
+    assert client.stats.count("send KEYBOARD") == 1
+
+
+def test_beacon_to_first_status(emulated: Device) -> None:
+    def _beacon() -> None:
+        core = TivoCore(Namespace(), {})
+        TivoRemote(core).handle_beacon(emulated.hello_message, "127.0.0.1")
+        device = core.devices[emulated.identity]
+        assert device.status == "CH_STATUS"
+        device.close()
+
+    _latency("beacon_to_first_status", _beacon, _n(50))
+
+
+def test_parser_throughput() -> None:
+    frames = [
+        "CH_STATUS 0702 LOCAL",
+        "CH_STATUS 0702 0001 REMOTE",
+        "CH_FAILED INVALID_CHANNEL",
+        "LIVETV_READY",
+    ]
+    device = TivoDevice("bench", address="127.0.0.1", host="bench")
+    count = _n(20000)
+
+    start = time.perf_counter()
+    for i in range(count):
+        device.last_msg_rcvd = frames[i % len(frames)]
+        device._parse()
+    _rate("parse", count, time.perf_counter() - start, "frames/s")
+    assert device.status == "LIVETV_READY"
+
+
+def test_bench_command(emulated: Device, capsys: pytest.CaptureFixture[str]) -> None:
+    port = str(emulated.tcp_port)
+    main(["bench", "127.0.0.1", "-p", port, "-n", "200", "-C", "2", "-P", "4", "--json"])
+    results = json.loads(capsys.readouterr().out)["results"]
+    assert results["total"]["n"] == 200
+    assert results["total"]["errors"] == results["total"]["timeouts"] == 0
+    assert results["setch"]["failed"] == 0
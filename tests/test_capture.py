@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from tivo.capture import CONNECT, DISCONNECT, RECV, SEND, Capture, read_capture, sessions
+from tivo.commands.emulator import Device
+from tivo.device import TivoDevice
+from tivo.transport import PipeTransport
+
+
+def test_capture_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "capture.log"
+    capture = Capture(path)
+    capture.record("A", CONNECT)
+    capture.record("A", RECV, "CH_STATUS 0101 LOCAL")
+    capture.record("B", CONNECT)
+    capture.record("A", SEND, "SETCH 105")
+    capture.record("A", RECV, "CH_STATUS 0105 REMOTE")
+    capture.record("B", RECV, "INVALID_KEY \ufffd")  # a non-ASCII byte, as decoded
+    capture.record("A", DISCONNECT)
+    capture.record("A", CONNECT)
+    capture.close()
+
+    records = read_capture(path)
+    assert len(records) == 8
+    assert records[3].frame == "SETCH 105"
+    assert records[0].frame == ""
+    assert records == sorted(records, key=lambda x: x.time)
+
+    by_device = sessions(records)
+    assert len(by_device["A"]) == 2
+    assert [x.direction for x in by_device["A"][0]] == ["+", "<", ">", "<", "-"]
+    assert len(by_device["B"]) == 1
+    assert by_device["B"][0][1].frame == "INVALID_KEY \ufffd"
+
+
+def test_replay(tmp_path: Path) -> None:
+    path = tmp_path / "capture.log"
+    capture = Capture(path)
+    capture.record("A", CONNECT)
+    capture.record("A", RECV, "CH_STATUS 0123 LOCAL")
+    capture.record("A", SEND, "SETCH 105")
+    capture.record("A", RECV, "CH_STATUS 0105 REMOTE")
+    capture.record("A", DISCONNECT)
+    capture.close()
+    capture.record("A", CONNECT)  # ignored, once closed
+
+    emulated = Device(1, sessions=sessions(read_capture(path))["A"], speed=0)
+    device = TivoDevice(emulated.identity)
+    device.transport = PipeTransport(emulated.serve)
+
+    device.getch()
+    assert device.channel == "0123"  # as recorded; not the emulated 0101
+    device.send_setch("105")
+    assert (device.channel, device.reason) == ("0105", "REMOTE")
+    device.close()
+    assert emulated.metrics.requests["SETCH"] == 1
@@ -1,9 +1,14 @@
+import os
+import pkgutil
 import sys
+from pathlib import Path
 from subprocess import run
 
 import pytest
 
+import tivo.commands
 from tivo.cli import main
+from tivo.commands import COMMANDS
 
 
 def test_main() -> None:
@@ -62,3 +67,104 @@ def test_print_url() -> None:
     with pytest.raises(SystemExit) as err:
         main(["--print-url"])
     assert err.value.code == 0
+
+
+# Milliseconds to import everything `tivo list` needs, besides `libcli`,
+# which is shared by all our tools; about 40ms when this was written.
+IMPORT_BUDGET_MS = 100
+
+
+def test_import_time() -> None:
+    result = run(
+        [sys.executable, "-X", "importtime", "-m", "tivo", "list"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules: dict[str, int] = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == "tivo" or modules:
+            modules[name.strip()] = int(cumulative)
+            if not name.startswith("  "):  # top-level import
+                total += int(cumulative)
+
+    for name in ("curses", "libcurses", "tivo.ui", "tivo.remote", "http.server", "cProfile"):
+        assert name not in modules
+    assert (total - modules["libcli"]) / 1000 < IMPORT_BUDGET_MS
+
+
+def test_commands_manifest(capsys: pytest.CaptureFixture[str]) -> None:
+    modules = {x.name for x in pkgutil.iter_modules(tivo.commands.__path__)}
+    assert modules == {x.module.rsplit(".", 1)[1] for x in COMMANDS.values()}
+
+    # listed from the manifest, and from the modules themselves.
+    with pytest.raises(SystemExit):
+        main(["--help"])
+    listed = capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(["--long-help"])
+    loaded = capsys.readouterr().out
+    for line in listed.splitlines():
+        if any(name in line for name in COMMANDS):
+            assert line in loaded
+
+
+def test_lazy_commands() -> None:
+    result = run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from tivo.cli import main; main(['list']); print(*sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = result.stdout.split()
+    assert "tivo.commands.list" in modules
+    assert "tivo.commands.emulator" not in modules
+
+
+def test_option_value_spelled_like_a_command(capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit):
+        main(["--capture", "list", "getch", "--help"])
+    assert "HOST" in capsys.readouterr().out  # of `getch`, not of a stub
+
+
+# Completes, with argcomplete's output on stdout, and its exit caught; then lists modules.
+COMPLETE = """
+import os, sys
+os.dup2(1, 8)
+def _exit(code):
+    raise SystemExit(code)
+os._exit = _exit
+try:
+    from tivo.cli import main
+    main()
+except SystemExit:
+    pass
+print("", *sys.modules, flush=True)
+"""
+
+
+def test_completion_imports_no_device_stack(tmp_path: Path) -> None:
+    line = "tivo getch lo"
+    env = os.environ | {
+        "_ARGCOMPLETE": "1",
+        "COMP_LINE": line,
+        "COMP_POINT": str(len(line)),
+        "XDG_STATE_HOME": str(tmp_path),
+    }
+    result = run(
+        [sys.executable, "-c", COMPLETE], check=True, capture_output=True, text=True, env=env
+    )
+    words = result.stdout.split()
+    assert "localhost" in words
+    assert "tivo.hosts" in words
+    assert "tivo.core" not in words
+    assert "tivo.device" not in words
@@ -0,0 +1,152 @@
+import random
+from argparse import Namespace
+from threading import Event
+
+import pytest
+
+from tivo.cli import main
+from tivo.commands.emulator import Device, Faults, Fleet
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.listener import TivoListener
+
+
+def test_emulator_help() -> None:
+    with pytest.raises(SystemExit) as err:
+        main(["emulator", "--help"])
+    assert err.value.code == 0
+
+
+def test_setch() -> None:
+    device = Device(1)
+    assert device.handle_request("SETCH 105") == "CH_STATUS 0105 REMOTE"
+    assert device.handle_request("SETCH 144 2") == "CH_STATUS 0144 0002 REMOTE"
+    assert device.handle_request("SETCH 110") == "CH_FAILED INVALID_CHANNEL"
+    assert device.handle_request("SETCH abc") == "CH_FAILED MALFORMED_CHANNEL"
+    assert device.handle_request("SETCH") == "CH_FAILED MISSING_CHANNEL"
+    assert device.channel == 144
+
+
+def test_setch_reject() -> None:
+    device = Device(1, faults=Faults(reject=1.0))
+    assert device.handle_request("SETCH 105") in (
+        "CH_FAILED NO_LIVE",
+        "CH_FAILED RECORDING",
+    )
+
+
+def test_ircode() -> None:
+    device = Device(1)
+    device.handle_request("SETCH 109")
+    assert device.handle_request("IRCODE CHANNELUP") == "CH_STATUS 0111 REMOTE"
+    assert device.handle_request("IRCODE CHANNELDOWN") == "CH_STATUS 0109 REMOTE"
+    assert device.handle_request("IRCODE GUIDE") is None
+    assert device.screen == "GUIDE"
+
+
+def test_teleport_and_keyboard() -> None:
+    device = Device(1)
+    assert device.handle_request("TELEPORT TIVO") is None
+    assert device.handle_request("TELEPORT LIVETV") == "LIVETV_READY"
+    assert device.handle_request("TELEPORT") == "MISSING_TELEPORT_NAME"
+    assert device.handle_request("KEYBOARD A") is None
+    assert device.handle_request("KEYBOARD BOGUS") == "INVALID_KEY"
+
+
+def test_type_quotes() -> None:
+    device = Device(1)
+    keys = TivoDevice.text_keys("""don't say "hi" “ok”""")
+    assert keys[3:5] == ["QUOTE", "T"]
+    assert keys.count("QUOTE") == 5
+    assert all(device.handle_request("KEYBOARD " + x) is None for x in keys)
+
+
+def test_faults_delay() -> None:
+    rng = random.Random(1)
+    assert Faults().delay(rng) == 0
+    assert Faults(latency=0.5).delay(rng) == 0.5
+    assert 0.4 <= Faults(latency=0.5, jitter=0.1).delay(rng) <= 0.6
+    assert not Faults().happens("drop", rng)
+    assert Faults(drop=1.0).happens("drop", rng)
+
+
+class _Sleeps(Event):
+    """Record the waits between beacons; stop after the third."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.waits: list[float] = []
+
+    def wait(self, timeout: float | None = None) -> bool:
+        assert timeout is not None
+        self.waits.append(timeout)
+        if len(self.waits) == 3:
+            self.set()
+        return self.is_set()
+
+
+def test_beacon_seeded() -> None:
+    def waits(seed: int) -> list[float]:
+        device = Device(1, interval=10, randomize=True, beacon_address="127.0.0.1")
+        device.rng.seed(seed)
+        device.stopping = _Sleeps()
+        device.broadcast_hello()
+        return device.stopping.waits
+
+    random.seed(0)
+    first = waits(42)
+    random.seed(1)
+    assert waits(42) == first
+    assert waits(43) != first
+    assert all(5 <= x <= 15 for x in first)
+
+
+def test_loopback() -> None:
+    device = Device(2, loopback=True)
+    assert (device.address, device.tcp_port) == ("127.0.0.3", 31339)
+    assert b"port=" not in device.hello_message
+
+    device = Device(2)
+    assert (device.address, device.tcp_port) == ("0.0.0.0", 31340)
+    assert b"port=31340" in device.hello_message
+
+
+def test_many_devices() -> None:
+    identities = {Device(x).identity for x in range(1, Device.max_num_devices + 1)}
+    assert len(identities) == Device.max_num_devices
+    assert all(len(x) == 15 for x in identities)
+
+
+def test_metrics() -> None:
+    device = Device(1)
+    device.handle_request("SETCH 105")
+    device.handle_request("BOGUS")
+    device.metrics.observe("SETCH", 0.002)
+    data = device.metrics.as_dict()
+    assert data["requests"] == {"SETCH": 1, "BOGUS": 1}
+    assert data["errors"] == 1
+    assert sum(data["latency"]["SETCH"]["counts"]) == 1
+    assert "SETCH n 1" in device.metrics.summary()
+
+
+@pytest.mark.parametrize("fleet", [{"count": 3, "interval": 0.05}], indirect=True)
+def test_fleet(fleet: Fleet) -> None:
+    ports = {x.tcp_port for x in fleet}
+    assert len(ports) == 3
+    assert 31339 not in ports
+
+    core = TivoCore(Namespace(), {})
+    listener = TivoListener(core, fleet.beacon_port)
+    sock = listener.open()
+    sock.settimeout(5)
+    while len(core.devices) < 3:
+        data, address = sock.recvfrom(1024)
+        listener.handle_beacon(data, address[0])
+    for device in core.devices.values():
+        assert device.status == "CH_STATUS"
+        device.close()
+    sock.close()
+
+    assert fleet.alive()
+    fleet.stop()
+    assert not fleet.alive()
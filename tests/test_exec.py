@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+from argparse import Namespace
+from pathlib import Path
+from threading import Event, Thread
+
+import pytest
+
+from tivo.cli import main
+from tivo.commands.emulator import Faults, Fleet
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.ioloop import IOLoop
+from tivo.pipeline import Pipeline
+
+
+def test_exec_command(fleet: Fleet, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    commands = tmp_path / "commands"
+    commands.write_text(
+        "\n".join(
+            [
+                "127.0.0.1 setch 105",
+                "# comment",
+                "127.0.0.1 upch",
+                "127.0.0.1 keyboard A B",
+                "127.0.0.1 getch",
+                "127.0.0.1 bogus",
+                "",
+            ]
+        ),
+        encoding="utf-8",
+    )
+    main(["exec", str(commands), "-p", str(fleet[0].tcp_port), "-P", "2"])
+    lines = [x.split() for x in capsys.readouterr().out.splitlines()]
+    assert [x[:2] for x in lines] == [
+        ["1", "ok"],
+        ["3", "ok"],
+        ["4", "ok"],
+        ["5", "ok"],
+        ["6", "error"],
+    ]
+    assert lines[1][3:] == ["CH_STATUS", "0106", "REMOTE"]
+
+
+class _Output:
+    """Standard output; when each line was printed."""
+
+    def __init__(self, lines: int) -> None:
+        self.times: list[float] = []
+        self.done = Event()  # set when `lines` are printed
+        self.lines = lines
+
+    def write(self, text: str) -> None:
+        self.times += [time.monotonic()] * text.count("\n")
+        if len(self.times) >= self.lines:
+            self.done.set()
+
+    def flush(self) -> None:
+        pass
+
+
+@pytest.mark.parametrize("fleet", [{"faults": Faults(latency=0.2)}], indirect=True)
+def test_exec_pipelines_open_input(fleet: Fleet, monkeypatch: pytest.MonkeyPatch) -> None:
+    # The producer writes 4 commands at once, and keeps its end open until they're done.
+    read, write = os.pipe()
+    output = _Output(4)
+    monkeypatch.setattr(sys, "stdin", os.fdopen(read))
+    monkeypatch.setattr(sys, "stdout", output)
+
+    def _produce() -> None:
+        os.write(write, b"127.0.0.1 setch 105\n" * 4)
+        output.done.wait(5)
+        os.close(write)
+
+    thread = Thread(target=_produce)
+    start = time.monotonic()
+    thread.start()
+    main(["exec", "-", "-p", str(fleet[0].tcp_port), "-P", "4"])
+    thread.join()
+    sys.stdin.close()
+
+    # In flight together; not one after another.
+    assert len(output.times) == 4
+    assert output.times[-1] - start < 0.6
+
+
+def test_pipeline_refuses_a_device_of_a_loop() -> None:
+    core = TivoCore(Namespace(), {})
+    IOLoop(core)
+    core.add_device(device := TivoDevice("A", address="127.0.0.1"))
+    with pytest.raises(ValueError, match="of a loop"):
+        Pipeline(device)
@@ -0,0 +1,53 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from tivo.cli import main
+from tivo.history import RECORD, Entry, History, history_path, read_history
+
+
+def test_history(tmp_path: Path) -> None:
+    path = tmp_path / "device.bin"
+    history = History(path, recent=2)
+    history.record("0105", None, "LOCAL")
+    history.record("0144", "0002", "REMOTE")
+    history.record("0106", None, "RECORDING")
+    assert not history.record("abc", None, "REMOTE")  # can't be recorded
+    history.close()
+
+    # Another process; its first status, of the channel last recorded, is no change.
+    other = History(path)
+    assert not other.record("0106", None, "REMOTE")
+    assert other.record("0107", None, "REMOTE")
+    other.close()
+
+    assert path.stat().st_size == 4 * RECORD.size
+    assert [(x.channel, x.subchannel, x.reason) for x in history.recent()] == [
+        (144, 2, "REMOTE"),
+        (106, 0, "RECORDING"),
+    ]
+
+    entries = list(read_history(path))
+    assert [x.channel for x in entries] == [105, 144, 106, 107]
+    assert list(read_history(path, since=entries[1].time)) == entries[1:]
+    assert list(read_history(path, until=entries[1].time)) == entries[:1]
+    assert list(read_history(tmp_path / "missing.bin")) == []
+    assert str(Entry(0, 144, 2, "REMOTE")).endswith(" 0144 0002 REMOTE")
+
+
+def test_history_command(capsys: pytest.CaptureFixture[str]) -> None:
+    history = History(history_path("7460001902767F2"))
+    history.record("0105", None, "LOCAL")
+    history.close()
+
+    main(["history", "7460001902767F2", "--since", "1h", "--json"])
+    data = json.loads(capsys.readouterr().out)
+    assert data["7460001902767F2"]["history"][0]["channel"] == 105
+
+    main(["history", "--until", time.strftime("%Y-%m-%d", time.localtime(0))])
+    assert capsys.readouterr().out == "host  identity 7460001902767F2\n"
+
+    with pytest.raises(SystemExit):
+        main(["history", "--since", "yesterday"])
@@ -0,0 +1,46 @@
+import os
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+import tivo.hosts
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.hosts import known_hosts
+
+
+def test_known_hosts(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    etc_hosts = tmp_path / "hosts"
+    etc_hosts.write_text(
+        "127.0.0.1 localhost\n"
+        "::1 ip6-localhost\n"
+        "# 10.0.0.9 commented\n"
+        "10.0.0.2 printer\n"
+        "10.0.0.3 den-tivo\n"
+        "10.0.0.4 bedroom  # discovered\n"
+    )
+    monkeypatch.setattr(tivo.hosts, "_ETC_HOSTS", etc_hosts)
+
+    core = TivoCore(Namespace(), {})
+    device = TivoDevice("7460001902767F2", address="10.0.0.4", host="bedroom")
+    device.npings = 1
+    core.add_device(device)
+    core.save_devices()
+
+    identities = {"7460001902767F1": "living"}
+    assert known_hosts(identities) == [
+        "living",
+        "bedroom",
+        "den-tivo",
+        "7460001902767F1",
+        "7460001902767F2",
+        "localhost",
+        "printer",
+    ]
+
+    # cached until a source changes.
+    etc_hosts.write_text("10.0.0.5 kitchen\n")
+    os.utime(etc_hosts, (1, 1))
+    assert "kitchen" in known_hosts(identities)
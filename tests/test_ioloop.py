@@ -0,0 +1,193 @@
+import socket
+import threading
+import time
+from argparse import Namespace
+from concurrent import futures
+from concurrent.futures import Future
+from threading import Thread
+
+import pytest
+from loguru import logger
+
+from tivo.commands.emulator import Fleet
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.ioloop import IOLoop
+from tivo.listener import TivoListener
+
+
+def test_slow_device_delays_no_other(fleet: Fleet) -> None:
+    emulated = fleet[0]
+
+    core = TivoCore(Namespace(), {})
+    loop = IOLoop(core)
+    loop.start()
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        # Accepts connections, and never says a word.
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        slow = TivoDevice("slow", address="127.0.0.1", port=server.getsockname()[1])
+        slow.timeout = 0.5
+        fast = TivoDevice(emulated.identity, address=emulated.address, port=emulated.tcp_port)
+        core.add_device(slow)
+        core.add_device(fast)
+        assert fast.loop is loop
+        before = fast.state
+
+        logger.disable("tivo")
+        thread = Thread(target=slow.send_setch, args=("105",))
+        start = time.monotonic()
+        thread.start()
+        fast.send_setch("105")
+        elapsed = time.monotonic() - start
+        thread.join()
+        logger.enable("tivo")
+
+    assert elapsed < 0.4
+    assert (fast.status, fast.channel, fast.reason) == ("CH_STATUS", "0105", "REMOTE")
+    assert (slow.status, slow.reason) == ("Can't receive", "timeout")
+    assert slow.stats.timeouts == {"recv CONNECT": 1}
+    assert slow.sock is None
+
+    state = fast.state
+    assert state.version > before.version
+    assert (state.channel, state.reason) == ("0105", "REMOTE")
+    assert before.channel is None
+    with pytest.raises(AttributeError):
+        state.channel = "0106"
+
+    fast.getch()
+    loop.stop()
+    assert fast.status == "CH_STATUS"
+    assert {"connect", "recv CONNECT", "recv SETCH"} <= set(fast.stats.latency)
+
+
+def test_input_preempts_polls(fleet: Fleet) -> None:
+    emulated = fleet[0]
+
+    core = TivoCore(Namespace(), {})
+    loop = IOLoop(core)
+    device = TivoDevice(emulated.identity, address=emulated.address, port=emulated.tcp_port)
+    core.add_device(device)
+    loop.start()
+
+    made: list[Future[str | None]] = []
+
+    def _submit() -> None:
+        made.append(loop.getch(device, loop.BACKGROUND))  # made at once
+        made.append(loop.getch(device, loop.BACKGROUND))  # stale by the time it's due
+        made.append(loop.request(device, "SETCH 105"))  # jumps ahead of it
+        assert loop.queued(device) == 2
+
+    loop.call_soon(_submit)
+    while len(made) < 3:
+        time.sleep(0.01)
+    futures.wait(made, timeout=5)
+    loop.stop()
+
+    first, stale, setch = (x.result() for x in made)
+    assert first == "CH_STATUS 0101 LOCAL"
+    assert setch == "CH_STATUS 0105 REMOTE"
+    assert stale == setch
+    assert loop.polls_dropped == 1
+    assert device.stats.count("queue CONNECT") == 1
+    assert device.stats.count("queue SETCH") == 1
+
+
+@pytest.mark.parametrize("fleet", [{"count": 4}], indirect=True)
+def test_startup_resolves_at_once_and_warms_up(
+    fleet: Fleet, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    hosts = {x.identity: f"tivo{i}" for i, x in enumerate(fleet)}
+    hosts[fleet[3].identity] = "late"  # resolves after the deadline
+
+    def _gethostbyname(host: str) -> str:
+        time.sleep(1 if host == "late" else 0.2)
+        return "127.0.0.1"
+
+    applied: list[str] = []  # threads that changed an address
+
+    def _set_address(self: TivoDevice, host: str | None, address: str | None) -> None:
+        applied.append(threading.current_thread().name)
+        set_address(self, host, address)
+
+    set_address = TivoDevice.set_address
+    monkeypatch.setattr(socket, "gethostbyname", _gethostbyname)
+    monkeypatch.setattr(TivoDevice, "set_address", _set_address)
+    monkeypatch.setattr(TivoCore, "resolve_timeout", 0.5)
+    start = time.monotonic()
+    core = TivoCore(Namespace(), {"identity": hosts})
+    assert time.monotonic() - start < 0.1  # looked up in the background
+    devices = list(core.devices.values())
+    for device, emulated in zip(devices, fleet, strict=True):
+        device.port = emulated.tcp_port
+
+    loop = IOLoop(core)
+    assert time.monotonic() - start < 1  # the deadline; not 3 * 0.2 + 1, one after another
+    assert [x.address for x in devices] == ["127.0.0.1"] * 3 + [None]
+    loop.start()
+    made = loop.warm_up()
+    assert len(made) == 3
+    futures.wait(made, timeout=5)
+    assert all(str(x.result()).startswith("CH_STATUS") for x in made)
+
+    device = devices[0]
+    device.send_setch("105")  # on the connection warmed up
+    assert device.channel == "0105"
+    assert device.stats.count("connect") == 1
+
+    # The late one is applied on the loop's thread, and polled.
+    while devices[3].status != "CH_STATUS" and time.monotonic() - start < 5:
+        time.sleep(0.05)
+    loop.stop()
+    assert devices[3].channel == "0401"
+    assert applied == ["MainThread"] * 3 + ["io"]
+
+
+def test_command_waits_for_its_host(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _gethostbyname(host: str) -> str:
+        time.sleep(0.5)
+        return "127.0.0.1"
+
+    monkeypatch.setattr(socket, "gethostbyname", _gethostbyname)
+    monkeypatch.setattr(TivoCore, "resolve_timeout", 0.1)
+    core = TivoCore(Namespace(), {"identity": {"A": "slow"}})
+    device = core.resolve_device("slow")  # not bounded by `resolve_timeout`
+    assert device
+    assert device.address == "127.0.0.1"
+    assert core.resolve_device("127.0.0.1") is device
+
+
+def test_slow_reverse_lookup_delays_no_device(
+    fleet: Fleet, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def _gethostbyaddr(address: str) -> tuple[str, list[str], list[str]]:
+        time.sleep(1)
+        return "new.example", [], [address]
+
+    monkeypatch.setattr(socket, "gethostbyaddr", _gethostbyaddr)
+    emulated = fleet[0]
+    core = TivoCore(Namespace(), {})
+    loop = IOLoop(core, TivoListener(core, fleet.beacon_port))
+    device = TivoDevice(emulated.identity, address=emulated.address, port=emulated.tcp_port)
+    core.add_device(device)
+    loop.start()
+
+    logger.disable("tivo")
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(b"identity=NEW\nmachine=DVR NEW\n", ("127.0.0.1", fleet.beacon_port))
+    time.sleep(0.1)  # heard, and being looked up
+    start = time.monotonic()
+    device.getch()
+    elapsed = time.monotonic() - start
+    new = core.devices["NEW"]
+    assert new.host == "127.0.0.1"  # its address, until its name is looked up
+    while new.host != "new.example" and time.monotonic() - start < 5:
+        time.sleep(0.05)
+    loop.stop()
+    logger.enable("tivo")
+
+    assert elapsed < 0.5
+    assert device.status == "CH_STATUS"
+    assert new.host == "new.example"
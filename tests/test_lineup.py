@@ -0,0 +1,83 @@
+import time
+from argparse import Namespace
+from threading import Thread
+
+from loguru import logger
+
+from tivo.commands.emulator import Device
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.lineup import LINEUPS, Lineup
+from tivo.state import read_state
+
+
+def test_lineup() -> None:
+    lineup = Lineup()
+    assert Lineup.key("0144", "0002") == Lineup.key("144 2") == "144 2"
+    assert Lineup.key("0105", None) == "105"
+
+    lineup.follows("105", "106")
+    lineup.follows("106", "107")
+    assert lineup.step("105", 2) == "107"
+    assert lineup.step("107", -2) == "105"
+    assert lineup.step("105", 3) is None
+
+    lineup.refuse("106", "NO_LIVE")  # transient
+    assert lineup.refusal("106") is None
+    lineup.refuse("106", "INVALID_CHANNEL")
+    assert lineup.refusal("106") == "INVALID_CHANNEL"
+    assert lineup.step("105", 2) is None
+    lineup.refused["106"] = ("INVALID_CHANNEL", time.time() - Lineup.ttl - 1)
+    assert lineup.refusal("106") is None
+
+    lineup.tuned("105")
+    lineup.follows("105", "107")
+    lineup.refuse("110", "INVALID_CHANNEL")
+    copy = Lineup.from_dict(lineup.as_dict())
+    assert copy.channels == {"105"}
+    assert copy.refusal("110") == "INVALID_CHANNEL"
+    assert copy.next == {"105": "107"}
+
+
+def test_device_learns_lineup() -> None:
+    emulated = Device(1, port=0)
+    Thread(target=emulated.tcp_listener, daemon=True).start()
+    assert emulated.listening.wait(5)
+    device = TivoDevice(emulated.identity, address="127.0.0.1", port=emulated.tcp_port)
+    logger.disable("tivo")
+
+    device.send_setch("110")  # not in the lineup
+    assert device.reason == "INVALID_CHANNEL"
+    device.last_msg_sent = None
+    device.send_setch("110")
+    assert device.reason == "INVALID_CHANNEL"
+    assert device.last_msg_sent is None  # refused without asking
+    device.upch()  # still on 101, after the refusal
+    assert device.lineup.step("101", 1) == "102"
+
+    device.send_setch("108")
+    device.upch(3)  # learns 108, 109, 111, 112, one step at a time
+    assert device.channel == "0112"
+    device.downch(3)  # one SETCH
+    assert device.channel == "0108"
+    assert device.last_msg_sent == "SETCH 108"
+
+    device.close()
+    logger.enable("tivo")
+
+
+def test_concurrent_saves_keep_all_lineups() -> None:
+    def _save(identity: str) -> None:
+        core = TivoCore(Namespace(), {})
+        core.add_device(device := TivoDevice(identity, address="127.0.0.1"))
+        device.lineup.tuned("105")
+        core.save_lineups()
+        core.close_history()
+
+    threads = [Thread(target=_save, args=(f"ID{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(read_state(LINEUPS)) == [f"ID{i}" for i in range(8)]
@@ -0,0 +1,20 @@
+from tivo.pacer import NAVIGATION, KeyPacer
+
+
+def test_pacer() -> None:
+    pacer = KeyPacer(rate=10, burst=2)
+    assert "KEYBOARD UP" in NAVIGATION
+    assert "KEYBOARD SELECT" not in NAVIGATION
+
+    # Holding a key, repeating every 30ms, for a second.
+    admitted = [pacer.admit("KEYBOARD DOWN", i * 0.03) for i in range(34)]
+    assert admitted[:2] == [True, True]
+    assert 10 <= sum(admitted) <= 12
+    assert pacer.dropped == 34 - sum(admitted)
+    assert pacer.in_flight(1.0) <= 2
+
+    # Another key is admitted at once; its repeats wait for the device.
+    assert pacer.admit("KEYBOARD UP", 1.0)
+    assert not pacer.admit("KEYBOARD UP", 1.0)
+    assert pacer.admit("KEYBOARD UP", 10.0)
+    assert pacer.admit("KEYBOARD UP", 10.0)
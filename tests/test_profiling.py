@@ -0,0 +1,36 @@
+import pstats
+import sys
+import threading
+import tracemalloc
+from pathlib import Path
+
+from loguru import logger
+
+from tivo.profiling import Profiler
+
+
+def _selected_work() -> list[int]:
+    return [i * i for i in range(1000)]
+
+
+def _other_work() -> list[int]:
+    return [i + i for i in range(1000)]
+
+
+def test_profiler(tmp_path: Path) -> None:
+    profiler = Profiler(tmp_path / "prof", tmp_path / "malloc", ["selected-*"])
+    logger.disable("tivo")
+    profiler.start()
+    for name, func in (("selected-1", _selected_work), ("other-1", _other_work)):
+        thread = threading.Thread(name=name, target=func)
+        thread.start()
+        thread.join()
+    profiler.stop()
+    logger.enable("tivo")
+
+    functions = {x[2] for x in pstats.Stats(str(tmp_path / "prof")).stats}  # type: ignore[attr-defined]
+    assert "_selected_work" in functions
+    if sys.version_info < (3, 12):
+        assert "_other_work" not in functions
+
+    assert tracemalloc.Snapshot.load(str(tmp_path / "malloc")).traces
@@ -0,0 +1,50 @@
+import urllib.request
+from argparse import Namespace
+from pathlib import Path
+
+from loguru import logger
+
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.prometheus import PrometheusExporter
+from tivo.remote import TivoRemote
+
+
+def test_exporter(tmp_path: Path) -> None:
+    core = TivoCore(Namespace(), {})
+    device = TivoDevice("7460001902767F2", address="127.0.0.1", host='den "tivo"')
+    device.stats.observe("recv SETCH", 0.003)
+    device.stats.observe("recv SETCH", 20)
+    device.stats.timeout("connect")
+    core.add_device(device)
+
+    remote = TivoRemote(core)
+    logger.disable("tivo")
+    remote.handle_beacon(b"\xffgarbage", "127.0.0.1")
+    logger.enable("tivo")
+
+    exporter = PrometheusExporter(core, remote)
+    text = exporter.render()
+    labels = 'identity="7460001902767F2",host="den \\"tivo\\""'
+    assert f"tivo_device_connected{{{labels}}} 0" in text
+    assert (
+        f'tivo_device_operation_seconds_bucket{{{labels},op="recv SETCH",le="0.005"}} 1' in text
+    )
+    assert (
+        f'tivo_device_operation_seconds_bucket{{{labels},op="recv SETCH",le="+Inf"}} 2' in text
+    )
+    assert f'tivo_device_operation_seconds_count{{{labels},op="recv SETCH"}} 2' in text
+    assert f'tivo_device_operation_timeouts_total{{{labels},op="connect"}} 1' in text
+    assert "tivo_listener_parse_errors_total 1" in text
+    assert "tivo_device_last_seen_seconds{" not in text
+
+    exporter.serve(0)
+    assert exporter._server
+    port = exporter._server.server_address[1]
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+        assert response.read().decode() == text
+
+    path = tmp_path / "tivo.prom"
+    exporter.write_periodically(path)
+    exporter.stop()
+    assert path.read_text() == text
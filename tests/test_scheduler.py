@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import pytest
+from loguru import logger
+
+import tivo.scheduler
+from tivo.device import TivoDevice
+from tivo.scheduler import HealthScheduler
+
+
+def test_scheduler(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(tivo.scheduler, "time", SimpleNamespace(time=lambda: now[0]))
+    scheduler = HealthScheduler(interval=100, stale_after=150, offline_after=330)
+
+    device = TivoDevice("7460001902767F2")  # no address; polls fail
+    events: list[str] = []
+    device.event_callback = lambda device, event: events.append(str(device.health))
+    scheduler.add(device)
+    for i in range(100):
+        scheduler.add(TivoDevice(f"spread-{i}"))
+    assert len({due for due, _, _ in scheduler._heap}) == 101
+
+    logger.disable("tivo")
+    for now[0] in (1100.0, 1150.0, 1330.0):
+        scheduler.run_pending()
+    logger.enable("tivo")
+    assert events == ["online", "stale", "offline"]
+    assert device.health == TivoDevice.OFFLINE
+    assert scheduler.polls >= 100
+
+    device._heard()  # e.g., a hello message
+    assert events[-1] == "online"
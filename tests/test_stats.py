@@ -0,0 +1,82 @@
+from pathlib import Path
+from threading import Thread
+
+import pytest
+from loguru import logger
+
+from tivo.cli import main
+from tivo.commands.emulator import Device
+from tivo.device import TivoDevice
+from tivo.stats import DeviceStats, Histogram, load_stats, save_stats
+
+
+def test_histogram() -> None:
+    histogram = Histogram()
+    assert histogram.count == 0
+    assert histogram.percentile(50) == 0
+
+    for ms in range(1, 101):
+        histogram.observe(ms / 1000)
+    assert histogram.count == 100
+    assert histogram.mean == pytest.approx(0.0505)
+    assert 0.025 <= histogram.percentile(50) <= 0.05
+    assert 0.05 <= histogram.percentile(99) <= 0.1
+
+    histogram.observe(60)
+    assert histogram.percentile(100) == Histogram.bounds[-1]
+
+
+def test_histogram_merge_and_dict() -> None:
+    a, b = Histogram(), Histogram()
+    a.observe(0.001)
+    b.observe(0.2)
+    a.merge(b)
+    assert a.count == 2
+
+    c = Histogram.from_dict(a.as_dict())
+    assert c.counts == a.counts
+    assert c.sum == a.sum
+
+
+def test_device_stats(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    logger.disable("tivo")
+    emulated = Device(1, port=0)
+    Thread(target=emulated.tcp_listener, daemon=True).start()
+    assert emulated.listening.wait(5)
+
+    device = TivoDevice(emulated.identity, address="127.0.0.1", host="tivo1")
+    device.port = emulated.tcp_port
+    device.send_setch("105")
+    device.send_key("A")
+    device.send_ircode("CHANNELUP")
+    device.close()
+    logger.enable("tivo")
+
+    stats = device.stats
+    assert stats.latency["connect"].count == 1
+    assert stats.latency["recv CONNECT"].count == 1
+    assert stats.latency["send KEYBOARD"].count == 1
+    assert stats.latency["recv SETCH"].count == 1
+    assert stats.latency["recv IRCODE"].count == 1
+    assert "recv KEYBOARD" not in stats.latency
+    assert stats.operations()[0] == "connect"
+
+    stats.timeout("recv SETCH")
+    path = tmp_path / "tivo" / "stats.json"
+    save_stats(path, {device.identity: ("tivo1", stats)})
+    save_stats(path, {device.identity: ("", DeviceStats.from_dict(stats.as_dict()))})
+    host, merged = load_stats(path)[device.identity]
+    assert host == "tivo1"
+    assert merged.latency["connect"].count == 2
+    assert merged.count("recv SETCH") == 4
+
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    main(["stats", "tivo1", "--reset"])
+    assert not path.exists()
+
+    # A corrupt file is discarded, not raised from every command that saves stats.
+    for text in ("{", '{"x": {"host": "h", "stats": {"latency": {"c": {"bounds": [1]}}}}}'):
+        path.write_text(text, encoding="utf-8")
+        assert load_stats(path) == {}
+        save_stats(path, {device.identity: ("tivo1", stats)})
+        assert load_stats(path)[device.identity][1].count("recv SETCH") == 2
@@ -29,3 +29,9 @@ def test_downch_help() -> None:
     with pytest.raises(SystemExit) as err:
         main(["downch", "--help"])
     assert err.value.code == 0
+
+
+def test_type_help() -> None:
+    with pytest.raises(SystemExit) as err:
+        main(["type", "--help"])
+    assert err.value.code == 0
@@ -0,0 +1,61 @@
+import contextlib
+import socket
+from argparse import Namespace
+from pathlib import Path
+from threading import Thread
+
+import pytest
+
+from tivo.commands.emulator import Device
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.ioloop import IOLoop
+from tivo.transport import PipeTransport, Transport, UnixTransport
+
+
+def test_pipe_transport() -> None:
+    emulated = Device(1, port=0)
+    device = TivoDevice(emulated.identity)  # no address; none needed
+    device.transport = PipeTransport(emulated.serve)
+
+    device.send_setch("105")
+    assert (device.status, device.channel, device.reason) == ("CH_STATUS", "0105", "REMOTE")
+    device.type_text("abc")
+    device.close()
+
+    # Through the loop, too.
+    core = TivoCore(Namespace(), {})
+    loop = IOLoop(core)
+    core.add_device(device)
+    loop.start()
+    device.upch()
+    loop.stop()
+    assert device.channel == "0106"
+
+
+def test_unix_transport(tmp_path: Path) -> None:
+    emulated = Device(1, port=0)
+    path = str(tmp_path / "tivo.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+
+    def _accept() -> None:
+        with contextlib.suppress(OSError):  # closed, at the end of the test
+            while True:
+                sock, _ = server.accept()
+                emulated.serve(sock, ("unix", 0))
+
+    Thread(target=_accept, daemon=True).start()
+
+    device = TivoDevice(emulated.identity)
+    device.transport = UnixTransport(path)
+    device.getch()
+    assert (device.status, device.channel) == ("CH_STATUS", "0101")
+    device.close()
+    server.close()
+
+
+def test_transport_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        Transport()  # type: ignore[abstract]
@@ -0,0 +1,31 @@
+import json
+import socket
+from threading import Thread
+
+import pytest
+from loguru import logger
+
+from tivo.cli import main
+from tivo.commands.emulator import Fleet
+
+
+def test_watch(fleet: Fleet, capsys: pytest.CaptureFixture[str]) -> None:
+    emulated = fleet[0]
+    beacon_port = fleet.beacon_port
+
+    logger.disable("tivo")
+    thread = Thread(target=main, args=(["watch", "--beacon-port", str(beacon_port), "-n", "4"],))
+    thread.start()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        while thread.is_alive():
+            sock.sendto(b"garbage", ("127.0.0.1", beacon_port))
+            sock.sendto(emulated.hello_message, ("127.0.0.1", beacon_port))
+            thread.join(0.1)
+    logger.enable("tivo")
+
+    events = [json.loads(x) for x in capsys.readouterr().out.splitlines()]
+    assert [x["event"] for x in events] == ["device", "hello", "channel", "hello"]
+    assert events[2]["identity"] == emulated.identity
+    assert events[2]["channel"] == "0101"
+    assert events[2]["reason"] == "LOCAL"
+    assert events[0]["monotonic"] <= events[2]["monotonic"]
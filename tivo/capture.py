@@ -0,0 +1,94 @@
+"""Protocol capture.
+
+Record every frame sent to and received from devices, with monotonic
+timestamps, for later replay by the emulator. The log is plain text,
+one frame per line:
+
+    TIME IDENTITY DIRECTION FRAME
+
+where DIRECTION is `+` (connected), `>` (sent to device), `<` (received
+from device) or `-` (disconnected). Lines starting with `#` are comments.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, TextIO
+
+__all__ = ["Capture", "Record", "read_capture", "sessions"]
+
+CONNECT = "+"
+SEND = ">"
+RECV = "<"
+DISCONNECT = "-"
+
+
+class Record(NamedTuple):
+    """A captured frame."""
+
+    time: float  # monotonic seconds.
+    identity: str  # of the device.
+    direction: str  # CONNECT, SEND, RECV or DISCONNECT.
+    frame: str
+
+
+class Capture:
+    """Append frames to a capture log."""
+
+    def __init__(self, path: Path) -> None:
+        """Open capture log `path` for appending."""
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: TextIO = open(path, "a", encoding="utf-8")  # noqa: SIM115
+        self._file.write(f"# tivo capture started {time.ctime()}\n")
+        self._file.flush()
+
+    def record(self, identity: str, direction: str, frame: str = "") -> None:
+        """Append `frame` sent or received, in `direction`, from device `identity`."""
+
+        line = f"{time.monotonic():.6f} {identity} {direction} {frame}\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close capture log."""
+
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(path: Path) -> list[Record]:
+    """Return records from capture log `path`."""
+
+    records = []
+    with open(path, encoding="utf-8", errors="replace") as file:
+        for line in file:
+            if line.startswith("#") or not line.strip():
+                continue
+            stamp, identity, direction, frame = (line.rstrip("\n").split(" ", 3) + [""])[:4]
+            records.append(Record(float(stamp), identity, direction, frame))
+    return records
+
+
+def sessions(records: list[Record]) -> dict[str, list[list[Record]]]:
+    """Return records grouped by device identity, then by connection."""
+
+    result: dict[str, list[list[Record]]] = {}
+    current: dict[str, list[Record]] = {}
+
+    for record in records:
+        if record.direction == CONNECT:
+            current[record.identity] = [record]
+            result.setdefault(record.identity, []).append(current[record.identity])
+        elif session := current.get(record.identity):
+            session.append(record)
+            if record.direction == DISCONNECT:
+                del current[record.identity]
+
+    return result
@@ -1,12 +1,29 @@
-"""Command line interface."""
+"""Command line interface.
 
+Commands are run from cron jobs and automation hooks thousands of times
+a day, so modules needed only by the interactive application (curses),
+or by diagnostic options, are imported only when used, and only the
+module of the command selected on the command line is imported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import shlex
+import sys
+from collections.abc import Callable
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from libcli import BaseCLI
 
 from tivo.cmd import TivoCmd
-from tivo.core import TivoCore
-from tivo.remote import TivoRemote
+from tivo.commands import COMMANDS
+
+if TYPE_CHECKING:
+    from tivo.core import TivoCore
 
 __all__ = ["TivoCLI"]
 
@@ -25,6 +42,21 @@ class TivoCLI(BaseCLI):
 
     core: TivoCore
 
+    # Options that take a value, which may be spelled like a command; libcli's
+    # `--config`, and those of `add_arguments`.
+    options_with_values = frozenset(
+        {
+            "--config",
+            "--poll-interval",
+            "--capture",
+            "--profile",
+            "--profile-threads",
+            "--trace-malloc",
+            "--prometheus-port",
+            "--prometheus-file",
+        }
+    )
+
     def init_parser(self) -> None:
         """Initialize argument parser."""
 
@@ -43,7 +75,10 @@ class TivoCLI(BaseCLI):
 
     def add_arguments(self) -> None:
         """Add arguments to parser."""
-        self.add_subcommand_modules("tivo.commands", prefix="Tivo", suffix="Cmd")
+
+        subparsers = self.parser.add_subparsers(metavar="COMMAND", title="Specify one of")
+        self.add_parser = subparsers.add_parser  # by each command's `add_subcommand_parser`
+        self.parser.set_defaults(cmd=None)
 
         self.parser.add_argument_group(
             title="Configuration file",
@@ -54,19 +89,170 @@ class TivoCLI(BaseCLI):
                 """),
         )
 
+        group = self.parser.add_argument_group(
+            title="Health checks",
+            description=self.dedent("""
+        Devices not heard from for `--poll-interval` seconds are polled
+        for their status, and marked `stale` after missing 2 hello
+        messages, and `offline` after missing 5.
+                """),
+        )
+
+        arg = group.add_argument(
+            "--poll-interval",
+            metavar="SECONDS",
+            type=float,
+            default=120.0,
+            help="poll devices not heard from for `SECONDS`; 0 to never poll",
+        )
+        self.add_default_to_help(arg, group)
+
+        group = self.parser.add_argument_group("Diagnostic options")
+
+        group.add_argument(
+            "--capture",
+            metavar="FILE",
+            type=Path,
+            help="append every frame sent to and received from devices to `FILE`, "
+            "for `tivo emulator --replay FILE`",
+        )
+
+        group.add_argument(
+            "--profile",
+            metavar="FILE",
+            type=Path,
+            help="profile time with `cProfile`, and write `pstats` to `FILE` on exit, "
+            "and to `FILE.N` upon each `SIGUSR1`",
+        )
+
+        group.add_argument(
+            "--profile-threads",
+            metavar="NAMES",
+            type=lambda x: x.split(","),
+            help="profile only threads whose names match the comma-separated `fnmatch` "
+            "patterns in `NAMES`, e.g., `console,listener` or `device-*` (default: all)",
+        )
+
+        group.add_argument(
+            "--trace-malloc",
+            metavar="FILE",
+            type=Path,
+            help="trace memory with `tracemalloc`, and write a snapshot to `FILE` on exit, "
+            "and to `FILE.N` upon each `SIGUSR1`",
+        )
+
+        group.add_argument(
+            "--prometheus-port",
+            metavar="PORT",
+            type=int,
+            help="serve metrics in Prometheus text format on `http://127.0.0.1:PORT/metrics`",
+        )
+
+        group.add_argument(
+            "--prometheus-file",
+            metavar="FILE",
+            type=Path,
+            help="write metrics in Prometheus text format to `FILE` every "
+            "15 seconds, for the textfile collector",
+        )
+
+        self._add_commands(subparsers.add_parser)
+
+    def _add_commands(self, add_parser: Callable[..., argparse.ArgumentParser]) -> None:
+        """Add the command selected on the command line, and list the others; by `add_parser`."""
+
+        selected = self._selected_command()
+
+        for name, command in COMMANDS.items():
+            if selected in (name, "*"):
+                getattr(importlib.import_module(command.module), command.cls)(self)
+            else:
+                stub = add_parser(name, help=command.help)
+                stub.set_defaults(cmd=lambda name=name: self.parser.error(f"Can't run {name!r}"))
+
+    def _selected_command(self) -> str | None:
+        """Return name of the command on the command line, "*" for all, or None."""
+
+        if "_ARGCOMPLETE" in os.environ:
+            line = os.environ.get("COMP_LINE", "")[: int(os.environ.get("COMP_POINT", "0"))]
+            try:
+                argv = shlex.split(line)[1:]
+            except ValueError:
+                return "*"
+        else:
+            argv = sys.argv[1:] if self.argv is None else self.argv
+
+        previous = ""
+        for arg in argv:
+            if arg in ("-H", "--long-help", "--md-help"):
+                return "*"
+            if arg in COMMANDS and previous not in self.options_with_values:
+                return arg
+            previous = arg
+        return None
+
     def main(self) -> None:
         """Command line interface entry point (method)."""
 
+        profiler = None
+        if self.options.profile or self.options.trace_malloc:
+            from tivo.profiling import Profiler
+
+            profiler = Profiler(
+                self.options.profile, self.options.trace_malloc, self.options.profile_threads
+            )
+            profiler.start()
+
+        try:
+            self._main()
+        finally:
+            if profiler:
+                profiler.stop()
+
+    def _main(self) -> None:
+        # Not imported to parse the command line, or complete it.
+        from tivo.capture import Capture
+        from tivo.core import TivoCore
+        from tivo.device import TivoDevice
+
+        if self.options.capture:
+            TivoDevice.capture = Capture(self.options.capture)
+
         self.core = TivoCore(self.options, self.config)
-        remote = TivoRemote(self.core)
         TivoCmd.core = self.core
 
-        if hasattr(self.options, "cmd") and self.options.cmd:
-            # command line
-            self.options.cmd()
-        else:
-            # interactive
-            remote.run_application()
+        exporter = None
+        if self.options.prometheus_port is not None or self.options.prometheus_file:
+            from tivo.prometheus import PrometheusExporter
+
+            exporter = PrometheusExporter(self.core)
+            if self.options.prometheus_port is not None:
+                exporter.serve(self.options.prometheus_port)
+            if self.options.prometheus_file:
+                exporter.write_periodically(self.options.prometheus_file)
+
+        try:
+            if hasattr(self.options, "cmd") and self.options.cmd:
+                # command line
+                self.options.cmd()
+            else:
+                # interactive
+                from tivo.remote import TivoRemote
+
+                remote = TivoRemote(self.core)
+                if exporter:
+                    exporter.remote = remote
+                remote.run_application()
+        finally:
+            if exporter:
+                exporter.stop()
+            self.core.save_stats()
+            self.core.save_devices()
+            self.core.save_lineups()
+            self.core.close_history()
+            if TivoDevice.capture:
+                TivoDevice.capture.close()
+                TivoDevice.capture = None
 
 
 def main(args: list[str] | None = None) -> None:
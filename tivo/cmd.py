@@ -1,11 +1,21 @@
-"""Tivo base command."""
+"""Tivo base command.
+
+Imports only what completing `HOST` needs; see `tivo.hosts`.
+"""
+
+from __future__ import annotations
 
 import argparse
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 from libcli import BaseCmd
 
-from tivo.core import TivoCore
-from tivo.device import TivoDevice
+from tivo.hosts import known_hosts
+
+if TYPE_CHECKING:
+    from tivo.core import TivoCore
+    from tivo.device import TivoDevice
 
 
 class TivoCmd(BaseCmd):
@@ -19,31 +29,18 @@ class TivoCmd(BaseCmd):
         host = parser.add_argument("host", metavar="HOST", help="target tivo device")
         host.completer = self._known_hosts_completer  # type: ignore[attr-defined]
 
-    @staticmethod
-    def _known_hosts_completer(**_kwargs: str) -> list[str]:
-        """Read `/etc/hosts` and return list of known hosts."""
-
-        hosts = []
-        with open("/etc/hosts", encoding="utf-8") as file:
-            for line in file:
-                # PLW2901: line is stripped in-place before parsing.
-                line = line.strip()  # noqa: PLW2901
-                if len(line) < 1 or line[0] == "#":
-                    continue
-                value = line.split()
-                if "::" in value[0]:
-                    continue
-
-                for name in value[1:]:
-                    if len(name) > 0 and name[0] == "#":
-                        break
-                    hosts.append(name)
+    def _known_hosts_completer(self, **_kwargs: str) -> list[str]:
+        """Return known hosts, likely TiVo hosts first."""
 
-        return sorted(hosts)
+        config_file = getattr(self.cli.options, "config_file", None)
+        return known_hosts(
+            self.cli.config.get("identity") or {},
+            Path(config_file).expanduser() if config_file else None,
+        )
 
     def getdevicebyname(self, name: str) -> TivoDevice:
         """Return the device with the matching `name`."""
 
-        device = self.core.get_device_by_name(name)
+        device = self.core.resolve_device(name)
         assert device
         return device
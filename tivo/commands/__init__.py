@@ -1 +1,42 @@
-"""Tivo command modules."""
+"""Tivo command modules.
+
+`COMMANDS` lists every command, so the command line can be parsed
+without importing every command module: only the module of the command
+selected on the command line is imported, and the others are listed in
+`--help` from their entries here. Keep each `help` identical to the one
+the command's module gives `add_subcommand_parser`.
+"""
+
+from typing import NamedTuple
+
+__all__ = ["COMMANDS", "Command"]
+
+
+class Command(NamedTuple):
+    """Where to find a command, and how to list it."""
+
+    module: str
+    cls: str
+    help: str
+
+
+COMMANDS = {
+    "bench": Command("tivo.commands.bench", "TivoBenchCmd", "load test `HOST`"),
+    "downch": Command(
+        "tivo.commands.downch", "TivoDownchCmd", "tune to previous channel on `HOST`"
+    ),
+    "emulator": Command(
+        "tivo.commands.emulator", "TivoEmulatorCmd", "run a TiVo set-top device emulator"
+    ),
+    "exec": Command(
+        "tivo.commands.exec", "TivoExecCmd", "run commands read from `FILE` or stdin"
+    ),
+    "getch": Command("tivo.commands.getch", "TivoGetchCmd", "get and print channel from `HOST`"),
+    "history": Command("tivo.commands.history", "TivoHistoryCmd", "print channel history"),
+    "list": Command("tivo.commands.list", "TivoListCmd", "list `HOST`s"),
+    "setch": Command("tivo.commands.setch", "TivoSetchCmd", "tune `HOST` to `CHANNEL`"),
+    "stats": Command("tivo.commands.stats", "TivoStatsCmd", "print latency statistics"),
+    "type": Command("tivo.commands.type", "TivoTypeCmd", "type `TEXT` on `HOST`"),
+    "upch": Command("tivo.commands.upch", "TivoUpchCmd", "tune to next channel on `HOST`"),
+    "watch": Command("tivo.commands.watch", "TivoWatchCmd", "print device events as JSON lines"),
+}
@@ -0,0 +1,331 @@
+"""Tivo Load Generator.
+
+The `%(prog)s` command sends a random mix of operations to `HOST`, over
+one or more connections, for a duration or a number of operations, and
+reports throughput, latency percentiles, and rates of failures, errors
+and timeouts, of each operation.
+
+Operations are:
+    getch     reconnect, and wait for the current channel,
+    setch     `SETCH` to one of `--channels`, and wait for the reply,
+    ircode    `IRCODE CHANNELUP` or `CHANNELDOWN`, and wait for the reply,
+    keyboard  `KEYBOARD` `--key`, which is not answered.
+
+With `--pipeline DEPTH`, each connection sends up to `DEPTH` requests
+before waiting for the oldest reply; `getch` waits for all replies.
+Unsolicited `CH_STATUS` messages, which are not `REMOTE`, are ignored.
+
+A failure is a `CH_FAILED` reply; an error is a connection that could
+not be made, or was lost. `HOST` may be a configured device, a host
+name or an address, such as that of `tivo emulator`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from tivo.cmd import TivoCmd
+from tivo.device import TivoDevice
+from tivo.pipeline import FAILED, OK, TIMEOUT, Pipeline, Reply
+
+
+def _mix(value: str) -> dict[str, float]:
+    """Parse comma-separated list of `OPERATION=WEIGHT`."""
+
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in _Worker.operations:
+            raise argparse.ArgumentTypeError(f"invalid operation {name!r}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError as err:
+            raise argparse.ArgumentTypeError(f"invalid weight {weight!r}") from err
+    return mix
+
+
+@dataclass
+class Results:
+    """Outcomes of one operation."""
+
+    samples: list[float] = field(default_factory=list)  # latency of each success, seconds
+    failed: int = 0
+    errors: int = 0
+    timeouts: int = 0
+
+    @property
+    def count(self) -> int:
+        """Return number of operations attempted."""
+        return len(self.samples) + self.failed + self.errors + self.timeouts
+
+    def add(self, reply: Reply) -> None:
+        """Add the outcome of `reply`."""
+
+        if reply.outcome == OK:
+            self.samples.append(reply.seconds)
+        elif reply.outcome == FAILED:
+            self.failed += 1
+        elif reply.outcome == TIMEOUT:
+            self.timeouts += 1
+        else:
+            self.errors += 1
+
+    def merge(self, other: Results) -> None:
+        """Add the outcomes of `other` to these results."""
+
+        self.samples += other.samples
+        self.failed += other.failed
+        self.errors += other.errors
+        self.timeouts += other.timeouts
+
+    def as_dict(self, seconds: float) -> dict[str, Any]:
+        """Return summary of results over `seconds`, with latencies in milliseconds."""
+
+        samples = sorted(x * 1000 for x in self.samples) or [0.0]
+        cuts = (
+            statistics.quantiles(samples, n=100, method="inclusive")
+            if len(samples) > 1
+            else samples * 99
+        )
+        count = self.count or 1
+        return {
+            "n": self.count,
+            "rate": self.count / seconds if seconds else 0.0,
+            "p50": cuts[49],
+            "p90": cuts[89],
+            "p99": cuts[98],
+            "max": samples[-1],
+            "failed": self.failed / count,
+            "errors": self.errors / count,
+            "timeouts": self.timeouts / count,
+        }
+
+
+class _Worker:
+    """Drive one connection to the device."""
+
+    operations = ("getch", "setch", "ircode", "keyboard")
+
+    def __init__(
+        self,
+        device: TivoDevice,
+        options: argparse.Namespace,
+        count: int | None,
+        rng: random.Random,
+    ) -> None:
+
+        self.device = device
+        self.options = options
+        self.count = count
+        self.rng = rng
+        self.results = {name: Results() for name in self.operations}
+
+    def run(self, deadline: float) -> None:
+        """Issue operations until count, or monotonic `deadline`, is reached."""
+
+        names = list(self.options.mix)
+        weights = list(self.options.mix.values())
+        channels = self.options.channels or [self.device.channel]
+        pipeline = Pipeline(self.device, self.options.pipeline)
+        n = 0
+
+        while (self.count is None or n < self.count) and time.monotonic() < deadline:
+            n += 1
+            operation = self.rng.choices(names, weights)[0]
+
+            if operation == "getch":
+                replies = pipeline.getch(operation)
+            elif operation == "setch":
+                replies = pipeline.submit("SETCH " + self.rng.choice(channels), operation)
+            elif operation == "ircode":
+                replies = pipeline.submit(
+                    "IRCODE " + ("CHANNELUP", "CHANNELDOWN")[n % 2], operation
+                )
+            else:
+                replies = pipeline.submit("KEYBOARD " + self.options.key, operation)
+
+            for reply in replies:
+                self.results[reply.token].add(reply)
+
+        for reply in pipeline.flush():
+            self.results[reply.token].add(reply)
+        self.device.close()
+
+
+class TivoBenchCmd(TivoCmd):
+    """Tivo `bench` command class."""
+
+    def init_command(self) -> None:
+        """Initialize Tivo `bench` command instance."""
+
+        parser = self.add_subcommand_parser(
+            "bench",
+            help="load test `HOST`",
+            description=__doc__,
+        )
+
+        self.add_host_argument(parser)
+
+        arg = parser.add_argument(
+            "-m",
+            "--mix",
+            type=_mix,
+            default="getch=1,setch=4,ircode=4,keyboard=1",
+            metavar="OPERATION=WEIGHT,...",
+            help="Relative frequency of each operation",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        arg = parser.add_argument(
+            "-d",
+            "--duration",
+            type=float,
+            default=10,
+            metavar="SECONDS",
+            help="Stop after `SECONDS`",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument(
+            "-n",
+            "--count",
+            type=int,
+            help="Stop after `COUNT` operations, across all connections, "
+            "or after `--duration`, whichever is first",
+        )
+
+        arg = parser.add_argument(
+            "-C",
+            "--connections",
+            type=int,
+            default=1,
+            help="Number of concurrent connections",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        arg = parser.add_argument(
+            "-P",
+            "--pipeline",
+            type=int,
+            default=1,
+            metavar="DEPTH",
+            help="Maximum number of requests in flight on each connection",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument(
+            "--channels",
+            type=lambda x: x.split(","),
+            metavar="CHANNEL,...",
+            help="Channels to `SETCH` (default: the current channel)",
+        )
+
+        arg = parser.add_argument(
+            "--key",
+            default="CLEAR",
+            help="Key to send with `KEYBOARD`",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument("-p", "--port", type=int, help="Connect to TCP `PORT`")
+
+        arg = parser.add_argument(
+            "-t",
+            "--timeout",
+            type=float,
+            default=TivoDevice.timeout,
+            metavar="SECONDS",
+            help="Wait for each reply",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument("--seed", type=int, help="Seed the random mix of operations")
+
+        parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    def run(self) -> None:
+        """Perform the command."""
+
+        options = self.cli.options
+        if options.connections < 1 or options.pipeline < 1:
+            self.cli.parser.error("connections and pipeline must be at least 1.")
+
+        if not (target := self.core.resolve_device(options.host)):
+            target = TivoDevice("bench", host=options.host)
+        port = options.port or target.port
+
+        rng = random.Random(options.seed)
+        workers = []
+        for i in range(options.connections):
+            device = TivoDevice(
+                target.identity, address=target.address, host=target.host, port=port
+            )
+            device.timeout = options.timeout
+            device.getch()
+            if device.status != "CH_STATUS":
+                self.cli.parser.error(f"Can't connect to {options.host!r}; {device.reason}.")
+
+            count = None
+            if options.count is not None:
+                count = options.count // options.connections
+                count += i < options.count % options.connections
+            workers.append(_Worker(device, options, count, random.Random(rng.random())))
+
+        deadline = time.monotonic() + options.duration
+        threads = []
+        start = time.perf_counter()
+        for i, worker in enumerate(workers):
+            thread = threading.Thread(name=f"bench-{i + 1}", target=worker.run, args=(deadline,))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+        totals = {name: Results() for name in _Worker.operations}
+        for worker in workers:
+            for name, results in worker.results.items():
+                totals[name].merge(results)
+        everything = Results()
+        for results in totals.values():
+            everything.merge(results)
+
+        report = {name: totals[name].as_dict(seconds) for name in options.mix}
+        report["total"] = everything.as_dict(seconds)
+
+        if options.json:
+            print(
+                json.dumps(
+                    {
+                        "host": options.host,
+                        "connections": options.connections,
+                        "pipeline": options.pipeline,
+                        "seconds": seconds,
+                        "results": report,
+                    },
+                    indent=2,
+                )
+            )
+            return
+
+        print(
+            f"{options.host}: {options.connections} connection(s), "
+            f"pipeline {options.pipeline}, {seconds:.1f}s"
+        )
+        print(
+            f"{'operation':<10}{'n':>8}{'ops/s':>10}{'p50ms':>9}{'p90ms':>9}{'p99ms':>9}"
+            f"{'maxms':>9}{'failed':>8}{'errors':>8}{'timeouts':>9}"
+        )
+        for name, r in report.items():
+            print(
+                f"{name:<10}{r['n']:>8}{r['rate']:>10.1f}{r['p50']:>9.2f}{r['p90']:>9.2f}"
+                f"{r['p99']:>9.2f}{r['max']:>9.2f}{r['failed']:>8.1%}{r['errors']:>8.1%}"
+                f"{r['timeouts']:>9.1%}"
+            )
@@ -12,14 +12,24 @@ class TivoDownchCmd(TivoCmd):
         parser = self.add_subcommand_parser(
             "downch",
             help="tune to previous channel on `HOST`",
-            description="The `%(prog)s` command tunes `HOST` down to previous channel.",
+            description="The `%(prog)s` command tunes `HOST` down to previous channel, "
+            "or down `COUNT` channels.",
         )
 
         self.add_host_argument(parser)
 
+        parser.add_argument(
+            "count",
+            metavar="COUNT",
+            type=int,
+            nargs="?",
+            default=1,
+            help="tune down `COUNT` channels (default: 1)",
+        )
+
     def run(self) -> None:
         """Perform the command."""
 
         device = self.getdevicebyname(self.cli.options.host)
-        device.downch()
+        device.downch(self.cli.options.count)
         print(f"{self.cli.options.host} is tuned to channel {device.channel}")
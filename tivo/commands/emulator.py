@@ -6,21 +6,67 @@ This program emulates a TiVo set-top device, which:
 
 This is for testing basic features of the client application
 without an actual device.
+
+The emulator speaks the TiVo TCP Network Remote Control Protocol:
+`SETCH` (with `CH_FAILED` reasons), `IRCODE`, `TELEPORT` (with
+`LIVETV_READY`) and `KEYBOARD`, and may push unsolicited `CH_STATUS`
+messages. Faults may be injected into each device's responses:
+latency, jitter, dropped replies, split and coalesced TCP segments,
+and connection resets. Fault options take a single value for all
+devices, or a comma-separated list of values, one per device.
+
+With `--loopback`, each device binds its own address in 127.0.0.0/8
+(127.0.0.2, 127.0.0.3, ...) on the standard port 31339, and sends its
+beacon from that address, exactly like a fleet of real devices on a
+network. Otherwise, all devices share one address, each on its own
+port (31339, 31340, ...), advertised with a non-standard `port=`
+extension to the beacon.
+
+Each device counts connections, requests by command, replies by
+status, errors, resets and drops, and keeps a histogram of the time
+from each request to its reply. A summary is logged periodically, and
+`--metrics-file` is rewritten with the full metrics in JSON.
+
+With `--replay FILE`, recorded by `tivo --capture FILE`, the emulator
+impersonates each device in the recording. Each connection is served
+the next recorded session of its device, with the recorded timing
+scaled by `--speed`. Requests beyond the end of a session are emulated.
 """
 
 from __future__ import annotations
 
+import argparse
+import contextlib
+import heapq
+import ipaddress
+import json
+import os
 import random
 import socket
+import struct
 import sys
+import time
+from collections import Counter
 from dataclasses import dataclass, field
-from threading import Thread, current_thread
-from time import sleep
-from typing import ClassVar
+from pathlib import Path
+from threading import Condition, Event, Lock, Thread, current_thread
+from time import monotonic, sleep
+from typing import Any, ClassVar, Iterator
 
 from loguru import logger
 
+from tivo.capture import DISCONNECT, RECV, SEND, Record, read_capture, sessions
 from tivo.cmd import TivoCmd
+from tivo.stats import Histogram
+
+
+def _per_device(value: str) -> list[float]:
+    """Parse comma-separated list of per-device values."""
+
+    try:
+        return [float(x) for x in value.split(",")]
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f"invalid value list {value!r}") from err
 
 
 class TivoEmulatorCmd(TivoCmd):
@@ -73,6 +119,111 @@ class TivoEmulatorCmd(TivoCmd):
         )
         self.cli.add_default_to_help(arg, parser)
 
+        arg = parser.add_argument(
+            "-L",
+            "--loopback",
+            action="store_true",
+            help="Bind each device to its own loopback address, on the standard port",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        arg = parser.add_argument(
+            "-p",
+            "--push",
+            type=float,
+            default=0,
+            metavar="SECONDS",
+            help=str(
+                "Average interval in seconds between unsolicited channel changes, "
+                "pushed to all connected clients; 0 to disable"
+            ),
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Seed the random number generators, for repeatable runs",
+        )
+
+        arg = parser.add_argument(
+            "-m",
+            "--metrics-interval",
+            type=float,
+            default=60,
+            metavar="SECONDS",
+            help="Interval between metrics summaries; 0 to disable",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument(
+            "--metrics-file",
+            type=Path,
+            metavar="FILE",
+            help="Rewrite `FILE` with metrics, in JSON, every metrics interval",
+        )
+
+        parser.add_argument(
+            "--replay",
+            type=Path,
+            metavar="FILE",
+            help="Impersonate the devices recorded in capture `FILE`",
+        )
+
+        arg = parser.add_argument(
+            "--speed",
+            type=float,
+            default=1,
+            help="Replay at `SPEED` times the recorded speed; 0 for no delays",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        group = parser.add_argument_group("Fault injection")
+
+        arg = group.add_argument(
+            "-l",
+            "--latency",
+            type=_per_device,
+            default="0",
+            metavar="SECONDS",
+            help="Mean delay before each response",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        arg = group.add_argument(
+            "--distribution",
+            choices=Faults.distributions,
+            default="fixed",
+            help="Distribution of response latency about its mean",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        arg = group.add_argument(
+            "-j",
+            "--jitter",
+            type=_per_device,
+            default="0",
+            metavar="SECONDS",
+            help="Add uniform random jitter, plus or minus `SECONDS`, to each delay",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        for name, text in (
+            ("drop", "Probability that a response is never sent"),
+            ("split", "Probability that a response is split across two TCP segments"),
+            ("coalesce", "Probability that a response is held and sent with the next one"),
+            ("reset", "Probability that a request causes the connection to be reset"),
+            ("reject", "Probability that `SETCH` fails with `NO_LIVE` or `RECORDING`"),
+        ):
+            arg = group.add_argument(
+                f"--{name}",
+                type=_per_device,
+                default="0",
+                metavar="PROBABILITY",
+                help=text,
+            )
+            self.cli.add_default_to_help(arg, parser)
+
     def run(self) -> None:
         """Perform the command."""
 
@@ -95,22 +246,44 @@ class TivoEmulatorCmd(TivoCmd):
             level="TRACE",
         )
 
+        recordings: dict[str, list[list[Record]]] = {}
+        if self.options.replay:
+            recordings = sessions(read_capture(self.options.replay))
+            if not recordings:
+                self.cli.parser.error(f"No sessions recorded in {str(self.options.replay)!r}.")
+            self.options.num_devices = len(recordings)
+        identities = list(recordings)
+
         if self.options.num_devices < 1 or self.options.num_devices > Device.max_num_devices:
             self.cli.parser.error(f"num_devices must be from 1 to {Device.max_num_devices}.")
 
         current_thread().name = "main"
 
+        devices = []
         threads = []
         for device_id in range(1, self.options.num_devices + 1):
             # Each call to the constructor creates a unique device.
-            device = Device(device_id)
+            identity = identities[device_id - 1] if identities else ""
+            device = Device(
+                device_id,
+                faults=self.faults(device_id),
+                loopback=self.options.loopback,
+                identity=identity,
+                sessions=recordings.get(identity, []),
+                interval=self.options.interval,
+                randomize=self.options.randomize,
+                push_interval=self.options.push,
+                speed=self.options.speed,
+            )
+            if self.options.seed is not None:
+                device.rng.seed(self.options.seed + device_id)
             logger.info(f"Starting {device}")
+            devices.append(device)
 
             # Create a thread to run the device.
             thread = Thread(
                 name=f"device-{device_id}",
-                target=self.emulate_device,
-                args=(device,),
+                target=device.emulate,
                 daemon=True,
             )
             threads.append(thread)
@@ -120,55 +293,226 @@ class TivoEmulatorCmd(TivoCmd):
             if self.options.stagger:
                 sleep(self.options.stagger)
 
+        if self.options.metrics_interval:
+            Thread(
+                name="metrics",
+                target=self.report_metrics,
+                args=(devices,),
+                daemon=True,
+            ).start()
+
         try:
             while True:
                 sleep(1)
         except KeyboardInterrupt:
             logger.info("\nStopping all devices...")
+            for device in devices:
+                device.stop()
 
-    def emulate_device(self, device: Device) -> None:
-        """Create thread for tcp-server, and thread for hello broadcaster."""
+    def faults(self, device_id: int) -> Faults:
+        """Return the faults to inject into device `device_id`."""
 
-        logger.info("Starting listener")
+        def _value(values: list[float]) -> float:
+            return values[min(device_id, len(values)) - 1]
 
-        tcp_thread = Thread(
-            name=f"listener-{device.device_id}",
-            target=self.tcp_listener,
-            args=(device,),
-            daemon=True,
+        return Faults(
+            latency=_value(self.options.latency),
+            distribution=self.options.distribution,
+            jitter=_value(self.options.jitter),
+            drop=_value(self.options.drop),
+            split=_value(self.options.split),
+            coalesce=_value(self.options.coalesce),
+            reset=_value(self.options.reset),
+            reject=_value(self.options.reject),
         )
-        tcp_thread.start()
 
-        current_thread().name = f"beacon-{device.device_id}"
-        self.broadcast_hello(device)
+    def report_metrics(self, devices: list[Device]) -> None:
+        """Log a summary of each device's metrics, and write metrics file, periodically."""
 
-    def tcp_listener(self, device: Device) -> None:
-        """Create listener socket, and create thread to handle each connection."""
+        while True:
+            sleep(self.options.metrics_interval)
+            for device in devices:
+                logger.info(f"device-{device.device_id} {device.metrics.summary()}")
 
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind(("0.0.0.0", device.tcp_port))
-            s.listen()
-            logger.info(f"TCP Listener started on port {device.tcp_port}")
-            while True:
-                device.sock, device.addr = s.accept()
-                Thread(
-                    name=f"server-{device.device_id}",
-                    target=self.handle_tcp_connection,
-                    args=(device,),
-                ).start()
+            if self.options.metrics_file:
+                self.write_metrics(self.options.metrics_file, devices)
 
-    def handle_tcp_connection(self, device: Device) -> None:
-        """Handle new tcp connection on `device.sock`."""
+    @staticmethod
+    def write_metrics(path: Path, devices: list[Device]) -> None:
+        """Atomically replace `path` with the metrics of `devices`, in JSON."""
 
-        logger.trace(f"New connection from {device.addr}")
+        data = {
+            "time": time.time(),
+            "devices": {
+                device.identity: {
+                    "device_id": device.device_id,
+                    "address": device.address,
+                    "port": device.tcp_port,
+                    "open_connections": len(device.connections),
+                    **device.metrics.as_dict(),
+                }
+                for device in devices
+            },
+        }
 
-        # Respond to the connect with the current channel.
-        self.send_channel_status(device)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+
+@dataclass
+class Faults:
+    """Faults to inject into the responses of an emulated device."""
+
+    distributions: ClassVar[list[str]] = ["fixed", "uniform", "exponential", "normal"]
+
+    latency: float = 0.0  # mean delay before each response, in seconds.
+    distribution: str = "fixed"  # of latency about its mean.
+    jitter: float = 0.0  # uniform, plus or minus, added to each delay.
+    drop: float = 0.0  # probability that a response is dropped.
+    split: float = 0.0  # probability that a response is split into two segments.
+    coalesce: float = 0.0  # probability that a response is held for the next one.
+    reset: float = 0.0  # probability that a request resets the connection.
+    reject: float = 0.0  # probability that SETCH fails with NO_LIVE or RECORDING.
+
+    def delay(self, rng: random.Random) -> float:
+        """Return a random response delay, in seconds."""
+
+        if self.distribution == "uniform":
+            delay = rng.uniform(0, self.latency * 2)
+        elif self.distribution == "exponential":
+            delay = rng.expovariate(1 / self.latency) if self.latency else 0.0
+        elif self.distribution == "normal":
+            delay = rng.gauss(self.latency, self.latency / 4)
+        else:
+            delay = self.latency
+
+        if self.jitter:
+            delay += rng.uniform(-self.jitter, self.jitter)
+
+        return max(delay, 0.0)
+
+    def happens(self, fault: str, rng: random.Random) -> bool:
+        """Return True if `fault` should be injected now."""
+
+        probability: float = getattr(self, fault)
+        return bool(probability) and rng.random() < probability
+
+
+class Connection:
+    """A client connection to an emulated device.
+
+    Responses are delayed and delivered in order by a writer thread,
+    which also injects segment-level faults.
+    """
+
+    coalesce_window = 0.25  # seconds to hold a response waiting for the next.
+
+    def __init__(self, device: Device, sock: socket.socket, addr: tuple[str, int]) -> None:
+        """Initialize connection, and start its writer thread."""
+
+        self.device = device
+        self.sock = sock
+        self.addr = addr
+        self.closed = False
+        self._rbuf = b""  # received data not yet split into requests
+        # heap of (due, seq, frame, request); request is (command, time received).
+        self._queue: list[tuple[float, int, bytes, tuple[str, float] | None]] = []
+        self._seq = 0
+        self._last_due = 0.0
+        self._cv = Condition()
+        Thread(
+            name=f"writer-{device.device_id}",
+            target=self._writer,
+            daemon=True,
+        ).start()
+
+    def send(self, message: str, request: tuple[str, float] | None = None) -> None:
+        """Schedule `message` to be sent after the device's response delay.
+
+        Args:
+            message: the response, or unsolicited status, to send.
+            request: (command, time received) of the request being answered, if any.
+        """
+
+        self.device.metrics.count_reply(message)
+        faults = self.device.faults
+        if faults.happens("drop", self.device.rng):
+            logger.warning(f"Dropping {message!r}")
+            self.device.metrics.count("drops")
+            return
+
+        with self._cv:
+            # Never reorder responses; a delayed response delays those behind it.
+            self._last_due = max(monotonic() + faults.delay(self.device.rng), self._last_due)
+            self._seq += 1
+            frame = (message + "\r").encode()
+            heapq.heappush(self._queue, (self._last_due, self._seq, frame, request))
+            self._cv.notify()
+
+    def _next_frame(
+        self, timeout: float | None
+    ) -> tuple[bytes, tuple[str, float] | None] | None:
+        """Wait up to `timeout` for the next frame to become due, and return it."""
+
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._cv:
+            while not self.closed:
+                now = monotonic()
+                if self._queue and self._queue[0][0] <= now:
+                    _, _, frame, request = heapq.heappop(self._queue)
+                    return frame, request
+                wait = self._queue[0][0] - now if self._queue else None
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = min(wait, deadline - now) if wait is not None else deadline - now
+                self._cv.wait(wait)
+        return None
+
+    def _writer(self) -> None:
+        """Deliver due frames, injecting segment-level faults."""
+
+        rng = self.device.rng
+        faults = self.device.faults
+
+        while (item := self._next_frame(None)) is not None:
+            frame, request = item
+            requests = [request]
+            if (
+                faults.happens("coalesce", rng)
+                and (other := self._next_frame(self.coalesce_window)) is not None
+            ):
+                logger.debug("Coalescing {!r} with {!r}", frame, other[0])
+                frame += other[0]
+                requests.append(other[1])
 
-        # Then enter a REPL.
-        while True:
             try:
-                data = device.sock.recv(1024)
+                if len(frame) > 1 and faults.happens("split", rng):
+                    cut = rng.randrange(1, len(frame))
+                    logger.debug("Splitting {!r} at {}", frame, cut)
+                    self.sock.sendall(frame[:cut])
+                    sleep(rng.uniform(0.001, 0.05))
+                    self.sock.sendall(frame[cut:])
+                else:
+                    self.sock.sendall(frame)
+                logger.debug(f"Sent {frame!r}")
+            except OSError as err:
+                logger.error(err)
+                self.device.metrics.count("errors")
+                self.close()
+                continue
+
+            sent = monotonic()
+            for command, received in filter(None, requests):
+                self.device.metrics.observe(command, sent - received)
+
+    def receive(self) -> list[str] | None:
+        """Wait for and return the next requests; None when the connection is closed."""
+
+        while not self.closed:
+            try:
+                data = self.sock.recv(1024)
                 if not data:
                     break
             except socket.timeout:
@@ -176,64 +520,111 @@ class TivoEmulatorCmd(TivoCmd):
                 break
             except ConnectionResetError:
                 logger.error("Disconnected")
+                self.device.metrics.count("errors")
                 break
             except OSError as err:
-                logger.error(err)
+                if not self.closed:
+                    logger.error(err)
+                    self.device.metrics.count("errors")
                 break
 
-            message = data.decode("ASCII").rstrip()
-            logger.info(f"Received {message!r}")
+            # Requests are terminated by carriage-return; be lenient about newlines.
+            self._rbuf += data.replace(b"\n", b"\r")
+            *messages, self._rbuf = self._rbuf.split(b"\r")
+            if requests := [x for x in (m.decode("ASCII").strip() for m in messages) if x]:
+                return requests
 
-            if message == "IRCODE CHANNELUP":
-                device.channel += 1
-            elif message == "IRCODE CHANNELDOWN":
-                device.channel -= 1
-            else:
-                logger.info(f"Unhandled {message!r}")
+        return None
 
-            self.send_channel_status(device)
+    def reset(self) -> None:
+        """Abort the connection, causing the client to receive a TCP RST."""
 
-        # device.sock.close()
+        # SO_LINGER with a zero timeout makes close() send RST instead of FIN.
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.close()
 
-    def send_channel_status(self, device: Device) -> None:
-        """Docstring."""
+    def close(self) -> None:
+        """Close the connection, and stop its writer thread."""
 
-        message = f"CH_STATUS {device.channel} REMOTE"
-        logger.debug(f"Sending {message!r}")
+        with self._cv:
+            if self.closed:
+                return
+            self.closed = True
+            self._cv.notify()
+        self.sock.close()
 
-        try:
-            device.sock.send(message.encode())
-        except OSError as err:
-            logger.error(err)
 
-    def broadcast_hello(self, device: Device) -> None:
-        """Broadcast a 'hello' message peridically."""
+@dataclass
+class Metrics:
+    """Server-side counters and latency histograms of an emulated device."""
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    connections: int = 0  # accepted.
+    errors: int = 0  # socket errors, and requests the device does not handle.
+    resets: int = 0  # connections reset by fault injection.
+    drops: int = 0  # responses dropped by fault injection.
+    requests: Counter[str] = field(default_factory=Counter)  # by command.
+    replies: Counter[str] = field(default_factory=Counter)  # by status.
+    latency: dict[str, Histogram] = field(default_factory=dict)  # by command.
+    lock: Lock = field(default_factory=Lock, repr=False)
 
-        port = 2190
-        logger.info(f"Starting beacon on port {port}")
+    def count(self, name: str) -> None:
+        """Increment counter `name`."""
 
-        while True:
-            sock.sendto(device.hello_message, ("<broadcast>", port))
-            logger.debug("Sent broadcast")
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
 
-            if self.options.randomize:
-                sleep_time = random.uniform(
-                    self.options.interval * 0.5, self.options.interval * 1.5
-                )
-            elif self.options.interval == 0:
-                sleep_time = device.device_id
-            else:
-                sleep_time = self.options.interval
+    def count_request(self, message: str) -> None:
+        """Count request `message` by its command."""
+
+        with self.lock:
+            self.requests[message.partition(" ")[0]] += 1
+
+    def count_reply(self, message: str) -> None:
+        """Count reply `message` by its status."""
+
+        with self.lock:
+            self.replies[message.partition(" ")[0]] += 1
+
+    def observe(self, command: str, seconds: float) -> None:
+        """Record the time from receiving a `command` request to sending its reply."""
+
+        with self.lock:
+            if not (histogram := self.latency.get(command)):
+                histogram = self.latency[command] = Histogram()
+            histogram.observe(seconds)
 
-            sleep(sleep_time)
+    def summary(self) -> str:
+        """Return one-line summary."""
+
+        with self.lock:
+            parts = [
+                f"connections {self.connections}",
+                f"requests {sum(self.requests.values())}",
+                f"errors {self.errors}",
+                f"resets {self.resets}",
+                f"drops {self.drops}",
+            ]
+            parts.extend(f"{k} {v.summary()}" for k, v in sorted(self.latency.items()))
+        return "; ".join(parts)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return metrics as a json-serializable dict."""
+
+        with self.lock:
+            return {
+                "connections": self.connections,
+                "errors": self.errors,
+                "resets": self.resets,
+                "drops": self.drops,
+                "requests": dict(self.requests),
+                "replies": dict(self.replies),
+                "latency": {k: v.as_dict() for k, v in self.latency.items()},
+            }
 
 
 @dataclass
 class Device:
-    """Docstring."""
+    """An emulated TiVo set-top device, and its protocol state machine."""
 
     _identities: ClassVar[list[str]] = [
         "7460001902767F2",
@@ -244,23 +635,146 @@ class Device:
         "66600099999CC33",
         "66600099999DD44",
     ]
-    max_num_devices: ClassVar[int] = len(_identities)
+    max_num_devices: ClassVar[int] = 250
+
+    screens: ClassVar[list[str]] = ["LIVETV", "TIVO", "NOWPLAYING", "GUIDE"]
+
+    ircodes: ClassVar[set[str]] = {
+        *(f"NUM{x}" for x in range(10)),
+        *screens,
+        "UP",
+        "DOWN",
+        "LEFT",
+        "RIGHT",
+        "SELECT",
+        "ENTER",
+        "CLEAR",
+        "EXIT",
+        "INFO",
+        "THUMBSUP",
+        "THUMBSDOWN",
+        "CHANNELUP",
+        "CHANNELDOWN",
+        "VOLUMEUP",
+        "VOLUMEDOWN",
+        "MUTE",
+        "PLAY",
+        "PAUSE",
+        "FORWARD",
+        "REVERSE",
+        "SLOW",
+        "REPLAY",
+        "ADVANCE",
+        "RECORD",
+        "STOP",
+        "CC_ON",
+        "CC_OFF",
+        "ACTION_A",
+        "ACTION_B",
+        "ACTION_C",
+        "ACTION_D",
+    }
+
+    keys: ClassVar[set[str]] = {
+        *(chr(x) for x in range(ord("A"), ord("Z") + 1)),
+        *(f"NUM{x}" for x in range(10)),
+        "MINUS",
+        "PLUS",
+        "EQUALS",
+        "LBRACKET",
+        "RBRACKET",
+        "BACKSLASH",
+        "SEMICOLON",
+        "QUOTE",
+        "COMMA",
+        "PERIOD",
+        "SLASH",
+        "BACKQUOTE",
+        "SPACE",
+        "KBDUP",
+        "KBDDOWN",
+        "KBDLEFT",
+        "KBDRIGHT",
+        "UP",
+        "DOWN",
+        "LEFT",
+        "RIGHT",
+        "HOME",
+        "END",
+        "PAGEUP",
+        "PAGEDOWN",
+        "ENTER",
+        "BACKSPACE",
+        "DELETE",
+        "SELECT",
+        "CLEAR",
+        "VOLUMEUP",
+        "VOLUMEDOWN",
+        "MUTE",
+        "ACTION_A",
+        "ACTION_B",
+        "ACTION_C",
+        "ACTION_D",
+    }
 
     device_id: int
-    identity: str = field(init=False)
+    faults: Faults = field(default_factory=Faults)
+    loopback: bool = False
+    identity: str = ""  # assigned from `device_id` when not given.
+    sessions: list[list[Record]] = field(default_factory=list, repr=False)  # to replay.
+    port: int | None = None  # TCP port; assigned from `device_id` when not given; 0 for any.
+    interval: float = 60  # between beacons, in seconds; 0 for `device_id` seconds.
+    randomize: bool = False  # the interval between beacons, by 50-150%.
+    push_interval: float = 0  # mean interval between unsolicited channel changes; 0 to disable.
+    speed: float = 1  # of replay, relative to the recording; 0 for no delays.
+    beacon_port: int = 2190
+    beacon_address: str | None = None  # to send beacons to; None to broadcast.
     channel: int = field(init=False)
+    subchannel: int | None = field(init=False, default=None)
+    reason: str = field(init=False, default="LOCAL")
+    screen: str = field(init=False, default="LIVETV")
+    lineup: list[int] = field(init=False, repr=False)
+    address: str = field(init=False)
     tcp_port: int = field(init=False)
-    sock: socket.socket = field(init=False, repr=False)
-    addr: tuple[str, int] = field(init=False, repr=False)
+    rng: random.Random = field(init=False, repr=False)
+    connections: list[Connection] = field(init=False, repr=False, default_factory=list)
+    metrics: Metrics = field(init=False, repr=False, default_factory=Metrics)
+    lock: Lock = field(init=False, repr=False, default_factory=Lock)
+    listening: Event = field(init=False, repr=False, default_factory=Event)
+    stopping: Event = field(init=False, repr=False, default_factory=Event)
 
     def __post_init__(self) -> None:
-        """Docstring."""
+        """Assign identity, lineup, address and port from `device_id`."""
 
-        self.identity = self._identities[self.device_id - 1]
-        self.channel = ((self.device_id) * 100) + 1  # 101, 201, 301, ...
-        self.tcp_port = 31339 + self.device_id - 1  # 31339, 31340, 31341, ...
+        if not self.identity:
+            self.identity = (
+                self._identities[self.device_id - 1]
+                if self.device_id <= len(self._identities)
+                else f"999{self.device_id:012X}"
+            )
+        self._next_session = 0
 
-        self.hello_message = "\n".join(
+        # 101..149, 201..249, ...; without 110, 120, ..., which are not in the lineup.
+        base = ((self.device_id - 1) % 99 + 1) * 100
+        self.lineup = [x for x in range(base + 1, base + 50) if x % 10]
+        self.channel = base + 1  # 101, 201, 301, ...
+
+        if self.loopback:
+            # 127.0.0.2, 127.0.0.3, ...; all on the standard port.
+            self.address = str(ipaddress.IPv4Address("127.0.0.1") + self.device_id)
+            self.tcp_port = 31339 if self.port is None else self.port
+        else:
+            self.address = "0.0.0.0"
+            # 31339, 31340, 31341, ...
+            self.tcp_port = 31339 + self.device_id - 1 if self.port is None else self.port
+
+        self.rng = random.Random(self.device_id)
+
+    @property
+    def hello_message(self) -> bytes:
+        """Return beacon message."""
+
+        return "\n".join(
             [
                 "tivoconnect=1",
                 "swversion=20.7.4d.RC2-746-2-746",
@@ -270,6 +784,385 @@ class Device:
                 "platform=tcd/Series4",
                 "services=TiVoMediaServer:80/http",
                 # our extension; this device's tcp_listener port.
-                f"port={self.tcp_port}",
+                *([] if self.loopback else [f"port={self.tcp_port}"]),
             ]
         ).encode()
+
+    def emulate(self) -> None:
+        """Create thread for tcp-server, and thread for hello broadcaster."""
+
+        logger.info("Starting listener")
+
+        tcp_thread = Thread(
+            name=f"listener-{self.device_id}",
+            target=self.tcp_listener,
+            daemon=True,
+        )
+        tcp_thread.start()
+
+        if self.push_interval:
+            Thread(
+                name=f"pusher-{self.device_id}",
+                target=self.push_channel_changes,
+                daemon=True,
+            ).start()
+
+        current_thread().name = f"beacon-{self.device_id}"
+        self.broadcast_hello()
+
+    def tcp_listener(self) -> None:
+        """Create listener socket, and create thread to handle each connection."""
+
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((self.address, self.tcp_port))
+            s.listen()
+            self.tcp_port = s.getsockname()[1]  # when bound to any port.
+            self.listening.set()
+            logger.info(f"TCP Listener started on {self.address}:{self.tcp_port}")
+            while not self.stopping.is_set():
+                sock, addr = s.accept()
+                if self.stopping.is_set():
+                    sock.close()  # woken by `stop`
+                    break
+                self.serve(sock, addr)
+
+    def stop(self) -> None:
+        """Stop listening, beaconing and pushing, and close all connections."""
+
+        self.stopping.set()
+        if self.listening.is_set():
+            # Wake `tcp_listener` from its accept.
+            address = "127.0.0.1" if self.address == "0.0.0.0" else self.address
+            with contextlib.suppress(OSError):
+                socket.create_connection((address, self.tcp_port), timeout=1).close()
+
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            # Wake its server from its recv.
+            with contextlib.suppress(OSError):
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            conn.close()
+
+    def serve(self, sock: socket.socket, addr: tuple[str, int] = ("pipe", 0)) -> None:
+        """Serve connected `sock`, from `addr`, in a thread of its own.
+
+        E.g., the other end of a `PipeTransport`.
+        """
+
+        Thread(
+            name=f"server-{self.device_id}",
+            target=self.handle_tcp_connection,
+            args=(Connection(self, sock, addr),),
+            daemon=True,
+        ).start()
+
+    def handle_tcp_connection(self, conn: Connection) -> None:
+        """Handle new tcp connection `conn`."""
+
+        logger.trace(f"New connection from {conn.addr}")
+        self.attach(conn)
+        self.metrics.count("connections")
+
+        if self.sessions:
+            self.replay_session(conn)
+        else:
+            # Respond to the connect with the current channel.
+            conn.send(self.channel_status())
+
+        # Then enter a REPL.
+        while (messages := conn.receive()) is not None:
+            for message in messages:
+                received = monotonic()
+                logger.info(f"Received {message!r}")
+
+                if self.faults.happens("reset", self.rng):
+                    logger.warning(f"Resetting connection on {message!r}")
+                    self.metrics.count("resets")
+                    conn.reset()
+                    break
+
+                if (response := self.handle_request(message)) is not None:
+                    conn.send(response, (message.partition(" ")[0], received))
+
+        self.detach(conn)
+        conn.close()
+
+    def replay_session(self, conn: Connection) -> None:
+        """Serve the next recorded session on new connection `conn`."""
+
+        session = self.next_session()
+        logger.info(f"Replaying session of {len(session)} records")
+
+        pending: list[str] = []
+        request: tuple[str, float] | None = None
+        last = session[0].time
+
+        for record in session[1:]:
+            if record.direction == SEND:
+                # Wait for the client to send the request that was recorded.
+                while not pending:
+                    if (messages := conn.receive()) is None:
+                        return
+                    pending.extend(messages)
+                message = pending.pop(0)
+                logger.info(f"Received {message!r}")
+                if message != record.frame:
+                    logger.warning(f"Expected {record.frame!r}")
+                self.metrics.count_request(message)
+                request = (message.partition(" ")[0], monotonic())
+                last = record.time
+
+            elif record.direction == RECV:
+                if self.speed:
+                    sleep(max(record.time - last, 0) / self.speed)
+                conn.send(record.frame, request)
+                request = None
+                last = record.time
+
+            elif record.direction == DISCONNECT:
+                break
+
+        if pending:
+            logger.warning(f"Not replayed: {pending!r}")
+
+    def push_channel_changes(self) -> None:
+        """Change channels unprompted, and push the status to all connected clients."""
+
+        while not self.stopping.wait(
+            self.rng.uniform(self.push_interval * 0.5, self.push_interval * 1.5)
+        ):
+            self.push(self.change_channel_unprompted())
+
+    def broadcast_hello(self) -> None:
+        """Broadcast a 'hello' message peridically."""
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+        if self.loopback:
+            # Send from the device's own address, to the loopback broadcast address.
+            sock.bind((self.address, 0))
+            broadcast = "127.255.255.255"
+        else:
+            broadcast = "<broadcast>"
+        broadcast = self.beacon_address or broadcast
+
+        logger.info(f"Starting beacon on port {self.beacon_port}")
+
+        while not self.stopping.is_set():
+            sock.sendto(self.hello_message, (broadcast, self.beacon_port))
+            logger.debug("Sent broadcast")
+
+            if self.randomize:
+                sleep_time = self.rng.uniform(self.interval * 0.5, self.interval * 1.5)
+            elif self.interval == 0:
+                sleep_time = self.device_id
+            else:
+                sleep_time = self.interval
+
+            self.stopping.wait(sleep_time)
+        sock.close()
+
+    def attach(self, conn: Connection) -> None:
+        """Add `conn` to the list of connections receiving pushed status."""
+
+        with self.lock:
+            self.connections.append(conn)
+
+    def detach(self, conn: Connection) -> None:
+        """Remove `conn` from the list of connections receiving pushed status."""
+
+        with self.lock:
+            if conn in self.connections:
+                self.connections.remove(conn)
+
+    def push(self, message: str) -> None:
+        """Send unsolicited `message` to all connected clients."""
+
+        with self.lock:
+            connections = list(self.connections)
+
+        logger.info(f"Pushing {message!r} to {len(connections)} connection(s)")
+        for conn in connections:
+            conn.send(message)
+
+    def next_session(self) -> list[Record]:
+        """Return the next recorded session to replay, round-robin."""
+
+        with self.lock:
+            session = self.sessions[self._next_session % len(self.sessions)]
+            self._next_session += 1
+        return session
+
+    def channel_status(self) -> str:
+        """Return `CH_STATUS` message for the current channel."""
+
+        if self.subchannel is None:
+            return f"CH_STATUS {self.channel:04d} {self.reason}"
+        return f"CH_STATUS {self.channel:04d} {self.subchannel:04d} {self.reason}"
+
+    def change_channel_unprompted(self) -> str:
+        """Tune to a random channel, as a local remote or recording would."""
+
+        with self.lock:
+            self.channel = self.rng.choice(self.lineup)
+            self.subchannel = None
+            self.reason = self.rng.choice(["LOCAL", "RECORDING"])
+            self.screen = "LIVETV"
+            return self.channel_status()
+
+    def handle_request(self, message: str) -> str | None:
+        """Update state per request `message`, and return response, if any."""
+
+        command, _, args = message.partition(" ")
+        self.metrics.count_request(message)
+        with self.lock:
+            if handler := getattr(self, f"_handle_{command.lower()}", None):
+                response: str | None = handler(args.split())
+                return response
+
+        logger.info(f"Unhandled {message!r}")
+        self.metrics.count("errors")
+        return None
+
+    def _handle_setch(self, args: list[str]) -> str:
+        if not args:
+            return "CH_FAILED MISSING_CHANNEL"
+        if not all(x.isdigit() for x in args[:2]):
+            return "CH_FAILED MALFORMED_CHANNEL"
+        if (channel := int(args[0])) not in self.lineup:
+            return "CH_FAILED INVALID_CHANNEL"
+        if self.faults.happens("reject", self.rng):
+            return "CH_FAILED " + self.rng.choice(["NO_LIVE", "RECORDING"])
+
+        self.channel = channel
+        self.subchannel = int(args[1]) if len(args) > 1 else None
+        self.reason = "REMOTE"
+        self.screen = "LIVETV"
+        return self.channel_status()
+
+    def _handle_ircode(self, args: list[str]) -> str | None:
+        if not args or args[0] not in self.ircodes:
+            return None  # ignored by the device
+
+        code = args[0]
+        if code in ("CHANNELUP", "CHANNELDOWN"):
+            index = self.lineup.index(self.channel) if self.channel in self.lineup else 0
+            index += 1 if code == "CHANNELUP" else -1
+            self.channel = self.lineup[index % len(self.lineup)]
+            self.subchannel = None
+            self.reason = "REMOTE"
+            self.screen = "LIVETV"
+            return self.channel_status()
+
+        if code in self.screens:
+            self.screen = code
+        return None
+
+    def _handle_teleport(self, args: list[str]) -> str | None:
+        if not args:
+            return "MISSING_TELEPORT_NAME"
+        if args[0] not in self.screens:
+            return None  # ignored by the device
+
+        self.screen = args[0]
+        return "LIVETV_READY" if self.screen == "LIVETV" else None
+
+    def _handle_keyboard(self, args: list[str]) -> str | None:
+        if not args or args[0] not in self.keys:
+            return "INVALID_KEY"
+        return None
+
+
+class Fleet:
+    """Emulated devices, for tests; importable, and safe to run in parallel.
+
+    Each device listens on a TCP port assigned by the OS, and sends its
+    beacons, if any, to `beacon_port` on the loopback address, instead of
+    broadcasting them to the standard port; so fleets, e.g., in parallel
+    test workers, never hear each other.
+
+        with Fleet(3, interval=0.1) as fleet:
+            core = TivoCore(options, config)
+            listener = TivoListener(core, fleet.beacon_port)
+            ...
+    """
+
+    address = "127.0.0.1"
+
+    def __init__(self, count: int = 1, interval: float = 0, **kwargs: Any) -> None:
+        """Emulate `count` devices, beaconing every `interval` seconds, or not if 0.
+
+        Other `kwargs`, such as `faults` or `push_interval`, are passed to each `Device`.
+        """
+
+        self.interval = interval
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind((self.address, 0))
+            self.beacon_port: int = sock.getsockname()[1]  # free, for the client to bind.
+
+        self.devices = [
+            Device(
+                device_id,
+                port=0,
+                interval=interval,
+                beacon_port=self.beacon_port,
+                beacon_address=self.address,
+                **kwargs,
+            )
+            for device_id in range(1, count + 1)
+        ]
+        self._threads: list[Thread] = []
+
+    def __enter__(self) -> Fleet:
+        self.start()
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        self.stop()
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def __iter__(self) -> Iterator[Device]:
+        return iter(self.devices)
+
+    def __getitem__(self, index: int) -> Device:
+        return self.devices[index]
+
+    def start(self, timeout: float = 5.0) -> None:
+        """Start all devices, and wait up to `timeout` seconds for each to listen."""
+
+        for device in self.devices:
+            targets = [device.tcp_listener]
+            if self.interval:
+                targets.append(device.broadcast_hello)
+            if device.push_interval:
+                targets.append(device.push_channel_changes)
+            for target in targets:
+                thread = Thread(
+                    name=f"{target.__name__}-{device.device_id}", target=target, daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        for device in self.devices:
+            if not device.listening.wait(timeout):
+                raise RuntimeError(f"Device {device.device_id} is not listening")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop all devices, and wait up to `timeout` seconds for their threads."""
+
+        for device in self.devices:
+            device.stop()
+        deadline = monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - monotonic(), 0))
+        self._threads = [x for x in self._threads if x.is_alive()]
+
+    def alive(self) -> bool:
+        """Return whether any thread of the devices is running; e.g., not yet stopped."""
+
+        return any(x.is_alive() for x in self._threads)
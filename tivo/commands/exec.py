@@ -0,0 +1,251 @@
+"""Tivo Batch Mode.
+
+The `%(prog)s` command reads commands, one per line, from `FILE` or
+standard input, and runs each over a connection to its device, which
+is kept open for all the commands to that device:
+
+    HOST getch
+    HOST setch CHANNEL [SUBCHANNEL]
+    HOST upch
+    HOST downch
+    HOST ircode CODE
+    HOST keyboard KEY [KEY ...]
+    HOST teleport SCREEN
+
+Blank lines, and lines starting with `#`, are ignored; words may be
+quoted. For each command, one line is printed, in the order read:
+
+    LINENO OUTCOME MILLISECONDS [REPLY]
+
+where `OUTCOME` is `ok`, `failed` (`CH_FAILED`), `timeout` or `error`,
+and `REPLY` is the reply from the device, if any, or why the command
+could not be run.
+
+With `--pipeline DEPTH`, up to `DEPTH` requests to each device are sent
+before waiting for the oldest reply. Results are printed as soon as all
+earlier ones are, and whenever more input is not yet available, all
+replies are awaited, so a client may write commands and read results
+interactively.
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import shlex
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+
+from tivo.cmd import TivoCmd
+from tivo.device import TivoDevice
+from tivo.pipeline import ERROR, OK, Pipeline, Reply
+
+
+class _Line:
+    """Progress of one input line, which may send several requests."""
+
+    def __init__(self, lineno: int) -> None:
+        self.lineno = lineno
+        self.pending = 0  # requests without a reply
+        self.outcome = ""
+        self.seconds = 0.0
+        self.message: str | None = None
+
+    def add(self, reply: Reply) -> None:
+        """Add `reply` to one of the requests of this line."""
+
+        self.pending -= 1
+        self.seconds += reply.seconds
+        if not self.outcome or self.outcome == OK:
+            self.outcome = reply.outcome
+            self.message = reply.message or self.message
+
+    def __str__(self) -> str:
+        return " ".join(
+            x
+            for x in (str(self.lineno), self.outcome, f"{self.seconds * 1000:.1f}", self.message)
+            if x
+        )
+
+
+class _Reader:
+    """Lines read from file descriptor `fd`, knowing whether another is ready.
+
+    Not a buffered file: `select` can't see lines it has already read.
+    """
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self._buffer = b""
+        self._start = 0  # of the next line in `_buffer`
+        self._eof = False
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            while (end := self._buffer.find(b"\n", self._start)) < 0 and not self._eof:
+                self._fill()
+            if end < 0:
+                end = len(self._buffer) - 1
+                if end < self._start:
+                    return
+            line = self._buffer[self._start : end + 1]
+            self._start = end + 1
+            yield line.decode("utf-8", errors="replace")
+
+    def _fill(self) -> None:
+        """Read more, waiting if need be."""
+
+        data = os.read(self.fd, 65536)
+        self._buffer = self._buffer[self._start :] + data
+        self._start = 0
+        self._eof = not data
+
+    def ready(self) -> bool:
+        """Return whether another line can be read without waiting."""
+
+        while self._buffer.find(b"\n", self._start) < 0 and not self._eof:
+            try:
+                if not select.select([self.fd], [], [], 0)[0]:
+                    return False
+            except (OSError, ValueError):
+                return True  # not selectable
+            self._fill()
+        return True
+
+
+class TivoExecCmd(TivoCmd):
+    """Tivo `exec` command class."""
+
+    def init_command(self) -> None:
+        """Initialize Tivo `exec` command instance."""
+
+        parser = self.add_subcommand_parser(
+            "exec",
+            help="run commands read from `FILE` or stdin",
+            description=__doc__,
+        )
+
+        parser.add_argument(
+            "file",
+            metavar="FILE",
+            type=Path,
+            nargs="?",
+            help="read commands from `FILE` (default: standard input)",
+        )
+
+        arg = parser.add_argument(
+            "-P",
+            "--pipeline",
+            type=int,
+            default=1,
+            metavar="DEPTH",
+            help="Maximum number of requests in flight to each device",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument("-p", "--port", type=int, help="Connect to TCP `PORT`")
+
+    def run(self) -> None:
+        """Perform the command."""
+
+        if self.cli.options.pipeline < 1:
+            self.cli.parser.error("pipeline must be at least 1.")
+
+        self._pipelines: dict[str, Pipeline] = {}  # by HOST
+        self._lines: list[_Line] = []  # not yet printed
+
+        if self.cli.options.file and str(self.cli.options.file) != "-":
+            with open(self.cli.options.file, "rb") as file:
+                self._run(_Reader(file.fileno()))
+        else:
+            self._run(_Reader(sys.stdin.fileno()))
+
+        for pipeline in self._pipelines.values():
+            pipeline.device.close()
+
+    def _run(self, reader: _Reader) -> None:
+        """Run each command read from `reader`."""
+
+        for lineno, text in enumerate(reader, 1):
+            line = _Line(lineno)
+            try:
+                if not (words := shlex.split(text, comments=True)):
+                    continue
+            except ValueError as err:
+                line.outcome, line.message = ERROR, f"can't parse {text.strip()!r}; {err}"
+                words = []
+
+            self._lines.append(line)
+            if words:
+                self._execute(line, words)
+            if not reader.ready():
+                self._flush()
+            self._print()
+
+        self._flush()
+        self._print()
+
+    def _execute(self, line: _Line, words: list[str]) -> None:
+        """Send the requests of command `words`, read from `line`."""
+
+        host, command, args = words[0], words[1] if len(words) > 1 else "", words[2:]
+
+        requests: list[str] = []
+        if command == "getch" and not args:
+            requests = ["getch"]
+        elif command == "setch" and len(args) in (1, 2):
+            requests = ["SETCH " + " ".join(args)]
+        elif command in ("upch", "downch") and not args:
+            requests = ["IRCODE CHANNELUP" if command == "upch" else "IRCODE CHANNELDOWN"]
+        elif command == "ircode" and len(args) == 1:
+            requests = ["IRCODE " + args[0]]
+        elif command == "keyboard" and args:
+            requests = ["KEYBOARD " + x for x in args]
+        elif command == "teleport" and len(args) == 1:
+            requests = ["TELEPORT " + args[0]]
+        else:
+            line.outcome, line.message = ERROR, f"can't parse {' '.join(words)!r}"
+            return
+
+        if not (pipeline := self._pipeline(host)):
+            line.outcome, line.message = ERROR, f"unknown host {host!r}"
+            return
+
+        line.pending = len(requests)
+        for request in requests:
+            if request == "getch":
+                replies = pipeline.getch(line)
+            else:
+                replies = pipeline.submit(request, line)
+            for reply in replies:
+                reply.token.add(reply)
+
+    def _pipeline(self, host: str) -> Pipeline | None:
+        """Return pipeline to `host`, connecting if necessary."""
+
+        if pipeline := self._pipelines.get(host):
+            return pipeline
+
+        if not (device := self.core.resolve_device(host)):
+            device = TivoDevice(host, host=host)
+            if not device.address:
+                return None
+        if self.cli.options.port:
+            device.port = self.cli.options.port
+
+        pipeline = self._pipelines[host] = Pipeline(device, self.cli.options.pipeline)
+        return pipeline
+
+    def _flush(self) -> None:
+        """Wait for the replies to all requests in flight."""
+
+        for pipeline in self._pipelines.values():
+            for reply in pipeline.flush():
+                reply.token.add(reply)
+
+    def _print(self) -> None:
+        """Print the results of all completed lines not preceded by an incomplete one."""
+
+        while self._lines and self._lines[0].pending <= 0:
+            print(self._lines.pop(0), flush=True)
@@ -0,0 +1,93 @@
+"""Tivo `history` command module."""
+
+import argparse
+import json
+import re
+import time
+from datetime import datetime
+
+from tivo.cmd import TivoCmd
+from tivo.history import history_path, read_history
+from tivo.hosts import DEVICES
+from tivo.state import read_state
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def _when(value: str) -> float:
+    """Parse `value`, an age such as `90m` or `2d`, or an ISO date and time, to seconds."""
+
+    if match := re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", value):
+        return time.time() - float(match.group(1)) * _UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f"invalid time {value!r}") from err
+
+
+class TivoHistoryCmd(TivoCmd):
+    """Tivo `history` command class."""
+
+    def init_command(self) -> None:
+        """Initialize Tivo `history` command instance."""
+
+        parser = self.add_subcommand_parser(
+            "history",
+            help="print channel history",
+            description=self.cli.dedent("""
+    The `%(prog)s` command prints, for each `HOST`, the channel changes
+    seen by every `tivo` process that talked to the device: the time, the
+    channel and subchannel, and the reason (`LOCAL`, `REMOTE` or
+    `RECORDING`).
+
+    `WHEN` is an age, such as `90m`, `12h`, `2d` or `1w`, or an ISO date
+    and time, such as `2026-10-01` or `2026-10-01T18:30`.
+                """),
+        )
+
+        host = parser.add_argument(
+            "host", metavar="HOST", nargs="?", help="print only the history of `HOST`"
+        )
+        host.completer = self._known_hosts_completer  # type: ignore[attr-defined]
+
+        parser.add_argument(
+            "--since", type=_when, default=0.0, metavar="WHEN", help="print changes from `WHEN`"
+        )
+
+        parser.add_argument(
+            "--until", type=_when, metavar="WHEN", help="print changes before `WHEN`"
+        )
+
+        parser.add_argument("--json", action="store_true", help="print history as JSON")
+
+    def run(self) -> None:
+        """Perform the command."""
+
+        options = self.cli.options
+        hosts = {k: v.get("host") or "" for k, v in (read_state(DEVICES) or {}).items()}
+        hosts |= {x.identity: x.host or "" for x in self.core.devices.values()}
+
+        data = {}
+        for path in sorted(history_path("*").parent.glob("*.bin")):
+            identity = path.stem
+            host = hosts.get(identity, "")
+            if options.host and options.host not in (identity, host):
+                continue
+            data[identity] = (host, list(read_history(path, options.since, options.until)))
+
+        if options.json:
+            print(
+                json.dumps(
+                    {
+                        k: {"host": h, "history": [x._asdict() for x in entries]}
+                        for k, (h, entries) in data.items()
+                    },
+                    indent=2,
+                )
+            )
+            return
+
+        for identity, (host, entries) in sorted(data.items(), key=lambda x: x[1][0]):
+            print(f"host {host} identity {identity}")
+            for entry in entries:
+                print(f"    {entry}")
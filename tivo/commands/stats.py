@@ -0,0 +1,65 @@
+"""Tivo `stats` command module."""
+
+import contextlib
+import json
+
+from tivo.cmd import TivoCmd
+from tivo.state import lock_state, state_dir
+from tivo.stats import DeviceStats, load_stats
+
+
+class TivoStatsCmd(TivoCmd):
+    """Tivo `stats` command class."""
+
+    def init_command(self) -> None:
+        """Initialize Tivo `stats` command instance."""
+
+        parser = self.add_subcommand_parser(
+            "stats",
+            help="print latency statistics",
+            description=self.cli.dedent("""
+    The `%(prog)s` command prints, for each `HOST`, the latency of each
+    operation, and the number of operations that timed out or failed,
+    accumulated by every `tivo` process that used the device.
+
+    Operations are `connect`, `send COMMAND`, and `recv COMMAND`, which is
+    the wait for the reply to `COMMAND`; `recv CONNECT` is the wait for the
+    status a device sends when connected.
+                """),
+        )
+
+        host = parser.add_argument(
+            "host", metavar="HOST", nargs="?", help="print only statistics of `HOST`"
+        )
+        host.completer = self._known_hosts_completer  # type: ignore[attr-defined]
+
+        parser.add_argument("--json", action="store_true", help="print statistics as JSON")
+
+        parser.add_argument(
+            "--reset", action="store_true", help="discard all statistics, after printing"
+        )
+
+    def run(self) -> None:
+        """Perform the command."""
+
+        path = state_dir() / "stats.json"
+        # Reset under the lock of writers, so none of their stats are lost unprinted.
+        with lock_state(path) if self.cli.options.reset else contextlib.nullcontext():
+            self._print(load_stats(path))
+            if self.cli.options.reset:
+                path.unlink(missing_ok=True)
+
+    def _print(self, stats: dict[str, tuple[str, DeviceStats]]) -> None:
+        """Print `stats` of the devices selected."""
+
+        if name := self.cli.options.host:
+            stats = {k: v for k, v in stats.items() if name in (k, v[0])}
+
+        if self.cli.options.json:
+            data = {k: {"host": h, "stats": s.as_dict()} for k, (h, s) in stats.items()}
+            print(json.dumps(data, indent=2))
+        else:
+            for identity, (host, device_stats) in sorted(stats.items(), key=lambda x: x[1][0]):
+                print(f"host {host} identity {identity}")
+                for operation in device_stats.operations():
+                    print(f"    {operation:<16} {device_stats.summary(operation)}")
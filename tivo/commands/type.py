@@ -0,0 +1,45 @@
+"""Tivo `type` command module."""
+
+from tivo.cmd import TivoCmd
+
+
+class TivoTypeCmd(TivoCmd):
+    """Tivo `type` command class."""
+
+    def init_command(self) -> None:
+        """Initialize Tivo `type` command instance."""
+
+        parser = self.add_subcommand_parser(
+            "type",
+            help="type `TEXT` on `HOST`",
+            description=self.cli.dedent("""
+    The `%(prog)s` command types `TEXT` on `HOST`, as if on its on-screen
+    keyboard; e.g., into a search. Letters, digits, space and common
+    punctuation can be typed.
+
+    All keys are sent in one write, unless `--rate` paces them.
+                """),
+        )
+
+        self.add_host_argument(parser)
+
+        parser.add_argument("text", metavar="TEXT", help="type `TEXT` on `HOST`")
+
+        parser.add_argument(
+            "--rate",
+            type=float,
+            metavar="KEYS",
+            help="type `KEYS` per second",
+        )
+
+    def run(self) -> None:
+        """Perform the command."""
+
+        options = self.cli.options
+        device = self.getdevicebyname(options.host)
+        try:
+            device.type_text(options.text, options.rate)
+        except ValueError as err:
+            self.cli.parser.error(f"{err}.")
+        if device.status in ("Can't connect", "Can't send"):
+            self.cli.parser.error(f"Can't type on {options.host!r}; {device.reason}.")
@@ -12,14 +12,24 @@ class TivoUpchCmd(TivoCmd):
         parser = self.add_subcommand_parser(
             "upch",
             help="tune to next channel on `HOST`",
-            description="The `%(prog)s` command tunes `HOST` up to next channel.",
+            description="The `%(prog)s` command tunes `HOST` up to next channel, "
+            "or up `COUNT` channels.",
         )
 
         self.add_host_argument(parser)
 
+        parser.add_argument(
+            "count",
+            metavar="COUNT",
+            type=int,
+            nargs="?",
+            default=1,
+            help="tune up `COUNT` channels (default: 1)",
+        )
+
     def run(self) -> None:
         """Perform the command."""
 
         device = self.getdevicebyname(self.cli.options.host)
-        device.upch()
+        device.upch(self.cli.options.count)
         print(f"{self.cli.options.host} is tuned to channel {device.channel}")
@@ -0,0 +1,194 @@
+"""Tivo Event Stream.
+
+The `%(prog)s` command listens for devices, without the full-screen
+application, and writes one JSON object per line to standard output for
+each event:
+
+    device   a device is configured, or discovered,
+    hello    a hello message is received from a device,
+    channel  a device changes channel, or subchannel,
+    failed   a device replies `CH_FAILED`,
+    timeout  a device does not connect, or reply, in time,
+    error    a connection can't be made, or is lost,
+    health   a device is marked `online`, `stale` or `offline`,
+    dropped  `COUNT` events were discarded; see below.
+
+Each object has the `event`, the wall-clock `time` and `monotonic` time,
+in seconds, and the `identity`, `host`, `address`, `machine`, `health`,
+`status`, `channel`, `subchannel` and `reason` of the device at the time.
+
+Devices are discovered, and talked to, by one thread; events are written
+by a thread of their own, so a slow consumer never delays discovery;
+when more than `--buffer` events are waiting to be written, new events
+are discarded, and counted in a `dropped` event.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, TextIO
+
+from tivo.cmd import TivoCmd
+from tivo.device import TivoDevice
+from tivo.ioloop import IOLoop
+from tivo.listener import TivoListener
+
+
+class _EventWriter:
+    """Write events as JSON lines, from a thread of its own, without blocking producers."""
+
+    def __init__(self, file: TextIO, maxlen: int) -> None:
+        """Write to `file`, with up to `maxlen` events waiting to be written."""
+
+        self.file = file
+        self.maxlen = maxlen
+        self.dropped = 0  # events discarded since the last `dropped` event
+        self.broken = False  # the consumer went away
+        self._events: deque[dict[str, Any]] = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(name="writer", target=self._run, daemon=True)
+
+    def start(self) -> None:
+        """Start writing."""
+        self._thread.start()
+
+    def put(self, event: dict[str, Any]) -> None:
+        """Queue `event` to be written, or discard it when the queue is full."""
+
+        with self._cond:
+            if len(self._events) >= self.maxlen:
+                self.dropped += 1
+                return
+            self._events.append(event)
+            self._cond.notify()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the events queued, and stop, waiting up to `timeout` seconds."""
+
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._events and not self.dropped and not self._closed:
+                    self._cond.wait()
+                events, self._events = self._events, deque()
+                dropped, self.dropped = self.dropped, 0
+                closed = self._closed
+
+            if dropped:
+                events.append(_record(None, "dropped") | {"count": dropped})
+
+            # One write, and one flush, of everything waiting.
+            try:
+                self.file.write("".join(json.dumps(x) + "\n" for x in events))
+                self.file.flush()
+            except (BrokenPipeError, ValueError):
+                self.broken = True
+                return
+
+            if closed:
+                return
+
+
+def _record(device: TivoDevice | None, event: str) -> dict[str, Any]:
+    """Return `event` of `device`, with the state of `device`, as a json-serializable dict."""
+
+    record: dict[str, Any] = {
+        "event": event,
+        "time": time.time(),
+        "monotonic": time.monotonic(),
+    }
+    if device:
+        state = device.state
+        record |= {
+            "identity": state.identity,
+            "host": state.host,
+            "address": state.address,
+            "machine": state.machine,
+            "health": state.health,
+            "status": state.status,
+            "channel": state.channel,
+            "subchannel": state.subchannel,
+            "reason": state.reason,
+        }
+    return record
+
+
+class TivoWatchCmd(TivoCmd):
+    """Tivo `watch` command class."""
+
+    def init_command(self) -> None:
+        """Initialize Tivo `watch` command instance."""
+
+        parser = self.add_subcommand_parser(
+            "watch",
+            help="print device events as JSON lines",
+            description=__doc__,
+        )
+
+        arg = parser.add_argument(
+            "--buffer",
+            type=int,
+            default=10000,
+            metavar="COUNT",
+            help="Maximum number of events waiting to be written",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+        parser.add_argument(
+            "-n",
+            "--count",
+            type=int,
+            help="Exit after `COUNT` events",
+        )
+
+        arg = parser.add_argument(
+            "--beacon-port",
+            type=int,
+            default=TivoListener.beacon_port,
+            metavar="PORT",
+            help="Listen for hello messages on UDP `PORT`",
+        )
+        self.cli.add_default_to_help(arg, parser)
+
+    def run(self) -> None:
+        """Perform the command."""
+
+        options = self.cli.options
+        if options.buffer < 1:
+            self.cli.parser.error("buffer must be at least 1.")
+
+        writer = _EventWriter(sys.stdout, options.buffer)
+        stop = threading.Event()
+        nevents = 0
+
+        def _handle_event(device: TivoDevice, event: str) -> None:
+            nonlocal nevents
+            writer.put(_record(device, event))
+            nevents += 1
+            if writer.broken or (options.count is not None and nevents >= options.count):
+                stop.set()
+
+        # Configured devices were added before there was anyone to tell.
+        for device in self.core.devices.values():
+            writer.put(_record(device, self.core.DEVICE))
+            nevents += 1
+        self.core.set_event_callback(_handle_event)
+
+        writer.start()
+        try:
+            if options.count is None or nevents < options.count:
+                IOLoop(self.core, TivoListener(self.core, options.beacon_port)).run(stop)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            writer.close()
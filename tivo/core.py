@@ -1,14 +1,36 @@
 """Docstring."""
 
+from __future__ import annotations
+
+import functools
+import threading
 from argparse import Namespace
-from typing import Any, Callable
+from collections import deque
+from concurrent import futures
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable
+
+from loguru import logger
 
 from tivo.device import TivoDevice
+from tivo.history import History, history_path
+from tivo.hosts import DEVICES
+from tivo.lineup import LINEUPS, Lineup
+from tivo.scheduler import HealthScheduler
+from tivo.state import lock_state, read_state, state_dir, write_state
+from tivo.stats import save_stats
+
+if TYPE_CHECKING:
+    from tivo.ioloop import IOLoop
 
 
 class TivoCore:
     """Docstring."""
 
+    DEVICE = "device"  # event passed to `event_callback` when a device is added
+    resolve_timeout = 2.0  # seconds the loop waits, at startup, for configured hosts to resolve
+    resolvers = 16  # maximum number of hosts resolved at once
+
     def __init__(self, options: Namespace, config: dict[str, Any]) -> None:
         """Docstring."""
 
@@ -17,6 +39,92 @@ class TivoCore:
         self.devices: dict[str, TivoDevice] = {}
         self.ui_add_device_callback: Callable[[TivoDevice], None] | None = None
         self.ui_update_status_callback: Callable[[], None] | None = None
+        self.event_callback: Callable[[TivoDevice, str], None] | None = None
+        self._lineups: dict[str, Any] = read_state(LINEUPS) or {}  # learned by earlier runs
+        # Driven by the loop, if any.
+        self.loop: IOLoop | None = None  # makes the i/o of every device, once started
+        self.scheduler = HealthScheduler(getattr(options, "poll_interval", 0.0) or 0.0)
+        # Of the addresses of configured devices, until applied.
+        self._lookups: dict[TivoDevice, Future[tuple[str | None, str | None]]] = {}
+
+        # Add devices from config file.
+
+        if identities := self.config.get("identity"):
+            # Look them up at once, not one after another; see `wait_resolved`.
+            devices = [TivoDevice(identity=x) for x in identities]
+            for device, host in zip(devices, identities.values(), strict=True):
+                device.host = host
+            self.resolve(devices)
+            for device in devices:
+                logger.info("{!r} Configured device", device.host)
+                self.add_device(device)
+
+    def resolve(self, devices: list[TivoDevice]) -> None:
+        """Start looking up the addresses, or names, of `devices`, on up to `resolvers` threads.
+
+        The threads only look up; each result is applied by `_apply`, on the
+        loop's thread once there is a loop, so devices change on one thread.
+        """
+
+        lookups = {device: Future[tuple[str | None, str | None]]() for device in devices}
+        self._lookups.update(lookups)
+        pending = deque(lookups.items())
+
+        def _worker() -> None:
+            while True:
+                try:
+                    device, future = pending.popleft()
+                except IndexError:
+                    return
+                future.set_result(device.lookup())
+                if loop := self.loop:  # else, applied by `wait_resolved`
+                    loop.call_soon(functools.partial(self._apply, device, poll=True))
+
+        for _ in range(min(len(devices), self.resolvers)):
+            threading.Thread(name="resolver", target=_worker, daemon=True).start()
+
+    def _apply(self, device: TivoDevice, poll: bool = False) -> None:
+        """Apply the lookup of the address of `device`, once; then `poll` it, to connect."""
+
+        if (future := self._lookups.pop(device, None)) is None:
+            return  # applied already
+        device.set_address(*future.result())
+        if poll and device.address:
+            device.poll()
+
+    def wait_resolved(
+        self, devices: list[TivoDevice] | None = None, timeout: float | None = None
+    ) -> None:
+        """Wait up to `timeout`, or for ever, for the lookups of `devices`, or of all.
+
+        Apply those done; call before the loop is started. Lookups done later
+        are applied on the loop's thread, and the devices polled.
+        """
+
+        lookups = {
+            device: future
+            for device in (list(self._lookups) if devices is None else devices)
+            if (future := self._lookups.get(device))
+        }
+        futures.wait(lookups.values(), timeout)
+        for device, future in lookups.items():
+            if future.done():
+                self._apply(device)
+        if unresolved := [x.host for x, y in lookups.items() if not y.done()]:
+            logger.debug("Still looking up {!r}", unresolved)
+
+    def resolve_device(self, name: str) -> TivoDevice | None:
+        """Return device `name`, once its address is looked up; `get_device_by_name`, waiting.
+
+        When no device is named `name`, it may be the address of one still being looked up.
+        """
+
+        if (device := self.get_device_by_name(name)) is None and self._lookups:
+            self.wait_resolved()
+            device = self.get_device_by_name(name)
+        if device:
+            self.wait_resolved([device])
+        return device
 
     def set_ui_add_device_callback(self, callback: Callable[[TivoDevice], None]) -> None:
         """Docstring."""
@@ -28,13 +136,33 @@ class TivoCore:
 
         self.ui_update_status_callback = callback
 
+    def set_event_callback(self, callback: Callable[[TivoDevice, str], None]) -> None:
+        """Call `callback(device, event)` upon each event of every device.
+
+        Events are `DEVICE`, when a device is added, and those of `TivoDevice`.
+        """
+
+        self.event_callback = callback
+
     def add_device(self, device: TivoDevice) -> None:
         """Docstring."""
 
         self.devices[device.identity] = device
+        if lineup := self._lineups.get(device.identity):
+            device.lineup = Lineup.from_dict(lineup)
+        if not device.history:
+            device.history = History(history_path(device.identity))
+        self.scheduler.add(device)
+        device.loop = self.loop
+        device.event_callback = self._handle_event
+        self._handle_event(device, self.DEVICE)
         if self.ui_add_device_callback:
             self.ui_add_device_callback(device)
 
+    def _handle_event(self, device: TivoDevice, event: str) -> None:
+        if self.event_callback:
+            self.event_callback(device, event)
+
     def get_device_by_name(self, name: str) -> TivoDevice | None:
         """Docstring."""
 
@@ -43,3 +171,43 @@ class TivoCore:
                 return device
         # raise NameError(f"Can't find tivo device `{name}`")
         return None
+
+    def save_stats(self) -> None:
+        """Merge the stats of the devices used by this process into the stats file."""
+
+        if stats := {
+            device.identity: (device.host or "", device.stats)
+            for device in self.devices.values()
+            if device.stats
+        }:
+            save_stats(state_dir() / "stats.json", stats)
+
+    def save_devices(self) -> None:
+        """Remember the devices discovered by this process, for `HOST` completion."""
+
+        discovered = {
+            device.identity: {"host": device.host, "address": device.address}
+            for device in self.devices.values()
+            if device.npings
+        }
+        devices = read_state(DEVICES) or {}
+        if discovered and any(devices.get(k) != v for k, v in discovered.items()):
+            write_state(DEVICES, devices | discovered)
+
+    def save_lineups(self) -> None:
+        """Remember the channel lineups learned by this process."""
+
+        if changed := {
+            device.identity: device.lineup.as_dict()
+            for device in self.devices.values()
+            if device.lineup.changed
+        }:
+            with lock_state(state_dir() / LINEUPS):
+                write_state(LINEUPS, (read_state(LINEUPS) or {}) | changed)
+
+    def close_history(self) -> None:
+        """Close the channel history logs of all devices."""
+
+        for device in self.devices.values():
+            if device.history:
+                device.history.close()
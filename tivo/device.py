@@ -3,20 +3,170 @@
 Set-top Tivo device.
 """
 
+from __future__ import annotations
+
+import select
 import socket
 import time
+from concurrent import futures
+from typing import TYPE_CHECKING, Any, Callable
 
-from libcurses.bw import BorderedWindow
 from loguru import logger
 
+from tivo.capture import CONNECT, DISCONNECT, RECV, SEND, Capture
+from tivo.history import History
+from tivo.lineup import Lineup
+from tivo.pacer import KeyPacer
+from tivo.stats import DeviceStats
+from tivo.transport import TcpTransport, Transport
+
+if TYPE_CHECKING:
+    # Only the interactive application, which imports curses, sets `window`.
+    from libcurses.bw import BorderedWindow
+
+    from tivo.ioloop import IOLoop
+
 # https://github.com/RogueProeliator/IndigoPlugin-TiVo-Network-Remote/blob/master/Documentation/TiVo_TCP_Network_Remote_Control_Protocol.pdf
 
 
+def _since(when: float) -> str:
+    """Return time since `when`, and `when`, formatted for display."""
+
+    if not when:
+        return "00:00:00 00:00:00"
+
+    diff = time.strftime("%H:%M:%S", time.gmtime(time.time() - when))
+    then = time.strftime("%H:%M:%S", time.localtime(when))
+    return f"{diff} ({then})"
+
+
+class DeviceState:
+    """Immutable snapshot of the state of a device.
+
+    The thread that changes a device publishes a new snapshot, with a
+    greater `version`, by replacing `TivoDevice.state`; a reader on
+    another thread reads `state` once, and sees one consistent update,
+    without locks.
+    """
+
+    fields = (
+        "identity",
+        "machine",
+        "address",
+        "host",
+        "port",
+        "timeout",
+        "health",
+        "screen",
+        "last_msg_sent",
+        "last_msg_rcvd",
+        "last_seen",
+        "status",
+        "channel",
+        "subchannel",
+        "reason",
+        "npings",
+    )
+    __slots__ = ("version", *fields)
+
+    version: int
+    identity: str
+    machine: str | None
+    address: str | None
+    host: str | None
+    port: int
+    timeout: float
+    health: str | None
+    screen: str
+    last_msg_sent: str | None
+    last_msg_rcvd: str | None
+    last_seen: float
+    status: str | None
+    channel: str | None
+    subchannel: str | None
+    reason: str | None
+    npings: int
+
+    def __init__(self, version: int, device: TivoDevice) -> None:
+        """Snapshot the state of `device`, as `version`."""
+
+        setattr_ = object.__setattr__
+        setattr_(self, "version", version)
+        for name in self.fields:
+            setattr_(self, name, getattr(device, name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{x}={getattr(self, x)!r}" for x in ("version", *self.fields))
+        return f"{self.__class__.__name__}({values})"
+
+    def values(self) -> tuple[Any, ...]:
+        """Return the values of `fields`."""
+        return tuple(getattr(self, x) for x in self.fields)
+
+    @property
+    def last_msg_rcvd_time(self) -> str:
+        """Return last_msg_rcvd_time formatted for display."""
+        return _since(self.last_seen)
+
+
 class TivoDevice:
     """Tivo Device."""
 
     screens = ["LIVETV", "TIVO", "NOWPLAYING", "GUIDE"]
     timeout = 2.0
+    capture: Capture | None = None  # record frames sent and received, for replay
+    text_rate = 0.0  # keys per second typed by `type_text`; 0 for all at once
+    text_batch = 0.05  # seconds of keys in each write, when `text_rate` is set
+
+    # Characters, other than letters, typed by `type_text`; as keys of `KEYBOARD`.
+    keymap = {
+        "0": "NUM0",
+        "1": "NUM1",
+        "2": "NUM2",
+        "3": "NUM3",
+        "4": "NUM4",
+        "5": "NUM5",
+        "6": "NUM6",
+        "7": "NUM7",
+        "8": "NUM8",
+        "9": "NUM9",
+        "-": "MINUS",
+        "+": "PLUS",
+        "=": "EQUALS",
+        "[": "LBRACKET",
+        "]": "RBRACKET",
+        "\\": "BACKSLASH",
+        ";": "SEMICOLON",
+        "'": "QUOTE",
+        '"': "QUOTE",
+        "“": "QUOTE",
+        "”": "QUOTE",
+        ",": "COMMA",
+        ".": "PERIOD",
+        "/": "SLASH",
+        "`": "BACKQUOTE",
+        "~": "BACKQUOTE",
+        " ": "SPACE",
+    }
+
+    # Events passed to `event_callback`.
+    HELLO = "hello"  # hello message received
+    CHANNEL = "channel"  # channel, or subchannel, changed
+    FAILED = "failed"  # CH_FAILED received
+    TIMEOUT = "timeout"  # can't connect, or receive, in time
+    ERROR = "error"  # can't connect, send or receive; or connection closed
+    HEALTH = "health"  # `health` changed
+
+    # Health, as marked by `HealthScheduler`.
+    ONLINE = "online"
+    STALE = "stale"
+    OFFLINE = "offline"
 
     def __init__(
         self,
@@ -31,10 +181,13 @@ class TivoDevice:
         self.identity = identity
         self.machine = machine
         self.address = address
-        self.host = host
+        self.host = host or address  # its address, until its name is looked up
         self.port = 31339 if port is None else port
 
-        self._map_host()
+        if self.host and not self.address:
+            # A command's device, named by the user. The names of devices heard
+            # from are looked up later, off the loop's thread; see `TivoCore.resolve`.
+            self.address = self.lookup()[1]
 
         self.window: BorderedWindow | None = None
         self.screen = self.screens[0]  # the screen we think it's on
@@ -45,43 +198,69 @@ class TivoDevice:
         self.channel: str | None = None  # from last CH_STATUS response
         self.subchannel: str | None = None  # from last CH_STATUS response
         self.reason: str | None = None  # from last CH_STATUS or CH_FAILED response
+        self.transport: Transport = TcpTransport()  # how `sock` is connected
         self.sock: socket.socket | None = None  # connection
+        self.loop: IOLoop | None = None  # makes all i/o, when attached
+        self._reply: futures.Future[str | None] | None = None  # of the last request, via `loop`
+        self._rbuf = b""  # received data not yet parsed
         self.npings = 0  # number of broadcasts heard from device
-
-    def _map_host(self) -> None:
-        if not self.host and self.address:
+        self.health: str | None = None  # ONLINE, STALE or OFFLINE, once scheduled
+        self.stats = DeviceStats()  # latency of operations, and failures
+        self.lineup = Lineup()  # channels learned from replies
+        self.pacer = KeyPacer()  # of navigation keys, sent through `loop`
+        self.history: History | None = None  # log of channel changes, if recorded
+        self._awaiting: str | None = None  # command whose reply is expected next
+        self.event_callback: Callable[[TivoDevice, str], None] | None = None
+        self.state = DeviceState(0, self)  # published by `_publish`
+
+    def lookup(self) -> tuple[str | None, str | None]:
+        """Return (`host`, `address`), looking up whichever is missing; change neither.
+
+        May wait on the resolver, so any thread may call it; `set_address` applies the result.
+        """
+
+        host, address = self.host, self.address
+        if address and host in (None, address):
             # use case: heartbeat from new device.
             #   TivoDevice(identity=identity, machine=machine, address=address)
             try:
-                self.host = socket.gethostbyaddr(self.address)[0]
-                logger.debug("gethostbyaddr({!r}) => host {!r}", self.address, self.host)
+                host = socket.gethostbyaddr(address)[0]
+                logger.debug("gethostbyaddr({!r}) => host {!r}", address, host)
             except socket.herror as err:
-                logger.error("{!r} Can't gethostbyaddr; {}", self.address, err)
-                self.host = self.address
+                logger.error("{!r} Can't gethostbyaddr; {}", address, err)
+                host = address
 
-        elif not self.address and self.host:
+        elif not address and host:
             # use case: startup, from config file.
             #   TivoDevice(identity=identity, host=host)
             try:
-                self.address = socket.gethostbyname(self.host)
-                logger.debug("gethostbyname({!r}) => address {!r}", self.host, self.address)
+                address = socket.gethostbyname(host)
+                logger.debug("gethostbyname({!r}) => address {!r}", host, address)
             except socket.gaierror as err:
-                logger.debug("{!r} Can't gethostbyname; {}", self.host, err)
+                logger.debug("{!r} Can't gethostbyname; {}", host, err)
                 # wait for beacon
 
+        return host, address
+
+    def set_address(self, host: str | None, address: str | None) -> None:
+        """Set `host` and `address`, from `lookup`, unless None; on the thread making the i/o."""
+
+        self.host = host or self.host
+        self.address = address or self.address
+        self._publish()
+
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.__dict__})"
 
     @property
     def last_msg_rcvd_time(self) -> str:
         """Return last_msg_rcvd_time formatted for display."""
+        return _since(self._last_msg_rcvd_time)
 
-        if not self._last_msg_rcvd_time:
-            return "00:00:00 00:00:00"
-
-        diff = time.strftime("%H:%M:%S", time.gmtime(time.time() - self._last_msg_rcvd_time))
-        then = time.strftime("%H:%M:%S", time.localtime(self._last_msg_rcvd_time))
-        return f"{diff} ({then})"
+    @property
+    def last_seen(self) -> float:
+        """Return time a message was last received from device, or 0 if never."""
+        return self._last_msg_rcvd_time
 
     def handle_hello_event(
         self,
@@ -93,7 +272,7 @@ class TivoDevice:
         """Handle received hello message broadcast from device."""
 
         self.last_msg_rcvd = "HELLO"
-        self._last_msg_rcvd_time = time.time()
+        self._heard()
         self.npings += 1
 
         assert self.identity == identity
@@ -103,116 +282,405 @@ class TivoDevice:
             self.address = address
         if port is not None:
             self.port = port
-        self._map_host()
-        self.getch()
+        self.notify(self.HELLO)
+        self.poll()
 
     def getch(self) -> None:
         """Get current channel."""
 
         # Connecting to the device causes it to send its current state
+        if self.loop:
+            self._await(self.loop.getch(self))
+            return
         if self.sock:
-            self.sock.close()
-            self.sock = None
+            self._close()
         self._connect()
 
-    def upch(self) -> None:
-        """Move up to next channel."""
-        self.send_ircode("CHANNELUP")
+    def poll(self) -> None:
+        """Get current channel, in the background; after any input of the user."""
+
+        if self.loop:
+            self.loop.getch(self, self.loop.BACKGROUND)  # don't wait
+        else:
+            self.getch()
+
+    def upch(self, count: int = 1) -> None:
+        """Move up `count` channels."""
+        self._step(count)
 
-    def downch(self) -> None:
-        """Move down to previous channel."""
-        self.send_ircode("CHANNELDOWN")
+    def downch(self, count: int = 1) -> None:
+        """Move down `count` channels."""
+        self._step(-count)
+
+    def _step(self, count: int) -> None:
+        """Move up (or, if negative, down) `count` channels."""
+
+        if abs(count) > 1:
+            self._sync()
+            if (current := self._current()) and (target := self.lineup.step(current, count)):
+                # Every channel along the way is known; go straight there.
+                self.send_setch(target)
+                return
+
+        for _ in range(abs(count)):
+            self.send_ircode("CHANNELUP" if count > 0 else "CHANNELDOWN")
+            if self.status != "CH_STATUS":
+                return
+
+    def _sync(self) -> None:
+        """Connect, or read status already pushed by the device."""
+
+        if self.loop:
+            # The loop reads pushed status as it arrives.
+            if not self.sock:
+                self._await(self.loop.getch(self))
+        elif not self.sock:
+            self._connect()
+        else:
+            self._drain()
+
+    def _current(self) -> str | None:
+        """Return lineup key of the current channel, or None if not known.
+
+        That last tuned to; whatever the latest status, e.g., after a refused `SETCH`.
+        """
+
+        if not self.channel:
+            return None
+        return Lineup.key(self.channel, self.subchannel)
 
     def _connect(self) -> None:
-        if not self.address:
+        if self.transport.target(self) is None:
             logger.warning("{!r} No address yet", self.host)
             return
 
         assert not self.sock
 
-        logger.trace("{!r} Connecting to TCP {!r}:{!r}", self.host, self.address, self.port)
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-        if self.timeout:
-            self.sock.settimeout(self.timeout)
-
+        where = self.transport.describe(self)
+        logger.trace("{!r} Connecting to {}", self.host, where)
+        start = time.monotonic()
         try:
-            self.sock.connect((self.address, self.port))
-            logger.debug("{!r} Connected to TCP {!r}:{!r}", self.host, self.address, self.port)
+            self.sock = self.transport.connect(self, self.timeout or None)
+            self.stats.observe("connect", time.monotonic() - start)
+            logger.debug("{!r} Connected to {}", self.host, where)
+            if self.capture:
+                self.capture.record(self.identity, CONNECT)
 
         except socket.timeout:
             logger.warning("{!r} timeout", self.host)
-            self.sock.close()
-            self.sock = None
+            self.stats.timeout("connect")
+            self._close()
             self.status = "Can't connect"
             self.reason = "timeout"
+            self.notify(self.TIMEOUT)
             return
 
-        except socket.herror as err:
-            logger.error("{!r}:{!r} Can't connect; {}", self.host, self.port, err)
-            self.sock.close()
-            self.sock = None
+        except OSError as err:
+            logger.error("{!r} Can't connect to {}; {}", self.host, where, err)
+            self.stats.error("connect")
+            self._close()
             self.status = "Can't connect"
             self.reason = str(err)
+            self.notify(self.ERROR)
             return
 
+        self._awaiting = "CONNECT"
         self._recv()  # should respond with the current channel
 
+    def close(self) -> None:
+        """Close the connection made without a loop, if any; the loop closes its own."""
+        self._close()
+
+    def _close(self) -> None:
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+            if self.capture:
+                self.capture.record(self.identity, DISCONNECT)
+        self._rbuf = b""
+
+    def _heard(self) -> None:
+        """Note that a message was received from the device, now."""
+
+        self._last_msg_rcvd_time = time.time()
+        if self.health and self.health != self.ONLINE:
+            self.health = self.ONLINE
+            self.notify(self.HEALTH)
+
+    def _publish(self) -> None:
+        """Publish a snapshot of the state, if changed, as the next `state`."""
+
+        state = DeviceState(self.state.version + 1, self)
+        if state.values() != self.state.values():
+            self.state = state  # atomic; readers see the old snapshot, or the new
+
+    def notify(self, event: str) -> None:
+        """Publish the state, and pass `event` to `event_callback`."""
+
+        self._publish()
+        if self.event_callback:
+            self.event_callback(self, event)
+
+    @staticmethod
+    def expects_reply(msg: str) -> bool:
+        """Return whether devices answer request `msg`."""
+
+        # Only these teleports and ircodes are answered, with LIVETV_READY and CH_STATUS.
+        return msg.split(" ", 1)[0] == "SETCH" or msg in (
+            "TELEPORT LIVETV",
+            "IRCODE CHANNELUP",
+            "IRCODE CHANNELDOWN",
+        )
+
     def send_key(self, text: str) -> None:
         """Send key."""
 
         self._send("KEYBOARD " + text)
 
+    @classmethod
+    def text_keys(cls, text: str) -> list[str]:
+        """Return the `KEYBOARD` keys that type `text`; raise ValueError if one can't be."""
+
+        keys = []
+        for char in text:
+            if char.isascii() and char.isalpha():
+                keys.append(char.upper())
+            elif key := cls.keymap.get(char):
+                keys.append(key)
+            else:
+                raise ValueError(f"Can't type {char!r}")
+        return keys
+
+    def type_text(self, text: str, rate: float | None = None) -> None:
+        """Type `text`, at `rate` keys per second, or `text_rate`; in one write, if 0."""
+
+        requests = ["KEYBOARD " + x for x in self.text_keys(text)]
+        if not requests:
+            return
+        rate = self.text_rate if rate is None else rate
+        logger.info("{!r} Typing {!r}", self.host, text)
+
+        # Each write carries the keys due since the last.
+        size = max(int(rate * self.text_batch), 1) if rate else len(requests)
+        start = time.monotonic()
+        for i in range(0, len(requests), size):
+            if rate and (delay := start + i / rate - time.monotonic()) > 0:
+                time.sleep(delay)
+            if not self._send_many(requests[i : i + size]):
+                return
+
     def send_teleport(self, text: str) -> None:
         """Send teleport."""
 
         assert text.startswith("TELEPORT ")
         self._send(text)
-        self._recv()
+        if self.expects_reply(text):
+            self._recv()
 
     def send_ircode(self, text: str) -> None:
         """Send ircode."""
 
+        before = None
+        if text in ("CHANNELUP", "CHANNELDOWN"):
+            self._sync()
+            before = self._current()
+
         self._send("IRCODE " + text)
-        self._recv()
+        if self.expects_reply("IRCODE " + text):
+            self._recv()
+
+        after = self._current() if self.reason == "REMOTE" else None
+        if before and after and after != before:
+            if text == "CHANNELUP":
+                self.lineup.follows(before, after)
+            else:
+                self.lineup.follows(after, before)
 
     def send_setch(self, text: str) -> None:
         """Send setch."""
 
+        channel = Lineup.key(text)
+        if reason := self.lineup.refusal(channel):
+            logger.error("{!r} channel {!r} was refused; {!r}", self.host, channel, reason)
+            self.status = "CH_FAILED"
+            self.reason = reason
+            self.notify(self.FAILED)
+            return
+
         self._send("SETCH " + text)
         self._recv()
-
-    def _send(self, msg: str) -> None:
+        if self.status == "CH_FAILED" and self.reason:
+            self.lineup.refuse(channel, self.reason)
+
+    def _send(self, msg: str, drain: bool = True) -> None:
+        # Unless `drain` is False, because the caller is pipelining requests
+        # and will read their replies itself.
+        if self.loop:
+            self._reply = self.loop.request(self, msg)
+            return
         if not self.sock:
             self._connect()
+        elif drain:
+            self._drain()  # so the reply to `msg` is not confused with an earlier push
 
         if self.sock:
             logger.warning("{!r} Sending {!r}", self.host, msg)
-            try:
-                self.sock.send((msg + "\r").encode("ASCII"))
-                self.last_msg_sent = msg
-            # Catch broad exceptions; socket errors during send are logged and connection closed.
-            except Exception as err:  # noqa: PLW0703
-                logger.error("{!r} Can't send; {}", self.host, err)
-                self.sock.close()
-                self.sock = None
+            self._write([msg])
 
-    def _recv(self) -> None:
+    def send_nowait(self, msg: str) -> None:
+        """Send `msg`, leaving the replies to earlier requests unread; to pipeline requests.
+
+        Without a loop; read the replies, in order, with `read_reply`.
+        """
+
+        self._send(msg, drain=False)
+
+    def read_reply(self) -> str | None:
+        """Read the next message from the device; return the `status` it sets, None if none."""
+
+        self.status = None
+        self._recv()
+        return self.status
+
+    def _send_many(self, msgs: list[str]) -> bool:
+        """Send `msgs`, which are not answered, in one write; return False on failure."""
+
+        if self.loop:
+            self._await(self.loop.write(self, msgs))
+            return self.sock is not None
         if not self.sock:
-            return
+            self._connect()
+        return self._write(msgs) if self.sock else False
+
+    def _write(self, msgs: list[str]) -> bool:
+        """Write `msgs` to the connection, at once; return False on failure."""
 
+        assert self.sock
+        command = msgs[-1].split(" ", 1)[0]
+        start = time.monotonic()
         try:
-            data = self.sock.recv(1024)
-            self.last_msg_rcvd = data.decode("ASCII").rstrip()
-            self._last_msg_rcvd_time = time.time()
-            logger.trace("{!r} Received {!r}", self.host, self.last_msg_rcvd)
-            self._parse()
+            self.sock.sendall("".join(x + "\r" for x in msgs).encode("ASCII"))
+            self.stats.observe("send " + command, time.monotonic() - start)
+            self._awaiting = command
+            self.on_sent(msgs)
+        # Catch broad exceptions; socket errors during send are logged and connection closed.
+        except Exception as err:  # noqa: PLW0703
+            logger.error("{!r} Can't send; {}", self.host, err)
+            self.stats.error("send " + command)
+            self._close()
+            self.status = "Can't send"
+            self.reason = str(err)
+            self.notify(self.ERROR)
+            return False
+        return True
+
+    def on_sent(self, msgs: list[str]) -> None:
+        """Note that `msgs` were sent to the device; by `_write`, or the loop."""
+
+        self.last_msg_sent = msgs[-1]
+        self._publish()
+        if self.capture:
+            for msg in msgs:
+                self.capture.record(self.identity, SEND, msg)
+
+    def _drain(self) -> None:
+        """Parse all messages already received, without waiting for more."""
+
+        if self.loop:
+            return  # the loop reads everything as it arrives
+        self._awaiting = None  # these are pushes, or replies we did not wait for
+        while self.sock and select.select([self.sock], [], [], 0)[0]:
+            if not self._fill():
+                return
+        while b"\r" in self._rbuf:
+            self._recv()
 
+    def _fill(self) -> bool:
+        """Read available data into the receive buffer; return False on failure."""
+
+        assert self.sock
+        try:
+            data = self.sock.recv(1024)
         except socket.timeout:
             logger.warning("{!r} timeout", self.host)
             self.last_msg_rcvd = None
             self.status = "Can't receive"
             self.reason = "timeout"
+            self.notify(self.TIMEOUT)
+            return False
+        except OSError as err:
+            logger.error("{!r} Can't receive; {}", self.host, err)
+            self._close()
+            self.status = "Can't receive"
+            self.reason = str(err)
+            self.notify(self.ERROR)
+            return False
+
+        if not data:
+            logger.warning("{!r} Connection closed by device", self.host)
+            self._close()
+            self.status = "Can't receive"
+            self.reason = "closed"
+            self.notify(self.ERROR)
+            return False
+
+        self._rbuf += data
+        return True
+
+    def _recv(self) -> None:
+        # Responses are terminated by carriage-return, and may arrive
+        # split across, or coalesced within, TCP segments.
+        if self.loop:
+            if self._reply:
+                self._await(self._reply)
+                self._reply = None
+            return
+        operation = "recv " + self._awaiting if self._awaiting else None
+        self._awaiting = None
+        start = time.monotonic()
+
+        while b"\r" not in self._rbuf:
+            if not self.sock:
+                return
+            if not self._fill():
+                if operation and self.reason == "timeout":
+                    self.stats.timeout(operation)
+                elif operation:
+                    self.stats.error(operation)
+                return
+
+        if operation:
+            self.stats.observe(operation, time.monotonic() - start)
+
+        frame, _, self._rbuf = self._rbuf.partition(b"\r")
+        self.on_frame(frame)
+
+    def _await(self, future: futures.Future[str | None]) -> None:
+        """Wait for `future`, of a request made through `loop`; unless on the loop's thread."""
+
+        assert self.loop
+        if self.loop.in_loop():
+            return  # its result is handled as it arrives; waiting would deadlock
+        # The loop enforces `timeout`, on the connect and on the reply; this is a backstop.
+        futures.wait([future], timeout=self.timeout * 2 + 1 if self.timeout else None)
+
+    def on_frame(self, frame: bytes) -> None:
+        """Handle `frame`, received from the device; by `_recv`, or the loop."""
+
+        self.last_msg_rcvd = frame.decode("ASCII", errors="replace").strip()
+        self._heard()
+        if self.capture:
+            self.capture.record(self.identity, RECV, self.last_msg_rcvd)
+        logger.trace("{!r} Received {!r}", self.host, self.last_msg_rcvd)
+        previous = (self.channel, self.subchannel)
+        self._parse()
+        self._publish()
+        if self.status == "CH_STATUS" and self.channel:
+            self.lineup.tuned(Lineup.key(self.channel, self.subchannel))
+        if (self.channel, self.subchannel) != previous:
+            if self.history and self.channel:
+                self.history.record(self.channel, self.subchannel, self.reason)
+            self.notify(self.CHANNEL)
 
     def _parse(self) -> None:
         # Expecting one of:
@@ -229,6 +697,7 @@ class TivoDevice:
                 # PLR2004: 3/4 are the documented CH_STATUS word counts in the TiVo protocol.
                 if nwords == 3:  # noqa: PLR2004
                     self.channel = words[1]
+                    self.subchannel = None
                     self.reason = words[2]
                 elif nwords == 4:  # noqa: PLR2004
                     self.channel = words[1]
@@ -267,6 +736,7 @@ class TivoDevice:
                     logger.error(
                         "{!r} status {!r} reason {!r}", self.host, self.status, self.reason
                     )
+                    self.notify(self.FAILED)
                     return
 
             elif words[0] == "LIVETV_READY":
@@ -0,0 +1,168 @@
+"""Channel history.
+
+Each device's channel changes are appended to a log of fixed-width
+binary records, `$XDG_STATE_HOME/tivo/history/IDENTITY.bin`:
+
+    time        float64, seconds since the epoch
+    channel     uint16
+    subchannel  uint16, 0 for none
+    reason      uint8, index into `REASONS`
+    (padding)   1 byte
+
+Fourteen bytes a record keep a year of a channel change a minute under
+8MB. Each record is appended with one unbuffered `O_APPEND` write, under
+an exclusive lock of the log, and only if the channel differs from that
+of the last record; so concurrent processes, and each new one, may share
+a log without recording changes that aren't, and a crash loses nothing
+already recorded. The most recent records of this process are also kept
+in a ring buffer in memory.
+
+The log is read through a memory map; records are in time order, so
+the first record of a query is found by bisection.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from tivo.state import state_dir
+
+__all__ = ["REASONS", "Entry", "History", "history_path", "read_history"]
+
+RECORD = struct.Struct("<dHHBx")
+REASONS = ("", "LOCAL", "REMOTE", "RECORDING")  # unknown reasons are recorded as "".
+
+
+def history_path(identity: str) -> Path:
+    """Return path of the channel history log of device `identity`."""
+    return state_dir() / "history" / f"{identity}.bin"
+
+
+class Entry(NamedTuple):
+    """One channel change."""
+
+    time: float
+    channel: int
+    subchannel: int  # 0 for none
+    reason: str
+
+    def __str__(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        channel = f"{self.channel:04d}" + (f" {self.subchannel:04d}" if self.subchannel else "")
+        return f"{when} {channel} {self.reason}".rstrip()
+
+    @classmethod
+    def unpack(cls, record: tuple[float, int, int, int]) -> Entry:
+        """Return entry from unpacked `RECORD`."""
+
+        when, channel, subchannel, reason = record
+        return cls(when, channel, subchannel, REASONS[reason] if reason < len(REASONS) else "")
+
+
+class History:
+    """Channel history of one device."""
+
+    def __init__(self, path: Path, recent: int = 256) -> None:
+        """Append to log `path`, and keep the last `recent` entries in memory."""
+
+        self.path = path
+        self._fd: int | None = None
+        self._ring = bytearray(RECORD.size * recent)
+        self._size = recent
+        self._count = 0  # number of entries recorded by this process
+
+    def record(self, channel: str, subchannel: str | None, reason: str | None) -> bool:
+        """Append the change to `channel`, `subchannel`, for `reason`, now; return if changed.
+
+        Not a change if the last record of the log is of the same channel.
+        """
+
+        try:
+            packed = RECORD.pack(
+                time.time(),
+                int(channel),
+                int(subchannel) if subchannel else 0,
+                REASONS.index(reason) if reason in REASONS else 0,
+            )
+        except (ValueError, struct.error):
+            return False  # not a number, or out of range; can't be recorded
+
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if (size := os.fstat(self._fd).st_size // RECORD.size * RECORD.size) and (
+                RECORD.unpack(os.pread(self._fd, RECORD.size, size - RECORD.size))[1:3]
+                == RECORD.unpack(packed)[1:3]
+            ):
+                return False
+            os.write(self._fd, packed)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        offset = self._count % self._size * RECORD.size
+        self._ring[offset : offset + RECORD.size] = packed
+        self._count += 1
+        return True
+
+    def recent(self) -> list[Entry]:
+        """Return the entries recorded by this process still in memory, oldest first."""
+
+        count = min(self._count, self._size)
+        start = self._count - count
+        return [
+            Entry.unpack(RECORD.unpack_from(self._ring, i % self._size * RECORD.size))
+            for i in range(start, start + count)
+        ]
+
+    def close(self) -> None:
+        """Close the log."""
+
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _Times:
+    """Sequence of the times of the records in `buf`, for `bisect`."""
+
+    def __init__(self, buf: mmap.mmap, count: int) -> None:
+        self._buf = buf
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> float:
+        return float(RECORD.unpack_from(self._buf, index * RECORD.size)[0])
+
+
+def read_history(path: Path, since: float = 0.0, until: float | None = None) -> Iterator[Entry]:
+    """Yield the entries of log `path` from time `since`, and before `until`."""
+
+    if not path.exists():
+        return
+
+    with open(path, "rb") as file:
+        if not (count := os.fstat(file.fileno()).st_size // RECORD.size):
+            return  # an empty file can't be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            start = bisect_left(_Times(buf, count), since)
+            view = memoryview(buf)[start * RECORD.size : count * RECORD.size]
+            try:
+                for record in RECORD.iter_unpack(view):
+                    if until is not None and record[0] >= until:
+                        break
+                    yield Entry.unpack(record)
+            finally:
+                view.release()
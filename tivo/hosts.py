@@ -0,0 +1,82 @@
+"""Known hosts, for completing `HOST` arguments.
+
+Candidates are merged from configured devices, devices discovered by
+earlier sessions, and `/etc/hosts`, and ranked so that likely TiVo hosts
+come first:
+
+    1. configured host names,
+    2. discovered host names,
+    3. names in `/etc/hosts` of discovered addresses, or containing `tivo`,
+    4. device identities,
+    5. all other names in `/etc/hosts`.
+
+The result is cached, keyed on the modification times of the sources,
+so a TAB press usually costs three `stat` calls and one small read.
+This module uses only the standard library, for the same reason.
+"""
+
+import contextlib
+from pathlib import Path
+
+from tivo.state import read_state, state_dir, write_state
+
+__all__ = ["DEVICES", "known_hosts"]
+
+DEVICES = "devices.json"  # state file of discovered devices: {identity: {host, address}}
+_CACHE = "hosts-cache.json"
+_ETC_HOSTS = Path("/etc/hosts")
+
+
+def _mtime(path: Path | None) -> float | None:
+    try:
+        return path.stat().st_mtime if path else None
+    except OSError:
+        return None
+
+
+def _read_etc_hosts(path: Path) -> list[tuple[str, str]]:
+    """Return (address, name) of each IPv4 host in hosts file `path`."""
+
+    hosts = []
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                words = line.split("#", 1)[0].split()
+                # PLR2004: an address, and at least one name; skip IPv6 addresses.
+                if len(words) < 2 or ":" in words[0]:  # noqa: PLR2004
+                    continue
+                hosts += [(words[0], name) for name in words[1:]]
+    except OSError:
+        pass
+    return hosts
+
+
+def known_hosts(identities: dict[str, str], config_file: Path | None = None) -> list[str]:
+    """Return names of known hosts, likely TiVo hosts first.
+
+    Args:
+        identities: configured map of device identity to host name.
+        config_file: that `identities` were read from, for the cache key.
+    """
+
+    key = [_mtime(config_file), _mtime(state_dir() / DEVICES), _mtime(_ETC_HOSTS)]
+    if (cache := read_state(_CACHE)) and cache.get("key") == key:
+        return list(cache["hosts"])
+
+    discovered = read_state(DEVICES) or {}
+    addresses = {x.get("address") for x in discovered.values()}
+    etc_hosts = _read_etc_hosts(_ETC_HOSTS)
+
+    ranked = [
+        *identities.values(),
+        *(x.get("host") for x in discovered.values()),
+        *(n for a, n in etc_hosts if a in addresses or "tivo" in n.lower()),
+        *identities,
+        *discovered,
+        *(n for _, n in etc_hosts),
+    ]
+    hosts = list(dict.fromkeys(x for x in ranked if x and " " not in x))
+
+    with contextlib.suppress(OSError):  # complete anyway
+        write_state(_CACHE, {"key": key, "hosts": hosts})
+    return hosts
@@ -0,0 +1,559 @@
+"""I/O loop.
+
+One thread, and one selector, for the beacon socket and the connection
+to every device. Connects, reads and writes never block, so a slow or
+dead device delays no other; each request waits for its reply only
+until the device's `timeout`, which the loop enforces.
+
+Other threads hand requests to the loop, and are handed a
+`concurrent.futures.Future` of the reply. The future's result is the
+reply, or None when the request is not answered, or can't be made;
+`TivoDevice.status` and `reason` tell why. Replies are matched to
+requests in order; `CH_STATUS` messages that are not `REMOTE` are pushed
+by the device, and are not replies.
+
+Devices attached to the loop (`TivoDevice.loop`) make their blocking
+requests through it, so all device I/O, and all changes to device
+state, happen on the loop's thread. The loop also drives the health
+scheduler, whose polls are made through the loop, too.
+
+Each device has a queue of commands, made one at a time: a command that
+is answered, or a reconnect, is made when the previous one is answered.
+`INTERACTIVE` commands, of the user, are made before `BACKGROUND`
+polls; a poll still queued when the device is heard from is stale, and
+dropped. The wait of each command in its queue is observed as operation
+`queue COMMAND` (`queue CONNECT` for a reconnect).
+
+Navigation keys are paced by the device's `KeyPacer`: repeats beyond
+what the device acts on are dropped when submitted; those still queued
+when the user turns to another direction, or after the pacer's
+`timeout`, are dropped too, so the device stops where the user did.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import errno
+import heapq
+import itertools
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, NamedTuple
+
+from loguru import logger
+
+from tivo.capture import CONNECT, DISCONNECT
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+from tivo.listener import TivoListener
+from tivo.pacer import NAVIGATION
+
+__all__ = ["IOLoop"]
+
+_CONNECT = "CONNECT"  # command of the status sent by a device upon connecting
+
+
+class _Request(NamedTuple):
+    """A request waiting for its reply."""
+
+    future: Future[str | None] | None
+    command: str
+    start: float  # monotonic
+    deadline: float  # monotonic
+
+
+class _Command(NamedTuple):
+    """A command waiting in the queue of a device; ordered by priority, then age."""
+
+    priority: int
+    seq: int
+    message: str | None  # None to reconnect, for the current status
+    future: Future[str | None]
+    queued: float  # wall-clock, to compare with `TivoDevice.last_seen`
+    start: float  # monotonic
+
+
+class _Connection:
+    """Non-blocking connection to a device."""
+
+    def __init__(self, device: TivoDevice, sock: socket.socket) -> None:
+        self.device = device
+        self.sock = sock
+        self.connecting = True
+        self.rbuf = b""  # received data not yet split into frames
+        self.wbuf = bytearray()  # requests not yet written
+        self.written: list[Future[str | None]] = []  # resolved when `wbuf` is written
+        self.waiting: deque[_Request] = deque()  # for replies, oldest first
+
+
+class IOLoop:
+    """Multiplex the beacon socket and all device connections in one thread."""
+
+    # Priorities of commands; lesser is sooner.
+    INTERACTIVE = 0  # input of the user
+    BACKGROUND = 1  # polls
+
+    def __init__(self, core: TivoCore, listener: TivoListener | None = None) -> None:
+        """Serve the devices of `core`, and hello messages heard by `listener`."""
+
+        self.core = core
+        self.listener = listener
+        self.selector = selectors.DefaultSelector()
+        self._conns: dict[TivoDevice, _Connection] = {}
+        self._queues: dict[TivoDevice, list[_Command]] = {}  # heap of each device
+        self._seq = itertools.count()
+        self._dispatching: set[TivoDevice] = set()
+        self.polls_dropped = 0  # stale polls not made
+        self._calls: deque[Callable[[], None]] = deque()  # from other threads
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        # Other threads wake the loop by writing to this socket pair.
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ)
+
+        if listener:
+            self.selector.register(listener.open(), selectors.EVENT_READ)
+
+        core.loop = self
+        for device in core.devices.values():
+            device.loop = self
+        # Start with the addresses looked up by now; the rest are applied as they are.
+        core.wait_resolved(timeout=core.resolve_timeout)
+
+    # Called from any thread.
+
+    def start(self) -> None:
+        """Run the loop in a thread of its own."""
+
+        self._thread = threading.Thread(name="io", target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the loop, and wait for its thread, if any."""
+
+        self._stopping.set()
+        self._wake()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def in_loop(self) -> bool:
+        """Return whether the caller is running on the loop's thread."""
+        return self._thread is threading.current_thread()
+
+    def call_soon(self, func: Callable[[], None]) -> None:
+        """Call `func` on the loop's thread."""
+
+        self._calls.append(func)
+        self._wake()
+
+    def request(
+        self, device: TivoDevice, message: str, priority: int = INTERACTIVE
+    ) -> Future[str | None]:
+        """Send `message` to `device`, connecting if necessary; return future of its reply.
+
+        The result is None when `message` is not answered, when it has been
+        written; or when it can't be made.
+        """
+        return self._submit(device, message, priority)
+
+    def getch(self, device: TivoDevice, priority: int = INTERACTIVE) -> Future[str | None]:
+        """Reconnect to `device`; return future of the status it sends upon connecting."""
+        return self._submit(device, None, priority)
+
+    def write(
+        self, device: TivoDevice, messages: list[str], priority: int = INTERACTIVE
+    ) -> Future[str | None]:
+        """Send `messages`, which are not answered, in one write; return future of the write."""
+
+        commands = [self._command(x, priority) for x in messages]
+
+        def _enqueue_all() -> None:
+            for command in commands:
+                self._enqueue(device, command)
+
+        self._run_or_call(_enqueue_all)
+        return commands[-1].future
+
+    def warm_up(self) -> list[Future[str | None]]:
+        """Connect to every device whose address is known, at once, in the background.
+
+        So the first command to each device does not wait to connect; each
+        connect is bounded by the device's `timeout`. Return futures of the
+        status each sends upon connecting.
+        """
+
+        return [
+            self.getch(x, self.BACKGROUND)
+            for x in list(self.core.devices.values())
+            if x.transport.target(x) is not None
+        ]
+
+    def queued(self, device: TivoDevice) -> int:
+        """Return number of commands waiting in the queue of `device`."""
+        return len(self._queues.get(device, ()))
+
+    def _submit(
+        self, device: TivoDevice, message: str | None, priority: int
+    ) -> Future[str | None]:
+        command = self._command(message, priority)
+        self._run_or_call(lambda: self._enqueue(device, command))
+        return command.future
+
+    def _command(self, message: str | None, priority: int) -> _Command:
+        future: Future[str | None] = Future()
+        return _Command(
+            priority, next(self._seq), message, future, time.time(), time.monotonic()
+        )
+
+    def _run_or_call(self, func: Callable[[], None]) -> None:
+        if self.in_loop():
+            func()
+        else:
+            self.call_soon(func)
+
+    def _wake(self) -> None:
+        with contextlib.suppress(BlockingIOError):  # already awake
+            self._wake_w.send(b"\0")
+
+    # Called on the loop's thread.
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """Run the loop on this thread until `stop`, or `stop()`."""
+
+        if not self._thread:
+            self._thread = threading.current_thread()
+
+        try:
+            while not (self._stopping.is_set() or (stop and stop.is_set())):
+                self._run_once()
+        finally:
+            for queue in self._queues.values():
+                for command in queue:
+                    command.future.set_result(None)
+            self._queues.clear()
+            for conn in list(self._conns.values()):
+                self._close(conn)
+
+    def _run_once(self) -> None:
+        timeout = self.core.scheduler.run_pending()
+        if deadlines := [x.waiting[0].deadline for x in self._conns.values() if x.waiting]:
+            until = max(min(deadlines) - time.monotonic(), 0.0)
+            timeout = until if timeout is None else min(timeout, until)
+
+        for key, mask in self.selector.select(timeout):
+            if key.fileobj is self._wake_r:
+                self._handle_wake()
+            elif self.listener and key.fileobj is self.listener.sock:
+                self._handle_beacon()
+            elif conn := key.data:
+                if mask & selectors.EVENT_WRITE:
+                    self._handle_write(conn)
+                # Unless the write failed, and closed it.
+                if mask & selectors.EVENT_READ and self._conns.get(conn.device) is conn:
+                    self._handle_read(key.data)
+
+        self._expire()
+
+    def _handle_wake(self) -> None:
+        while True:
+            try:
+                if not self._wake_r.recv(4096):
+                    break
+            except BlockingIOError:
+                break
+        while self._calls:
+            self._calls.popleft()()
+
+    def _handle_beacon(self) -> None:
+        assert self.listener
+        assert self.listener.sock
+        try:
+            data, address = self.listener.sock.recvfrom(1024)
+        except OSError as err:
+            logger.error("Can't receive beacon; {}", err)
+            return
+        self.listener.packets += 1
+        self.listener.handle_beacon(data, address[0])
+
+    def _enqueue(self, device: TivoDevice, command: _Command) -> None:
+        queue = self._queues.setdefault(device, [])
+        if command.message in NAVIGATION:
+            pacer = device.pacer
+            if pacer.last and command.message != pacer.last:
+                self._flush(device, pacer.last)  # released; its repeats would overshoot
+            if not pacer.admit(command.message):
+                logger.trace("{!r} Dropping repeat {!r}", device.host, command.message)
+                command.future.set_result(None)
+                return
+        if command.message is None and command.priority == self.BACKGROUND:
+            for queued in queue:
+                if queued.message is None:
+                    # Already going to reconnect; share its result.
+                    queued.future.add_done_callback(
+                        lambda x: command.future.set_result(x.result())
+                    )
+                    return
+        heapq.heappush(queue, command)
+        self._dispatch(device)
+
+    def _flush(self, device: TivoDevice, message: str) -> None:
+        """Drop the commands to send `message` queued for `device`."""
+
+        if not (queue := self._queues.get(device)):
+            return
+        keep = []
+        for command in queue:
+            if command.message == message:
+                device.pacer.dropped += 1
+                command.future.set_result(None)
+            else:
+                keep.append(command)
+        heapq.heapify(keep)
+        self._queues[device] = keep
+
+    def _busy(self, device: TivoDevice) -> bool:
+        """Return whether `device` is connecting, or answering, a command."""
+
+        conn = self._conns.get(device)
+        return conn is not None and (conn.connecting or bool(conn.waiting))
+
+    def _dispatch(self, device: TivoDevice) -> None:
+        """Make the commands queued for `device`, until one must be answered first."""
+
+        if device in self._dispatching:
+            return  # e.g., a connect failed while dispatching
+        self._dispatching.add(device)
+        try:
+            queue = self._queues.get(device)
+            while queue and not self._busy(device):
+                command = heapq.heappop(queue)
+                if command.message is None:
+                    if command.priority == self.BACKGROUND and device.last_seen > command.queued:
+                        # Heard from since the poll was queued; it would tell nothing new.
+                        logger.trace("{!r} Dropping stale poll", device.host)
+                        self.polls_dropped += 1
+                        command.future.set_result(device.last_msg_rcvd)
+                        continue
+                    operation = "queue " + _CONNECT
+                else:
+                    operation = "queue " + command.message.split(" ", 1)[0]
+                waited = time.monotonic() - command.start
+                if command.message in NAVIGATION and waited > device.pacer.timeout:
+                    device.pacer.dropped += 1
+                    command.future.set_result(None)
+                    continue
+                device.stats.observe(operation, waited)
+
+                if command.message is None:
+                    self._getch(device, command.future)
+                else:
+                    self._request(device, command.message, command.future)
+        finally:
+            self._dispatching.discard(device)
+
+    def _getch(self, device: TivoDevice, future: Future[str | None]) -> None:
+        # Connecting to the device causes it to send its current state.
+        if conn := self._conns.get(device):
+            self._close(conn)
+        if conn := self._connect(device):
+            conn.waiting.append(self._waiter(future, _CONNECT, device))
+        else:
+            future.set_result(None)
+
+    def _request(self, device: TivoDevice, message: str, future: Future[str | None]) -> None:
+        if not (conn := self._conns.get(device) or self._connect(device)):
+            future.set_result(None)
+            return
+
+        logger.debug("{!r} Sending {!r}", device.host, message)
+        command = message.split(" ", 1)[0]
+        device.on_sent([message])
+
+        if not conn.wbuf and not conn.connecting:
+            # Written when the selector next returns; with the others made meanwhile.
+            self.selector.modify(conn.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, conn)
+        conn.wbuf += (message + "\r").encode("ASCII")
+        if device.expects_reply(message):
+            conn.waiting.append(self._waiter(future, command, device))
+        else:
+            conn.written.append(future)
+
+    @staticmethod
+    def _waiter(future: Future[str | None] | None, command: str, device: TivoDevice) -> _Request:
+        start = time.monotonic()
+        return _Request(future, command, start, start + (device.timeout or 3600.0))
+
+    def _connect(self, device: TivoDevice) -> _Connection | None:
+        """Start connecting to `device`; return connection, or None if it can't be made."""
+
+        if device.transport.target(device) is None:
+            logger.warning("{!r} No address yet", device.host)
+            return None
+
+        logger.trace("{!r} Connecting to {}", device.host, device.transport.describe(device))
+        try:
+            sock, err = device.transport.start_connect(device)
+        except OSError as exc:
+            self._abort(device, None, "connect", "Can't connect", str(exc))
+            return None
+        if err not in (0, errno.EINPROGRESS):
+            sock.close()
+            self._abort(device, None, "connect", "Can't connect", os.strerror(err))
+            return None
+
+        conn = _Connection(device, sock)
+        conn.waiting.append(self._waiter(None, _CONNECT, device))  # for the connect itself
+
+        self._conns[device] = conn
+        self.selector.register(sock, selectors.EVENT_WRITE, conn)
+        return conn
+
+    def _handle_write(self, conn: _Connection) -> None:
+        device = conn.device
+
+        if conn.connecting:
+            if err := conn.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR):
+                self._abort(device, conn, "connect", "Can't connect", os.strerror(err))
+                return
+            conn.connecting = False
+            device.sock = conn.sock
+            device.stats.observe("connect", time.monotonic() - conn.waiting.popleft().start)
+            logger.debug("{!r} Connected to {}", device.host, device.transport.describe(device))
+            if device.capture:
+                device.capture.record(device.identity, CONNECT)
+
+            # Wait for the status sent upon connecting; for a getch, if any.
+            if conn.waiting and conn.waiting[0].command == _CONNECT:
+                conn.waiting[0] = self._waiter(conn.waiting[0].future, _CONNECT, device)
+            else:
+                conn.waiting.appendleft(self._waiter(None, _CONNECT, device))
+
+        if conn.wbuf:
+            try:
+                n = conn.sock.send(conn.wbuf)
+            except BlockingIOError:
+                n = 0
+            except OSError as err:
+                logger.error("{!r} Can't send; {}", device.host, err)
+                self._abort(device, conn, "send", "Can't send", str(err))
+                return
+            del conn.wbuf[:n]
+
+        if not conn.wbuf:
+            for future in conn.written:
+                future.set_result(None)
+            conn.written.clear()
+
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if conn.wbuf else 0)
+        self.selector.modify(conn.sock, events, conn)
+
+    def _handle_read(self, conn: _Connection) -> None:
+        device = conn.device
+        try:
+            data = conn.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError as err:
+            logger.error("{!r} Can't receive; {}", device.host, err)
+            self._abort(device, conn, None, "Can't receive", str(err))
+            return
+
+        if not data:
+            logger.warning("{!r} Connection closed by device", device.host)
+            self._abort(device, conn, None, "Can't receive", "closed")
+            return
+
+        conn.rbuf += data
+        while b"\r" in conn.rbuf:
+            frame, _, conn.rbuf = conn.rbuf.partition(b"\r")
+            device.on_frame(frame)
+            self._match(conn)
+        self._dispatch(device)
+
+        if self.core.ui_update_status_callback:
+            self.core.ui_update_status_callback()
+
+    def _match(self, conn: _Connection) -> None:
+        """Resolve the oldest request, if the frame just received is its reply."""
+
+        device = conn.device
+        if not conn.waiting:
+            return
+        request = conn.waiting[0]
+
+        if request.command == _CONNECT:
+            if device.status != "CH_STATUS":
+                return
+        elif device.status == "CH_STATUS" and device.reason != "REMOTE":
+            return  # pushed, not a reply
+        elif device.status not in ("CH_STATUS", "CH_FAILED", "LIVETV_READY"):
+            return
+
+        conn.waiting.popleft()
+        device.stats.observe("recv " + request.command, time.monotonic() - request.start)
+        if request.future:
+            request.future.set_result(device.last_msg_rcvd)
+
+    def _expire(self) -> None:
+        """Time out the requests whose deadlines have passed."""
+
+        now = time.monotonic()
+        for conn in list(self._conns.values()):
+            if conn.waiting and (request := conn.waiting[0]).deadline <= now:
+                logger.warning("{!r} timeout", conn.device.host)
+                conn.device.last_msg_rcvd = None
+                if conn.connecting:
+                    self._abort(conn.device, conn, "connect", "Can't connect", "timeout")
+                else:
+                    # Resynchronize on a new connection.
+                    self._abort(
+                        conn.device, conn, "recv " + request.command, "Can't receive", "timeout"
+                    )
+
+    def _abort(
+        self,
+        device: TivoDevice,
+        conn: _Connection | None,
+        operation: str | None,
+        status: str,
+        reason: str,
+    ) -> None:
+        """Note that `operation` of `device` failed, with `status` and `reason`; close `conn`."""
+
+        if operation and reason == "timeout":
+            device.stats.timeout(operation)
+        elif operation:
+            device.stats.error(operation)
+        device.status, device.reason = status, reason
+        if conn:
+            self._close(conn)
+        device.notify(device.TIMEOUT if reason == "timeout" else device.ERROR)
+        self._dispatch(device)
+        if self.core.ui_update_status_callback:
+            self.core.ui_update_status_callback()
+
+    def _close(self, conn: _Connection) -> None:
+        """Close `conn`, and resolve all its requests as unanswered."""
+
+        device = conn.device
+        self._conns.pop(device, None)
+        self.selector.unregister(conn.sock)
+        conn.sock.close()
+        if device.sock is conn.sock:
+            device.sock = None
+            if device.capture:
+                device.capture.record(device.identity, DISCONNECT)
+
+        for request in conn.waiting:
+            if request.future:
+                request.future.set_result(None)
+        for future in conn.written:
+            future.set_result(None)
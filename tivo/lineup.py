@@ -0,0 +1,126 @@
+"""Channel lineups.
+
+What a device has told us about its channels: the channels it tuned to,
+the channels it refused, and which channel follows which, as learned
+from `IRCODE CHANNELUP` and `CHANNELDOWN`. With these, a channel already
+refused is refused again without asking the device, and a step of
+several channels is made with one `SETCH`, instead of one `IRCODE` per
+channel, when every channel along the way is known.
+
+Lineups change, when channels are added to, or dropped from, a
+subscription; a refusal is forgotten after `Lineup.ttl`, and any reply
+that contradicts what was learned replaces it.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+__all__ = ["LINEUPS", "Lineup"]
+
+LINEUPS = "lineups.json"  # state file, by device identity.
+
+
+class Lineup:
+    """Channels of one device, learned from its replies.
+
+    Channels are keyed by `key`, which is also the argument of `SETCH`.
+    """
+
+    ttl = 7 * 24 * 3600.0  # seconds to remember that a channel was refused.
+    refusals = ("INVALID_CHANNEL", "MISSING_CHANNEL")  # reasons that outlast the moment.
+
+    def __init__(self) -> None:
+        """Initialize empty lineup."""
+
+        self.channels: set[str] = set()  # tuned to
+        self.refused: dict[str, tuple[str, float]] = {}  # (reason, time) by channel
+        self.next: dict[str, str] = {}  # channel after each channel, with CHANNELUP
+        self.changed = False  # since loaded
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(channels={len(self.channels)}, "
+            f"refused={len(self.refused)}, next={len(self.next)})"
+        )
+
+    @staticmethod
+    def key(*words: str | None) -> str:
+        """Return key of channel `words`, such as ("0144", "0002") or ("144 2",)."""
+
+        return " ".join(x.lstrip("0") or "0" for word in words if word for x in word.split())
+
+    def tuned(self, channel: str) -> None:
+        """Learn that the device tuned to `channel`."""
+
+        if channel not in self.channels:
+            self.channels.add(channel)
+            self.changed = True
+        if self.refused.pop(channel, None):
+            self.changed = True
+
+    def refuse(self, channel: str, reason: str) -> None:
+        """Learn that the device refused `channel` for `reason`."""
+
+        if reason not in self.refusals:
+            return  # such as NO_LIVE or RECORDING; try again later.
+
+        self.refused[channel] = (reason, time.time())
+        self.channels.discard(channel)
+        self.next = {k: v for k, v in self.next.items() if channel not in (k, v)}
+        self.changed = True
+
+    def refusal(self, channel: str) -> str | None:
+        """Return the reason `channel` was refused, if it still holds, or None."""
+
+        if not (refused := self.refused.get(channel)):
+            return None
+        reason, when = refused
+        if time.time() - when > self.ttl:
+            del self.refused[channel]
+            self.changed = True
+            return None
+        return reason
+
+    def follows(self, before: str, after: str) -> None:
+        """Learn that `after` is the channel after `before`."""
+
+        if self.next.get(before) == after:
+            return
+        # Each channel has one channel before it, too.
+        self.next = {k: v for k, v in self.next.items() if v != after}
+        self.next[before] = after
+        self.changed = True
+
+    def step(self, channel: str, count: int) -> str | None:
+        """Return the channel `count` channels after (or, if negative, before) `channel`.
+
+        Return None unless every channel along the way is known.
+        """
+
+        links = self.next if count > 0 else {v: k for k, v in self.next.items()}
+        for _ in range(abs(count)):
+            if (following := links.get(channel)) is None:
+                return None
+            channel = following
+        return channel
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return lineup as a json-serializable dict."""
+
+        return {
+            "channels": sorted(self.channels),
+            "refused": {k: list(v) for k, v in self.refused.items()},
+            "next": self.next,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Lineup:
+        """Return lineup from dict made by `as_dict`."""
+
+        lineup = cls()
+        lineup.channels = set(data["channels"])
+        lineup.refused = {k: (v[0], float(v[1])) for k, v in data["refused"].items()}
+        lineup.next = dict(data["next"])
+        return lineup
@@ -0,0 +1,95 @@
+"""TivoListener.
+
+Listen for hello messages broadcast by Tivo set-top devices, without
+curses, for both the interactive application and headless commands;
+`IOLoop` waits on the socket, and hands each message to `handle_beacon`.
+"""
+
+import re
+import socket
+
+from loguru import logger
+
+from tivo.core import TivoCore
+from tivo.device import TivoDevice
+
+
+class TivoListener:
+    """Discover devices from the hello messages they broadcast."""
+
+    beacon_port = 2190  # tivo devices broadcast their hello messages to this udp port.
+
+    # tivoconnect=1
+    # swversion=20.7.4d.RC2-746-2-746
+    # method=broadcast
+    # identity=7460001902767F2
+    # machine=DVR 67F2
+    # platform=tcd/Series4
+    # services=TiVoMediaServer:80/http
+
+    # sent by tivo devices
+    _hello_regex = re.compile(r"identity=(?P<identity>[^\n]+)\n.*machine=(?P<machine>[^\n]+)")
+    # extension: sent by our tivo device emulator.
+    _port_regex = re.compile(r"port=(?P<port>[^\n]+)")
+
+    def __init__(self, core: TivoCore, beacon_port: int | None = None) -> None:
+        """Listen for the devices of `core` on udp `beacon_port`."""
+
+        self.core = core
+        if beacon_port is not None:
+            self.beacon_port = beacon_port
+        self.sock: socket.socket | None = None  # bound to `beacon_port`
+        self.packets = 0  # number of datagrams received by the listener
+        self.parse_errors = 0  # number of datagrams that were not hello messages
+
+    def open(self) -> socket.socket:
+        """Bind, and return, the beacon socket, if not already."""
+
+        if not self.sock:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind(("", self.beacon_port))
+            logger.info(f"Listening on UDP port {self.beacon_port!r}")
+        return self.sock
+
+    def handle_beacon(self, data: bytes, address: str) -> None:
+        """Handle hello message `data` broadcast from device at `address`."""
+
+        logger.trace(f"data {data!r}, address {address!r}")
+        msg = data.decode("ASCII", errors="replace").rstrip()
+
+        if not (match := self._hello_regex.search(msg)):
+            logger.error("Can't parse {!r}", msg)
+            self.parse_errors += 1
+            return
+
+        identity = match.group("identity")
+        machine = match.group("machine")
+
+        # SIM108: comments in each branch identify source; ternary would lose that context.
+        if match := self._port_regex.search(msg):  # noqa: SIM108
+            # sent from our emulator.
+            port = int(match.group("port"))
+        else:
+            # sent from an actual tivo device.
+            port = None
+
+        if (device := self.core.get_device_by_name(identity)) is None:
+            device = TivoDevice(
+                identity=identity,
+                machine=machine,
+                address=address,
+                port=port,
+            )
+            logger.info("{!r} New device", device.host)
+            self.core.add_device(device)
+            self.core.resolve([device])  # its name; not on the loop's thread
+
+        logger.debug("{!r} Hello", device.host)
+        device.handle_hello_event(
+            identity=identity,
+            machine=machine,
+            address=address,
+            port=port,
+        )
+        if self.core.ui_update_status_callback:
+            self.core.ui_update_status_callback()
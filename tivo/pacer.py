@@ -0,0 +1,58 @@
+"""Key pacer.
+
+Tivo devices don't answer navigation keys; they act on them at their
+own pace, and queue the rest. Holding an arrow key sends repeats faster
+than that, so the device keeps scrolling long after the key is released.
+
+A pacer models the device as acting on one key each `1 / rate` seconds,
+and admits a key only while fewer than `burst` keys are in flight;
+repeats of the same key beyond that are dropped, not queued.
+"""
+
+from __future__ import annotations
+
+import time
+
+__all__ = ["NAVIGATION", "KeyPacer"]
+
+# Requests paced; those of the keys that auto-repeat when held.
+NAVIGATION = frozenset(
+    f"{kind} {key}"
+    for kind in ("KEYBOARD", "IRCODE")
+    for key in ("UP", "DOWN", "LEFT", "RIGHT", "PAGEUP", "PAGEDOWN")
+)
+
+
+class KeyPacer:
+    """Admit navigation keys no faster than a device acts on them."""
+
+    def __init__(self, rate: float = 8.0, burst: int = 2, timeout: float = 0.5) -> None:
+        """Admit `rate` keys per second, `burst` at once; expire keys unsent after `timeout`."""
+
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.last: str | None = None  # request of the last key admitted
+        self.dropped = 0  # number of keys not admitted, or expired
+        self._busy_until = 0.0  # monotonic time the device is expected to act on `last`
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(rate={self.rate}, dropped={self.dropped})"
+
+    def in_flight(self, now: float | None = None) -> float:
+        """Return number of keys admitted that the device is expected to be acting on."""
+
+        now = time.monotonic() if now is None else now
+        return max(self._busy_until - now, 0.0) * self.rate
+
+    def admit(self, request: str, now: float | None = None) -> bool:
+        """Return whether to send `request`: not a repeat of `last` with `burst` in flight."""
+
+        now = time.monotonic() if now is None else now
+        if request == self.last and self.in_flight(now) > self.burst - 1:
+            self.dropped += 1
+            return False
+
+        self.last = request
+        self._busy_until = max(self._busy_until, now) + 1 / self.rate
+        return True
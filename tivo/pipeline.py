@@ -0,0 +1,120 @@
+"""Pipelined requests.
+
+Send requests to a device without waiting for each reply, up to a depth
+of requests in flight, and match replies to requests in order. Replies
+are `CH_STATUS ... REMOTE`, `CH_FAILED` and `LIVETV_READY`; other
+`CH_STATUS` messages are pushed by the device, and are skipped.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, NamedTuple
+
+from loguru import logger
+
+from tivo.device import TivoDevice
+
+__all__ = ["ERROR", "FAILED", "OK", "TIMEOUT", "Pipeline", "Reply"]
+
+OK = "ok"
+FAILED = "failed"  # CH_FAILED
+TIMEOUT = "timeout"
+ERROR = "error"  # can't connect, or connection lost
+
+
+class Reply(NamedTuple):
+    """Outcome of a request."""
+
+    token: Any  # given with the request
+    outcome: str  # OK, FAILED, TIMEOUT or ERROR
+    seconds: float  # from request to reply, or to sent when not answered
+    message: str | None  # the reply, if any
+
+
+class Pipeline:
+    """Requests in flight to one device."""
+
+    def __init__(self, device: TivoDevice, depth: int = 1) -> None:
+        """Send requests to `device`, with up to `depth` in flight, on its own connection."""
+
+        if device.loop:
+            raise ValueError(f"{device.host!r} Can't pipeline requests to a device of a loop")
+        self.device = device
+        self.depth = depth
+        self._inflight: deque[tuple[Any, float]] = deque()  # (token, start)
+
+    def submit(self, message: str, token: Any = None) -> list[Reply]:
+        """Send request `message`, and return the replies that completed meanwhile.
+
+        The reply to `message` is among them when it is not answered, or
+        when the pipeline is only one deep.
+        """
+
+        start = time.perf_counter()
+        # Don't drain; replies to requests in flight are waiting to be read.
+        self.device.send_nowait(message)
+
+        if not self.device.sock:
+            return [*self._abandon(ERROR), Reply(token, ERROR, 0.0, None)]
+        if not self.device.expects_reply(message):
+            return [Reply(token, OK, time.perf_counter() - start, None)]
+
+        self._inflight.append((token, start))
+        return self._wait(self.depth - 1)
+
+    def getch(self, token: Any = None) -> list[Reply]:
+        """Reconnect, after all replies, and return them and the current status."""
+
+        replies = self.flush()
+        start = time.perf_counter()
+        self.device.getch()
+        return [*replies, self._outcome(token, start)]
+
+    def flush(self) -> list[Reply]:
+        """Wait for, and return, the replies to all requests in flight."""
+        return self._wait(0)
+
+    def _wait(self, depth: int) -> list[Reply]:
+        """Read replies until no more than `depth` requests are in flight."""
+
+        device = self.device
+        replies = []
+
+        while len(self._inflight) > depth:
+            status = device.read_reply()
+
+            if status == "CH_STATUS" and device.reason != "REMOTE":
+                continue  # pushed, not a reply
+
+            if status in ("CH_STATUS", "CH_FAILED", "LIVETV_READY"):
+                replies.append(self._outcome(*self._inflight.popleft()))
+                continue
+
+            if status == "Can't receive" or not device.sock:
+                replies += self._abandon(TIMEOUT if device.reason == "timeout" else ERROR)
+                device.close()  # resynchronize on a new connection
+                break
+
+            logger.warning("{!r} Unexpected {!r}", device.host, device.last_msg_rcvd)
+
+        return replies
+
+    def _outcome(self, token: Any, start: float) -> Reply:
+        """Return outcome of the request `token`, started at `start`, per device status."""
+
+        device = self.device
+        seconds = time.perf_counter() - start
+        if device.status in ("CH_STATUS", "LIVETV_READY"):
+            return Reply(token, OK, seconds, device.last_msg_rcvd)
+        if device.status == "CH_FAILED":
+            return Reply(token, FAILED, seconds, device.last_msg_rcvd)
+        return Reply(token, TIMEOUT if device.reason == "timeout" else ERROR, seconds, None)
+
+    def _abandon(self, outcome: str) -> list[Reply]:
+        """Return `outcome` of all requests in flight, and forget them."""
+
+        replies = [Reply(token, outcome, 0.0, None) for token, _ in self._inflight]
+        self._inflight.clear()
+        return replies
@@ -0,0 +1,143 @@
+"""Profiling.
+
+Run the process under `cProfile` and `tracemalloc`, and dump their
+results when the process exits, and whenever it receives `SIGUSR1`,
+which does not stop profiling.
+
+The profile of every selected thread is merged into one `pstats` file,
+for `python -m pstats FILE` or `snakeviz FILE`; memory snapshots are
+written by `tracemalloc.Snapshot.dump`, for `tracemalloc.Snapshot.load`.
+Snapshots taken upon `SIGUSR1` are written to `FILE.1`, `FILE.2`, ...,
+and the final results to `FILE`.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+import tracemalloc
+from fnmatch import fnmatch
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from loguru import logger
+
+__all__ = ["Profiler"]
+
+
+class _Snapshot:
+    """Stats of a running profile, for `pstats.Stats`, without disabling it."""
+
+    def __init__(self, profile: cProfile.Profile) -> None:
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self) -> None:
+        """Satisfy `pstats.Stats`, which calls this to stop a profile."""
+
+
+class Profiler:
+    """Profile the time and memory of the process, and dump the results to files."""
+
+    nframes = 25  # of traceback to store with each memory block.
+
+    def __init__(
+        self,
+        profile: Path | None = None,
+        trace_malloc: Path | None = None,
+        threads: list[str] | None = None,
+    ) -> None:
+        """Profile time into file `profile`, and memory into file `trace_malloc`.
+
+        Time is profiled in the threads whose names match one of the
+        `fnmatch` patterns in `threads`, or in all threads.
+        """
+
+        self.profile_path = profile
+        self.trace_malloc_path = trace_malloc
+        self.threads = threads or ["*"]
+        self._profiles: dict[int, cProfile.Profile] = {}  # by thread ident
+        self._lock = threading.RLock()  # the signal handler may interrupt its holder
+        self._nsnapshots = 0
+
+    def _selected(self, name: str) -> bool:
+        return any(fnmatch(name, pattern) for pattern in self.threads)
+
+    def start(self) -> None:
+        """Start profiling this, and every selected new, thread."""
+
+        if self.trace_malloc_path:
+            tracemalloc.start(self.nframes)
+
+        if self.profile_path:
+            if sys.version_info >= (3, 12):
+                # `cProfile` is built on `sys.monitoring`, which sees every
+                # thread, and permits only one profiler at a time.
+                if self.threads != ["*"]:
+                    logger.warning("Profiling all threads; can't select on python >= 3.12")
+                self._start_profile()
+            else:
+                # `cProfile` sees only the thread that enabled it.
+                if self._selected(threading.current_thread().name):
+                    self._start_profile()
+                threading.setprofile(self._bootstrap)
+
+        signal.signal(signal.SIGUSR1, self._handle_signal)
+
+    def _start_profile(self) -> None:
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles[threading.get_ident()] = profile
+        profile.enable()
+
+    def _bootstrap(self, _frame: FrameType, _event: str, _arg: Any) -> None:
+        """Start profiling new thread, if selected; called by the thread itself."""
+
+        sys.setprofile(None)
+        if self._selected(threading.current_thread().name):
+            self._start_profile()
+
+    def _handle_signal(self, _signum: int, _frame: FrameType | None) -> None:
+        self._nsnapshots += 1
+        self.dump(f".{self._nsnapshots}")
+
+    def dump(self, suffix: str = "") -> None:
+        """Write the results so far to the files, with `suffix` added to their names."""
+
+        if self.profile_path:
+            with self._lock:
+                snapshots = [_Snapshot(x) for x in self._profiles.values()]
+            if snapshots := [x for x in snapshots if x.stats]:
+                stats = pstats.Stats(snapshots[0])  # type: ignore[arg-type]
+                for snapshot in snapshots[1:]:
+                    stats.add(snapshot)  # type: ignore[arg-type]
+                path = self._path(self.profile_path, suffix)
+                stats.dump_stats(path)
+                os.replace(path, path.with_suffix(""))
+                logger.info("Wrote profile {!r}", str(path.with_suffix("")))
+
+        if self.trace_malloc_path and tracemalloc.is_tracing():
+            path = self._path(self.trace_malloc_path, suffix)
+            tracemalloc.take_snapshot().dump(str(path))
+            os.replace(path, path.with_suffix(""))
+            logger.info("Wrote memory snapshot {!r}", str(path.with_suffix("")))
+
+    @staticmethod
+    def _path(path: Path, suffix: str) -> Path:
+        """Return temporary path for file `path` + `suffix`, to replace it atomically."""
+        return path.with_name(path.name + suffix + ".tmp")
+
+    def stop(self) -> None:
+        """Stop profiling, and write the final results."""
+
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        threading.setprofile(None)
+        if profile := self._profiles.get(threading.get_ident()):
+            profile.disable()  # other threads may still be running; take their snapshots
+        self.dump()
+        tracemalloc.stop()
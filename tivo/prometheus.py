@@ -0,0 +1,203 @@
+"""Prometheus exporter.
+
+Publish device and discovery metrics in the Prometheus text exposition
+format, served over HTTP or written periodically to a file for the node
+exporter's textfile collector.
+
+Metrics are collected when rendered, by reading counters maintained by
+`TivoDevice` and `TivoListener` without taking locks; a scrape may see a
+device mid-update, which is harmless for counters and histograms.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from tivo.core import TivoCore
+from tivo.stats import Histogram
+
+if TYPE_CHECKING:
+    from tivo.listener import TivoListener
+
+__all__ = ["PrometheusExporter"]
+
+
+def _labels(**labels: str) -> str:
+    """Return `labels` formatted for a sample line."""
+
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class PrometheusExporter:
+    """Publish device and discovery metrics in Prometheus text format."""
+
+    interval = 15.0  # seconds between writes of the textfile.
+
+    def __init__(self, core: TivoCore, remote: TivoListener | None = None) -> None:
+        """Export metrics of the devices of `core`, and the listener of `remote`."""
+
+        self.core = core
+        self.remote = remote
+        self._server: ThreadingHTTPServer | None = None
+        self._path: Path | None = None
+        self._stopping = threading.Event()
+
+    def render(self) -> str:
+        """Return all metrics, in text exposition format."""
+
+        lines: list[str] = []
+
+        def _family(name: str, kind: str, text: str) -> None:
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        devices = list(self.core.devices.values())
+        now = time.time()
+
+        loop = self.core.loop
+        for name, kind, text, value in (
+            (
+                "tivo_device_pings_total",
+                "counter",
+                "Hello messages heard from device.",
+                lambda x: x.npings,
+            ),
+            (
+                "tivo_device_last_seen_seconds",
+                "gauge",
+                "Seconds since device was heard.",
+                lambda x: f"{now - x.last_seen:.3f}" if x.last_seen else None,
+            ),
+            (
+                "tivo_device_connected",
+                "gauge",
+                "Whether connected to device.",
+                lambda x: int(x.sock is not None),
+            ),
+            (
+                "tivo_device_queue_depth",
+                "gauge",
+                "Commands queued for device.",
+                lambda x: loop.queued(x) if loop else None,
+            ),
+            (
+                "tivo_device_keys_dropped_total",
+                "counter",
+                "Navigation keys not sent.",
+                lambda x: x.pacer.dropped,
+            ),
+        ):
+            _family(name, kind, text)
+            for device in devices:
+                if (result := value(device)) is not None:
+                    labels = _labels(identity=device.identity, host=str(device.host))
+                    lines.append(f"{name}{labels} {result}")
+
+        if loop:
+            _family("tivo_polls_dropped_total", "counter", "Stale polls not made.")
+            lines.append(f"tivo_polls_dropped_total {loop.polls_dropped}")
+
+        name = "tivo_device_operation_seconds"
+        _family(name, "histogram", "Latency of connect, send and recv operations.")
+        for device in devices:
+            for operation, histogram in list(device.stats.latency.items()):
+                lines += self._histogram(
+                    name,
+                    histogram,
+                    {"identity": device.identity, "host": str(device.host), "op": operation},
+                )
+
+        for name, attr, text in (
+            ("tivo_device_operation_timeouts_total", "timeouts", "Operations timed out."),
+            ("tivo_device_operation_errors_total", "errors", "Operations failed."),
+        ):
+            _family(name, "counter", text)
+            for device in devices:
+                for operation, count in list(getattr(device.stats, attr).items()):
+                    labels = _labels(
+                        identity=device.identity, host=str(device.host), op=operation
+                    )
+                    lines.append(f"{name}{labels} {count}")
+
+        if self.remote:
+            _family("tivo_listener_packets_total", "counter", "Beacon packets received.")
+            lines.append(f"tivo_listener_packets_total {self.remote.packets}")
+            _family("tivo_listener_parse_errors_total", "counter", "Beacons not parsed.")
+            lines.append(f"tivo_listener_parse_errors_total {self.remote.parse_errors}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram(name: str, histogram: Histogram, labels: dict[str, str]) -> list[str]:
+        """Return sample lines of `histogram`, with cumulative buckets."""
+
+        counts = list(histogram.counts)  # a consistent copy, for the cumulative sums
+        lines = []
+        total = 0
+        for bound, count in zip((*histogram.bounds, "+Inf"), counts, strict=True):
+            total += count
+            lines.append(f"{name}_bucket{_labels(**labels, le=str(bound))} {total}")
+        lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_labels(**labels)} {total}")
+        return lines
+
+    def serve(self, port: int, address: str = "127.0.0.1") -> None:
+        """Serve metrics over HTTP on `address`:`port`, in a daemon thread."""
+
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                logger.trace(format, *args)
+
+        self._server = ThreadingHTTPServer((address, port), _Handler)
+        self._server.daemon_threads = True
+        logger.info("Serving metrics on {!r}", self._server.server_address)
+        threading.Thread(name="exporter", target=self._server.serve_forever, daemon=True).start()
+
+    def write_periodically(self, path: Path) -> None:
+        """Write metrics to `path` every `interval` seconds, in a daemon thread."""
+
+        self._path = path
+
+        def _writer() -> None:
+            while not self._stopping.wait(self.interval):
+                self.write(path)
+
+        self.write(path)
+        threading.Thread(name="exporter", target=_writer, daemon=True).start()
+
+    def write(self, path: Path) -> None:
+        """Write metrics to `path`, atomically."""
+
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def stop(self) -> None:
+        """Stop serving, and write the textfile one last time."""
+
+        self._stopping.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._path:
+            self.write(self._path)
@@ -0,0 +1,129 @@
+"""Health scheduler.
+
+Devices broadcast a hello message about once a minute, and each one
+refreshes the device's state. A device that stops broadcasting would
+keep its last state forever; the scheduler polls it instead, and marks
+its health:
+
+    online   heard from within `stale_after` seconds,
+    stale    not heard from for `stale_after` seconds; its state may be out of date,
+    offline  not heard from for `offline_after` seconds.
+
+A device is heard from when it broadcasts, replies, or pushes a status.
+Devices heard from within `interval` seconds are not polled; devices
+never heard from are polled when first due.
+
+The scheduler has no thread of its own: it keeps one heap of the next
+time each device is due, and the thread that drives it calls
+`run_pending`, which polls the devices due, and returns how long to
+wait until the next is due; e.g., as the timeout of the loop's
+`select`. Each device's polls are jittered, and first polls are spread
+over an interval, so polls never run in lockstep.
+"""
+
+from __future__ import annotations
+
+import heapq
+import random
+import time
+
+from loguru import logger
+
+from tivo.device import TivoDevice
+
+__all__ = ["HealthScheduler"]
+
+
+class HealthScheduler:
+    """Poll devices not heard from recently, and mark their health."""
+
+    beacon_interval = 60.0  # seconds between hello messages from each device.
+    jitter = 0.1  # of each interval, either way.
+
+    def __init__(
+        self,
+        interval: float = 120.0,
+        stale_after: float = 2.5 * beacon_interval,
+        offline_after: float = 5.5 * beacon_interval,
+    ) -> None:
+        """Poll devices not heard from for `interval` seconds; 0 to only mark health."""
+
+        self.interval = interval
+        self.stale_after = stale_after
+        self.offline_after = offline_after
+        self.polls = 0  # number of polls made
+        self._heap: list[tuple[float, int, TivoDevice]] = []  # (due, seq, device)
+        self._seq = 0  # to order devices due at the same time
+        self._started = time.time()  # devices never heard from, were not heard since
+        self._rng = random.Random()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(devices={len(self._heap)}, polls={self.polls})"
+
+    def add(self, device: TivoDevice) -> None:
+        """Schedule `device`, first due at a random time within an interval."""
+
+        spread = self.interval or self.stale_after
+        self._push(time.time() + self._rng.uniform(0, spread), device)
+
+    def _push(self, due: float, device: TivoDevice) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, device))
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def run_pending(self) -> float | None:
+        """Check, and poll, the devices due; return seconds until the next is due, or None."""
+
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, device = heapq.heappop(self._heap)
+            self._check(device, now)
+            now = time.time()
+
+        return max(self._heap[0][0] - now, 0.0) if self._heap else None
+
+    def _check(self, device: TivoDevice, now: float) -> None:
+        """Poll `device`, if due, mark its health, and schedule its next check."""
+
+        if self.interval and (
+            not device.last_seen or now - self._heard(device) >= self.interval
+        ):
+            logger.debug("{!r} Polling", device.host)
+            self.polls += 1
+            device.poll()
+            now = time.time()
+
+        heard = self._heard(device)
+        self._mark(device, now - heard)
+
+        # Next, when a poll is due, or when health would worsen, whichever is first;
+        # a device marks itself online when heard from.
+        if self.interval:
+            poll = heard + self._jittered(self.interval)
+            if poll <= now:  # polled, and not heard from
+                poll = now + self._jittered(self.interval)
+        else:
+            poll = now + self._jittered(self.beacon_interval)
+        changes = [x for x in (heard + self.stale_after, heard + self.offline_after) if x > now]
+        self._push(min([poll, *changes]), device)
+
+    def _heard(self, device: TivoDevice) -> float:
+        return max(device.last_seen, self._started)
+
+    def _mark(self, device: TivoDevice, silence: float) -> None:
+        """Mark health of `device`, not heard from for `silence` seconds."""
+
+        if silence >= self.offline_after:
+            health = device.OFFLINE
+        elif silence >= self.stale_after:
+            health = device.STALE
+        else:
+            health = device.ONLINE
+
+        if health != device.health:
+            log = logger.info if health == device.ONLINE else logger.warning
+            log("{!r} {}; not heard from for {:.0f}s", device.host, health, silence)
+            device.health = health
+            device.notify(device.HEALTH)
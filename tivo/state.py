@@ -0,0 +1,57 @@
+"""Persistent state.
+
+Files that outlive a process, such as accumulated device stats, are kept
+in `$XDG_STATE_HOME/tivo`, which defaults to `~/.local/state/tivo`.
+
+This module, like `tivo.hosts`, uses only the standard library, so
+shell completion can read state without importing the rest of `tivo`.
+"""
+
+import fcntl
+import json
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+__all__ = ["lock_state", "read_state", "state_dir", "write_state"]
+
+
+def state_dir() -> Path:
+    """Return path of the state directory, which may not exist yet."""
+
+    base = os.environ.get("XDG_STATE_HOME") or "~/.local/state"
+    return Path(base).expanduser() / "tivo"
+
+
+def read_state(name: str) -> Any:
+    """Return contents of JSON state file `name`, or None if missing or unreadable."""
+
+    try:
+        return json.loads((state_dir() / name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(name: str, data: Any) -> None:
+    """Replace JSON state file `name` with `data`, atomically."""
+
+    path = state_dir() / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+@contextmanager
+def lock_state(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock of state file `path`, to read, update and replace it.
+
+    Concurrent processes, each updating under the lock, don't lose each other's updates.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "w", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
@@ -0,0 +1,267 @@
+"""Latency statistics.
+
+Fixed-bucket histograms, cheap to update and to merge, in the style of
+Prometheus histograms: bucket `i` counts observations less than or
+equal to `bounds[i]`, and the last bucket counts everything larger.
+
+Device stats are accumulated across processes in a stats file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Any, ClassVar
+
+from loguru import logger
+
+from tivo.state import lock_state
+
+__all__ = ["DeviceStats", "Histogram", "load_stats", "save_stats"]
+
+
+class Histogram:
+    """Latency histogram, in seconds."""
+
+    bounds: ClassVar[tuple[float, ...]] = (
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    )
+
+    def __init__(self) -> None:
+        """Initialize empty histogram."""
+
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(count={self.count}, sum={self.sum:.6f})"
+
+    def observe(self, seconds: float) -> None:
+        """Record one observation of `seconds`."""
+
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.sum += seconds
+
+    @property
+    def count(self) -> int:
+        """Return number of observations."""
+        return sum(self.counts)
+
+    @property
+    def mean(self) -> float:
+        """Return mean of observations, in seconds."""
+        return self.sum / count if (count := self.count) else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Return estimate of the `percent` percentile, in seconds.
+
+        The estimate interpolates linearly within the bucket holding the
+        percentile; observations in the overflow bucket report the last bound.
+        """
+
+        if not (count := self.count):
+            return 0.0
+
+        rank = count * percent / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def merge(self, other: Histogram) -> None:
+        """Add the observations of `other` to this histogram."""
+
+        self.counts = [x + y for x, y in zip(self.counts, other.counts, strict=True)]
+        self.sum += other.sum
+
+    def summary(self) -> str:
+        """Return one-line summary, in milliseconds."""
+
+        return " ".join(
+            [
+                f"n {self.count}",
+                f"mean {self.mean * 1000:.1f}ms",
+                f"p50 {self.percentile(50) * 1000:.1f}ms",
+                f"p90 {self.percentile(90) * 1000:.1f}ms",
+                f"p99 {self.percentile(99) * 1000:.1f}ms",
+            ]
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return histogram as a json-serializable dict."""
+
+        return {
+            "bounds": list(self.bounds),
+            "counts": list(self.counts),
+            "sum": self.sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Histogram:
+        """Return histogram from dict made by `as_dict`."""
+
+        if tuple(data["bounds"]) != cls.bounds:
+            raise ValueError("Histogram bounds do not match")
+
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.sum = float(data["sum"])
+        return histogram
+
+
+class DeviceStats:
+    """Operation latency histograms and failure counters of one device.
+
+    Operations are named `connect`, `send COMMAND` and `recv COMMAND`,
+    where `recv COMMAND` is the wait for the reply to `COMMAND`, and
+    `recv CONNECT` is the wait for the status sent upon connecting; and
+    `queue COMMAND`, the wait of `COMMAND` in the queue of an `IOLoop`.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty stats."""
+
+        self.latency: dict[str, Histogram] = {}
+        self.timeouts: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({sorted(self.latency)})"
+
+    def __bool__(self) -> bool:
+        return bool(self.latency or self.timeouts or self.errors)
+
+    def observe(self, operation: str, seconds: float) -> None:
+        """Record that `operation` took `seconds`."""
+
+        if not (histogram := self.latency.get(operation)):
+            histogram = self.latency[operation] = Histogram()
+        histogram.observe(seconds)
+
+    def timeout(self, operation: str) -> None:
+        """Count a timeout of `operation`."""
+        self.timeouts[operation] += 1
+
+    def error(self, operation: str) -> None:
+        """Count a failure, other than timeout, of `operation`."""
+        self.errors[operation] += 1
+
+    def operations(self) -> list[str]:
+        """Return names of all operations, busiest first."""
+
+        names = set(self.latency) | set(self.timeouts) | set(self.errors)
+        return sorted(names, key=lambda x: (-self.count(x), x))
+
+    def count(self, operation: str) -> int:
+        """Return number of attempts of `operation`."""
+
+        histogram = self.latency.get(operation)
+        return (
+            (histogram.count if histogram else 0)
+            + self.timeouts[operation]
+            + self.errors[operation]
+        )
+
+    def summary(self, operation: str) -> str:
+        """Return one-line summary of `operation`."""
+
+        histogram = self.latency.get(operation) or Histogram()
+        return " ".join(
+            [
+                histogram.summary(),
+                f"timeouts {self.timeouts[operation]}",
+                f"errors {self.errors[operation]}",
+            ]
+        )
+
+    def merge(self, other: DeviceStats) -> None:
+        """Add the observations of `other` to these stats."""
+
+        for operation, histogram in other.latency.items():
+            if mine := self.latency.get(operation):
+                mine.merge(histogram)
+            else:
+                self.latency[operation] = Histogram.from_dict(histogram.as_dict())
+        self.timeouts.update(other.timeouts)
+        self.errors.update(other.errors)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return stats as a json-serializable dict."""
+
+        return {
+            "latency": {k: v.as_dict() for k, v in self.latency.items()},
+            "timeouts": dict(self.timeouts),
+            "errors": dict(self.errors),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> DeviceStats:
+        """Return stats from dict made by `as_dict`."""
+
+        stats = cls()
+        stats.latency = {k: Histogram.from_dict(v) for k, v in data["latency"].items()}
+        stats.timeouts.update(data["timeouts"])
+        stats.errors.update(data["errors"])
+        return stats
+
+
+def load_stats(path: Path) -> dict[str, tuple[str, DeviceStats]]:
+    """Return (host, stats) of each device identity, from stats file `path`.
+
+    Return none, to start afresh, if the file is missing, or can't be read.
+    """
+
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return {
+            identity: (value["host"], DeviceStats.from_dict(value["stats"]))
+            for identity, value in data.items()
+        }
+    except FileNotFoundError:
+        return {}
+    except (ValueError, KeyError, TypeError, AttributeError) as err:
+        logger.warning("Discarding stats file {!r}; {!r}", str(path), err)
+        return {}
+
+
+def save_stats(path: Path, stats: dict[str, tuple[str, DeviceStats]]) -> None:
+    """Merge the (host, stats) of each device identity into stats file `path`.
+
+    The file is locked while it is updated, so concurrent processes may
+    save their stats without losing each other's.
+    """
+
+    with lock_state(path):
+        merged = load_stats(path)
+        for identity, (host, device_stats) in stats.items():
+            if previous := merged.get(identity):
+                previous[1].merge(device_stats)
+                merged[identity] = (host or previous[0], previous[1])
+            else:
+                merged[identity] = (host, device_stats)
+
+        data = {k: {"host": h, "stats": s.as_dict()} for k, (h, s) in merged.items()}
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
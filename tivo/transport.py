@@ -0,0 +1,135 @@
+"""Transports.
+
+How a `TivoDevice` reaches its device. Each transport makes a stream
+socket, so everything else (select, send, recv) is the same for all:
+
+    TcpTransport   TCP to the device's `address` and `port`; the default,
+    UnixTransport  a Unix-domain socket at `path`; e.g., of a local daemon, or proxy,
+    PipeTransport  an in-memory socket pair; `serve` is handed the other end.
+
+`PipeTransport` lets tests and benchmarks drive a device against an
+in-process emulator without the network stack.
+"""
+
+from __future__ import annotations
+
+import socket
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from tivo.device import TivoDevice
+
+__all__ = ["PipeTransport", "TcpTransport", "Transport", "UnixTransport"]
+
+
+class Transport(ABC):
+    """Connect to a device; subclasses say how."""
+
+    @abstractmethod
+    def target(self, device: TivoDevice) -> Any:
+        """Return the address of `device`, to connect to, or None if not known yet."""
+
+    @abstractmethod
+    def make_socket(self, device: TivoDevice) -> socket.socket:
+        """Return a new socket, to connect to `device`."""
+
+    def describe(self, device: TivoDevice) -> str:
+        """Return where `device` is, for logging."""
+        return repr(self.target(device))
+
+    def connect(self, device: TivoDevice, timeout: float | None) -> socket.socket:
+        """Return a socket connected to `device`; raise OSError if it can't be, in `timeout`."""
+
+        sock = self.make_socket(device)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(self.target(device))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def start_connect(self, device: TivoDevice) -> tuple[socket.socket, int]:
+        """Return a non-blocking socket, connecting to `device`, and the errno of the attempt."""
+
+        sock = self.make_socket(device)
+        sock.setblocking(False)
+        return sock, sock.connect_ex(self.target(device))
+
+
+class TcpTransport(Transport):
+    """TCP to the device's `address` and `port`."""
+
+    def target(self, device: TivoDevice) -> Any:
+        """Return (address, port) of `device`, or None if its address is not known yet."""
+        return (device.address, device.port) if device.address else None
+
+    def make_socket(self, device: TivoDevice) -> socket.socket:
+        """Return a new TCP socket."""
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Each request is a complete message; don't let Nagle hold it for an ACK.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def describe(self, device: TivoDevice) -> str:
+        """Return `TCP address:port`."""
+        return f"TCP {device.address}:{device.port}"
+
+
+class UnixTransport(Transport):
+    """A Unix-domain stream socket at `path`."""
+
+    def __init__(self, path: str) -> None:
+        """Connect to the socket at `path`."""
+        self.path = path
+
+    def target(self, device: TivoDevice) -> Any:
+        """Return `path`."""
+        return self.path
+
+    def make_socket(self, device: TivoDevice) -> socket.socket:
+        """Return a new Unix-domain socket."""
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    def describe(self, device: TivoDevice) -> str:
+        """Return `Unix path`."""
+        return f"Unix {self.path}"
+
+
+class PipeTransport(Transport):
+    """An in-memory socket pair, per connection; the other end is handed to `serve`."""
+
+    def __init__(self, serve: Callable[[socket.socket], None]) -> None:
+        """Call `serve(sock)`, without blocking, to serve the other end of each connection."""
+        self.serve = serve
+
+    def target(self, device: TivoDevice) -> Any:
+        """Return `pipe`; always known."""
+        return "pipe"
+
+    def make_socket(self, device: TivoDevice) -> socket.socket:
+        """Return our end of a new socket pair, whose other end is being served."""
+
+        ours, theirs = socket.socketpair()
+        self.serve(theirs)
+        return ours
+
+    def describe(self, device: TivoDevice) -> str:
+        """Return `pipe`."""
+        return "pipe"
+
+    def connect(self, device: TivoDevice, timeout: float | None) -> socket.socket:
+        """Return a socket connected to `serve`."""
+
+        sock = self.make_socket(device)
+        sock.settimeout(timeout)
+        return sock
+
+    def start_connect(self, device: TivoDevice) -> tuple[socket.socket, int]:
+        """Return a non-blocking socket, connected to `serve`, and 0."""
+
+        sock = self.make_socket(device)
+        sock.setblocking(False)
+        return sock, 0
@@ -25,11 +25,17 @@ class TivoUI:
 
         self.core = core
         self.core.set_ui_add_device_callback(self.add_device)
-        self.core.set_ui_update_status_callback(self.update_status)
+        self.core.set_ui_update_status_callback(self.update_changed_status)
 
         # index of the device that has the focus
         self._ifocus: int | None = None
 
+        # show latency stats, instead of attributes, in device status windows
+        self._show_stats = False
+
+        # version of the state of each device, by identity, last drawn
+        self._drawn: dict[str, int] = {}
+
         maxy, maxx = stdscr.getmaxyx()
         padding_y, padding_x = 0, 0
         maxy -= padding_y * 2
@@ -61,7 +67,7 @@ class TivoUI:
         self.logwin.set_location("{module}:{function}:{line}")
         self.logwin.set_verbose(self.core.options.verbose)
 
-        # device status window fields, attributes of TivoDevice(object), in its order.
+        # device status window fields, attributes of DeviceState(object), in its order.
 
         self._attrs = {
             "host": {"key": "Host", "width": 15},  # len('192.168.123.123')
@@ -70,6 +76,7 @@ class TivoUI:
             "address": {"key": "Address", "width": 15},
             "port": {"key": "Port", "width": 5},
             "timeout": {"key": "Timeout", "width": 5},
+            "health": {"key": "Health", "width": len("offline")},
             "screen": {"key": "Screen", "width": len("NOWPLAYING")},
             "last_msg_sent": {"key": "Last msg sent", "width": 0},
             "last_msg_rcvd": {"key": "Last msg rcvd", "width": 0},
@@ -86,7 +93,7 @@ class TivoUI:
         # 3 columns, ordering attributes as we please
         self._cols = [
             ["host", "machine", "identity", "address", "port"],
-            ["screen", "channel", "subchannel", "timeout", "npings"],
+            ["screen", "channel", "subchannel", "health", "npings"],
             ["last_msg_sent", "last_msg_rcvd", "status", "reason", "last_msg_rcvd_time"],
         ]
 
@@ -160,6 +167,13 @@ class TivoUI:
         for device in self.core.devices.values():
             self.update_device_status(device)
 
+    def update_changed_status(self) -> None:
+        """Update the status of devices whose state changed since last drawn."""
+
+        for device in list(self.core.devices.values()):
+            if self._drawn.get(device.identity) != device.state.version:
+                self.update_device_status(device)
+
     def update_device_status(self, device: TivoDevice) -> None:
         """Build status window for device."""
 
@@ -173,6 +187,8 @@ class TivoUI:
             return
 
         bwin = device.window
+        state = device.state  # one consistent snapshot, however the device changes meanwhile
+        self._drawn[device.identity] = state.version
         bwin.w.clear()
 
         color_names = curses.color_pair(3)
@@ -184,13 +200,18 @@ class TivoUI:
             color_names |= curses.A_DIM
             # color_values |= curses.A_BOLD
 
+        if self._show_stats:
+            self._draw_stats(device, color_names, color_values)
+            bwin.w.refresh()
+            return
+
         for row, _ in enumerate(self._rows):
             bwin.w.move(row, 0)
             for col in range(len(self._cols)):
                 attrname = self._rows[row][col]
                 if attr := self._attrs.get(attrname):
                     key = str(attr["key"])
-                    value = str(getattr(device, attrname))
+                    value = str(getattr(state, attrname))
                 else:
                     key = value = ""
                 if col > 0:
@@ -202,6 +223,31 @@ class TivoUI:
         # bwin.w.scroll(-1)
         bwin.w.refresh()
 
+    def _draw_stats(self, device: TivoDevice, color_names: int, color_values: int) -> None:
+        """Draw host and its busiest operations into status window for device."""
+
+        assert device.window
+        win = device.window.w
+        width = self.ncols2 - 3  # 2 for borders, 1 to not write into the last column
+
+        lines = [("Host", str(device.host))]
+        lines += [(x, device.stats.summary(x)) for x in device.stats.operations()]
+        lines = lines[: len(self._rows)]
+        key_width = max(len(key) for key, _ in lines)
+
+        for row, (key, value) in enumerate(lines):
+            win.move(row, 0)
+            win.addstr(key.rjust(key_width)[:width], color_names)
+            if (room := width - key_width - len(self._attr_gutter)) > 0:
+                win.addstr(self._attr_gutter, color_names)
+                win.addstr(value[:room], color_values)
+
+    def _toggle_stats(self) -> None:
+        """Toggle between attributes and latency stats in device status windows."""
+
+        self._show_stats = not self._show_stats
+        self.update_status()
+
     def main_menu(self) -> None:
         """Main menu."""
 
@@ -234,6 +280,7 @@ class TivoUI:
         menu.add_item("[", "Previous device", self._prev_device)
         menu.add_item("]", "Next device", self._next_device)
         menu.add_item("t", "Test menu", self._test_menu)
+        menu.add_item("S", "toggle Stats panel", self._toggle_stats)
         menu.add_item(ord("\f"), "Redraw", self.redraw)
         menu.add_item(curses.KEY_RESIZE, "Resize", lambda: False)
         menu.add_item(curses.KEY_F2, "INFO", lambda: self._set_verbose(0))
@@ -351,30 +398,7 @@ class TivoUI:
                 logger.error(f"Can't map: {key!r}")
 
     keymap = {  # from curses to tivo
-        "0": "NUM0",
-        "1": "NUM1",
-        "2": "NUM2",
-        "3": "NUM3",
-        "4": "NUM4",
-        "5": "NUM5",
-        "6": "NUM6",
-        "7": "NUM7",
-        "8": "NUM8",
-        "9": "NUM9",
-        "-": "MINUS",
-        "+": "PLUS",
-        "=": "EQUALS",
-        "[": "LBRACKET",
-        "]": "RBRACKET",
-        "\\": "BACKSLASH",
-        ";": "SEMICOLON",
-        "“": "QUOTE",
-        ",": "COMMA",
-        ".": "PERIOD",
-        "/": "SLASH",
-        "`": "BACKQUOTE",
-        "~": "BACKQUOTE",
-        " ": "SPACE",
+        **{ord(k): v for k, v in TivoDevice.keymap.items()},
         curses.KEY_UP: "UP",
         curses.KEY_DOWN: "DOWN",
         curses.KEY_LEFT: "LEFT",